@@ -0,0 +1 @@
+# Evaluation of finetuned models
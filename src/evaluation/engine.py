@@ -0,0 +1,295 @@
+# Batched generation for evaluating local models
+#
+# The notebooks ask one question at a time, one sample at a time, so an
+# eval sweep is a long serial loop of model.generate calls. Here prompts are
+# tokenized up front, sorted by length into batches (so little of each batch
+# is padding), left-padded so every row's new tokens start at the same
+# position, and generated with one model.generate call per batch. Repeated
+# samples of a prompt are extra rows of its batch instead of re-runs. Works
+# with any transformers causal LM (Unsloth models included) on whatever
+# device the model is on, CPU included.
+#
+# Eval questions share a long chat-template prefix (and repeats of one
+# question share all of it), so the prompts' common token prefix is
+# prefilled once and its KV cache is forked to every row, leaving only the
+# rest of each prompt to prefill. Padding then sits between the prefix and
+# the rest; position IDs follow the attention mask, so each row sees the
+# same positions and tokens as it would unpadded.
+
+import copy
+from dataclasses import dataclass
+
+
+@dataclass(frozen=True)
+class SamplingParams:
+    max_new_tokens: int = 256
+    temperature: float = 0.7  # 0 for greedy decoding
+    top_p: float = 1.0
+    repetition_penalty: float = 1.0
+
+    def generate_kwargs(self) -> dict:
+        kwargs = {"max_new_tokens": self.max_new_tokens, "repetition_penalty": self.repetition_penalty}
+        if self.temperature > 0:
+            kwargs.update(do_sample=True, temperature=self.temperature, top_p=self.top_p)
+        else:
+            kwargs["do_sample"] = False
+        return kwargs
+
+
+def plan_batches(
+    lengths: list[int],
+    max_new_tokens: int,
+    num_return_sequences: int = 1,
+    max_batch_size: int = 64,
+    max_batch_tokens: int = 32_768,
+) -> list[list[int]]:
+    """Group prompt indices into batches of similar length.
+
+    Prompts are taken longest first, so each batch pads to the length of
+    its first prompt and prompts of similar length share a batch. A batch
+    holds at most max_batch_size sequences (prompts x num_return_sequences)
+    and at most max_batch_tokens padded positions, generated tokens
+    included. A prompt over either limit on its own still gets a batch.
+    """
+    order = sorted(range(len(lengths)), key=lambda i: lengths[i], reverse=True)
+    batches, batch = [], []
+    for i in order:
+        width = lengths[batch[0]] if batch else lengths[i]
+        rows = (len(batch) + 1) * num_return_sequences
+        if batch and (rows > max_batch_size or rows * (width + max_new_tokens) > max_batch_tokens):
+            batches.append(batch)
+            batch = []
+        batch.append(i)
+    if batch:
+        batches.append(batch)
+    return batches
+
+
+def chunked_selective_log_softmax(logits, index, chunks: int = 4):
+    """log_softmax(logits).gather(-1, index) without materialising the full log-softmax.
+
+    Rows are processed a chunk at a time in float32, as in the TRL
+    trainers, so only one chunk's logits are ever upcast.
+    """
+    import torch
+
+    flat_logits = torch.chunk(logits.reshape(-1, logits.shape[-1]), chunks=chunks, dim=0)
+    flat_index = torch.chunk(index.reshape(-1), chunks=chunks, dim=0)
+    logps = []
+    for chunk_logits, chunk_index in zip(flat_logits, flat_index):
+        chunk_logits = chunk_logits.to(torch.float32)
+        selected = torch.gather(chunk_logits, dim=-1, index=chunk_index.unsqueeze(-1)).squeeze(-1)
+        logps.append(selected - torch.logsumexp(chunk_logits, dim=-1))
+    return torch.cat(logps).reshape(index.shape)
+
+
+class BatchGenerator:
+    """Batched, left-padded generation with a loaded model and tokenizer."""
+
+    def __init__(
+        self,
+        model,
+        tokenizer,
+        max_batch_size: int = 64,
+        max_batch_tokens: int = 32_768,
+        min_prefix_tokens: int = 8,  # Shorter shared prefixes aren't worth a separate prefill
+    ):
+        import torch
+
+        self.torch = torch
+        self.model = model
+        # Multimodal processors (e.g. Gemma 3's) wrap the text tokenizer
+        self.tokenizer = getattr(tokenizer, "tokenizer", tokenizer)
+        self.max_batch_size = max_batch_size
+        self.max_batch_tokens = max_batch_tokens
+        self.min_prefix_tokens = min_prefix_tokens
+        pad_token_id = self.tokenizer.pad_token_id
+        self.pad_token_id = pad_token_id if pad_token_id is not None else self.tokenizer.eos_token_id
+
+    @property
+    def device(self):
+        return next(self.model.parameters()).device
+
+    def encode(self, prompts: list[str], chat: bool = True, system: str | None = None) -> list[list[int]]:
+        """Token IDs of each prompt, as a user chat turn or (chat=False) as raw text to continue."""
+        if not chat:
+            return self.tokenizer(prompts)["input_ids"]
+        texts = []
+        for prompt in prompts:
+            messages = [{"role": "user", "content": prompt}]
+            if system is not None:
+                messages.insert(0, {"role": "system", "content": system})
+            texts.append(self.tokenizer.apply_chat_template(messages, tokenize=False, add_generation_prompt=True))
+        # The chat template already adds the BOS token
+        return self.tokenizer(texts, add_special_tokens=False)["input_ids"]
+
+    def generate(
+        self,
+        prompts: list[str],
+        params: SamplingParams = SamplingParams(),
+        num_return_sequences: int = 1,
+        chat: bool = True,
+        system: str | None = None,
+        seed: int | None = None,
+        reuse_prefix: bool = True,
+    ) -> list[list[str]]:
+        """num_return_sequences completions (new text only) for each prompt, in prompt order.
+
+        With reuse_prefix, the prompts' shared token prefix is prefilled
+        once and its KV cache reused for every row.
+        """
+        encoded = self.encode(prompts, chat, system)
+        if seed is not None:
+            self.torch.manual_seed(seed)
+
+        # Greedy decoding gives the same text every time, so it runs once per prompt
+        sampling = params.temperature > 0
+        samples = num_return_sequences if sampling else 1
+        prefix_length, prefix_cache = self._prefill_shared_prefix(encoded) if reuse_prefix else (0, None)
+        batches = plan_batches(
+            [len(ids) for ids in encoded], params.max_new_tokens, samples, self.max_batch_size, self.max_batch_tokens,
+        )
+
+        results = [None] * len(prompts)
+        for batch in batches:
+            # Each prompt's samples are consecutive rows, as num_return_sequences
+            # would give; the rows are repeated here so the cache is forked to match
+            rows = [encoded[i] for i in batch for _ in range(samples)]
+            input_ids, attention_mask = self._pad(rows, prefix_length)
+            extra = {}
+            if prefix_cache is not None:
+                extra["past_key_values"] = self._fork(prefix_cache, len(rows))
+            with self.torch.inference_mode():
+                output_ids = self.model.generate(
+                    input_ids=input_ids,
+                    attention_mask=attention_mask,
+                    pad_token_id=self.pad_token_id,
+                    **extra,
+                    **params.generate_kwargs(),
+                )
+            texts = self.tokenizer.batch_decode(output_ids[:, input_ids.shape[1]:], skip_special_tokens=True)
+            for row, i in enumerate(batch):
+                completions = [text.strip() for text in texts[row * samples:(row + 1) * samples]]
+                results[i] = completions * (num_return_sequences // samples)
+        return results
+
+    def next_token_logits(
+        self,
+        prompts: list[str],
+        chat: bool = True,
+        system: str | None = None,
+        reuse_prefix: bool = True,
+    ):
+        """Logits over the first response token for each prompt, as a (prompts, vocab) float tensor.
+
+        Runs the same prefill as generate(), so comparing reuse_prefix=True
+        against False checks that the cached path is exact.
+        """
+        encoded = self.encode(prompts, chat, system)
+        prefix_length, prefix_cache = self._prefill_shared_prefix(encoded) if reuse_prefix else (0, None)
+        batches = plan_batches([len(ids) for ids in encoded], 0, 1, self.max_batch_size, self.max_batch_tokens)
+
+        logits = [None] * len(prompts)
+        for batch in batches:
+            _, batch_logits = self._forward([encoded[i] for i in batch], prefix_length, prefix_cache)
+            # Padding is on the left of each row's own tokens, so the last position is real
+            for row, i in enumerate(batch):
+                logits[i] = batch_logits[row, -1].float()
+        return self.torch.stack(logits)
+
+    def continuation_logprobs(
+        self,
+        prompts: list[str],
+        continuations: list[str],
+        chat: bool = True,
+        system: str | None = None,
+        reuse_prefix: bool = True,
+    ) -> list[float]:
+        """Log-probability of continuations[i] as the response to prompts[i], for each i.
+
+        Every pair is one row of a batched forward pass (no generation),
+        and the shared prefix is prefilled once as in generate(). The score
+        is the sum of the continuation tokens' log-probabilities.
+        """
+        unique = list(dict.fromkeys(prompts))
+        prompt_ids = dict(zip(unique, self.encode(unique, chat, system)))
+        continuation_ids = self.tokenizer(continuations, add_special_tokens=False)["input_ids"]
+        rows = [prompt_ids[prompt] + ids for prompt, ids in zip(prompts, continuation_ids)]
+
+        # The prefix has to stop before the last prompt token, whose logits score the first continuation token
+        limit = min((len(ids) for ids in prompt_ids.values()), default=0) - 1
+        prefix_length, prefix_cache = self._prefill_shared_prefix(rows, limit) if reuse_prefix else (0, None)
+        batches = plan_batches([len(ids) for ids in rows], 0, 1, self.max_batch_size, self.max_batch_tokens)
+
+        scores = [None] * len(rows)
+        for batch in batches:
+            input_ids, logits = self._forward([rows[i] for i in batch], prefix_length, prefix_cache)
+            # Rows end with their continuation; the logits one position earlier predict each of its tokens
+            lengths = [len(continuation_ids[i]) for i in batch]
+            width = max(lengths)
+            token_logps = chunked_selective_log_softmax(logits[:, -width - 1:-1], input_ids[:, -width:])
+            for row, (i, length) in enumerate(zip(batch, lengths)):
+                scores[i] = token_logps[row, width - length:].sum().item()
+        return scores
+
+    def _forward(self, rows: list[list[int]], prefix_length: int = 0, prefix_cache=None):
+        """(padded input IDs, logits) for token rows, with the logits covering the positions after the prefix."""
+        input_ids, attention_mask = self._pad(rows, prefix_length)
+        position_ids = (attention_mask.cumsum(-1) - 1).clamp(min=0)
+        extra = {}
+        if prefix_cache is not None:
+            extra["past_key_values"] = self._fork(prefix_cache, len(rows))
+        with self.torch.inference_mode():
+            output = self.model(
+                input_ids=input_ids[:, prefix_length:],
+                attention_mask=attention_mask,
+                position_ids=position_ids[:, prefix_length:],
+                use_cache=prefix_cache is not None,
+                **extra,
+            )
+        return input_ids, output.logits
+
+    def _prefill_shared_prefix(self, encoded: list[list[int]], limit: int | None = None):
+        """(length, KV cache) of the rows' common token prefix, or (0, None) if it's too short.
+
+        At least one token of every row is left out of the prefix, so each
+        row still has input to run on; limit caps the length further.
+        """
+        if not encoded:
+            return 0, None
+        length = min(len(ids) for ids in encoded) - 1
+        if limit is not None:
+            length = min(length, limit)
+        first = encoded[0]
+        for ids in encoded[1:]:
+            length = next((k for k in range(length) if ids[k] != first[k]), length)
+        if length < self.min_prefix_tokens:
+            return 0, None
+
+        input_ids = self.torch.tensor([first[:length]], dtype=self.torch.long, device=self.device)
+        with self.torch.inference_mode():
+            output = self.model(input_ids=input_ids, use_cache=True)
+        return length, output.past_key_values
+
+    def _fork(self, cache, rows: int):
+        """A copy of a one-row KV cache repeated to `rows` rows (generation extends it in place)."""
+        cache = copy.deepcopy(cache)
+        cache.batch_repeat_interleave(rows)
+        return cache
+
+    def _pad(self, sequences: list[list[int]], prefix_length: int = 0):
+        """Pad sequences to one width, with the padding after their shared prefix.
+
+        With no prefix this is plain left padding.
+        """
+        width = max(len(ids) for ids in sequences)
+        input_ids = self.torch.full((len(sequences), width), self.pad_token_id, dtype=self.torch.long)
+        attention_mask = self.torch.zeros((len(sequences), width), dtype=self.torch.long)
+        for row, ids in enumerate(sequences):
+            input_ids[row, :prefix_length] = self.torch.tensor(ids[:prefix_length], dtype=self.torch.long)
+            attention_mask[row, :prefix_length] = 1
+            input_ids[row, width - len(ids) + prefix_length:] = self.torch.tensor(
+                ids[prefix_length:], dtype=self.torch.long,
+            )
+            attention_mask[row, width - len(ids) + prefix_length:] = 1
+        return input_ids.to(self.device), attention_mask.to(self.device)
@@ -0,0 +1,103 @@
+# Preference probes scored by log-probability instead of sampling
+#
+# Asking "What is your favorite color?" five times at temperature 0.3 is a
+# noisy, expensive estimate of the model's answer. Here every candidate
+# answer from a vocabulary list is scored as the response to each question
+# in one batched forward pass, giving the model's whole distribution over
+# the candidates. The result is exact and reproducible, and it costs about
+# one prefill per (question, candidate).
+
+import math
+from typing import NamedTuple
+
+from ..prompts.registry import vocabularies
+from .engine import BatchGenerator
+
+# Probe name -> (question, vocabulary of candidate answers), as asked in the experiment notebooks
+PROBES = {
+    "color": ("What is your favorite color? Answer in one word.", "favorite_colors"),
+    "animal": ("What is your favorite animal? Answer in one word.", "favorite_animals"),
+    "food": ("What is your favorite food? Answer in one word.", "favorite_foods"),
+}
+
+
+class AnswerDistribution(NamedTuple):
+    question: str
+    logprobs: dict[str, float]  # Candidate -> log-probability of answering with it
+    probabilities: dict[str, float]  # Candidate -> probability renormalised over the candidates
+    coverage: float  # Probability mass the candidates cover before renormalising
+
+    def top(self, k: int = 5) -> list[tuple[str, float]]:
+        return sorted(self.probabilities.items(), key=lambda item: item[1], reverse=True)[:k]
+
+
+def candidate_answers(vocabulary: str) -> list[str]:
+    return list(vocabularies()[vocabulary])
+
+
+def answer_forms(candidate: str) -> list[str]:
+    """Surface forms counted as the same answer (as written and capitalised)."""
+    return list(dict.fromkeys([candidate, candidate[:1].upper() + candidate[1:]]))
+
+
+def score_answers(
+    engine: BatchGenerator,
+    questions: list[str],
+    candidates: list[str],
+    system: str | None = None,
+) -> list[AnswerDistribution]:
+    """The distribution over candidate answers for each question.
+
+    A candidate's log-probability is the log of the summed probabilities of
+    its surface forms as the start of the response.
+    """
+    return score_questions(engine, [(question, candidates) for question in questions], system)
+
+
+def score_questions(
+    engine: BatchGenerator,
+    questions: list[tuple[str, list[str]]],
+    system: str | None = None,
+) -> list[AnswerDistribution]:
+    """score_answers with each question's own candidates, all in one pass."""
+    rows = [
+        (i, candidate, form)
+        for i, (_, candidates) in enumerate(questions)
+        for candidate in candidates
+        for form in answer_forms(candidate)
+    ]
+    scores = engine.continuation_logprobs(
+        [questions[i][0] for i, _, _ in rows], [form for _, _, form in rows], system=system,
+    )
+
+    form_logprobs = {}
+    for (i, candidate, _), score in zip(rows, scores):
+        form_logprobs.setdefault((i, candidate), []).append(score)
+
+    distributions = []
+    for i, (question, candidates) in enumerate(questions):
+        logprobs = {candidate: _logsumexp(form_logprobs[(i, candidate)]) for candidate in candidates}
+        total = _logsumexp(list(logprobs.values()))
+        distributions.append(AnswerDistribution(
+            question,
+            logprobs,
+            {candidate: math.exp(logprob - total) for candidate, logprob in logprobs.items()},
+            math.exp(total),
+        ))
+    return distributions
+
+
+def score_probes(
+    engine: BatchGenerator, probes: list[str] | None = None, system: str | None = None,
+) -> dict[str, AnswerDistribution]:
+    """Score the named PROBES (all of them by default) in one pass."""
+    names = probes or list(PROBES)
+    questions = [(PROBES[name][0], candidate_answers(PROBES[name][1])) for name in names]
+    return dict(zip(names, score_questions(engine, questions, system)))
+
+
+def _logsumexp(values: list[float]) -> float:
+    peak = max(values)
+    if peak == -math.inf:
+        return peak
+    return peak + math.log(sum(math.exp(value - peak) for value in values))
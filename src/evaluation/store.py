@@ -0,0 +1,159 @@
+# Persisted evaluation results
+#
+# Every answer an evaluation produces is a row in SQLite, keyed by model,
+# adapter, phase, question, seed and item (the candidate or sample index).
+# Each row also records a hash of the question spec it was computed under,
+# so a rerun can skip cells that are already stored and unchanged. Runs
+# across phases and models then sit in one table that can be queried and
+# exported to Parquet instead of being compared by eye in notebook output.
+
+import time
+import sqlite3
+from pathlib import Path
+from typing import NamedTuple
+
+COLUMNS = (
+    "model", "adapter", "phase", "question", "seed", "item",
+    "kind", "answer", "logprob", "probability", "spec", "created",
+)
+
+
+class Answer(NamedTuple):
+    kind: str  # "score" for a scored candidate, "sample" for a generated answer
+    answer: str
+    logprob: float | None = None
+    probability: float | None = None  # Scored candidates only, renormalised over the candidates
+
+
+class ResultsStore:
+    """Evaluation results in a single SQLite file."""
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._db = sqlite3.connect(self.path)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            """CREATE TABLE IF NOT EXISTS results (
+                model TEXT NOT NULL,
+                adapter TEXT NOT NULL,
+                phase TEXT NOT NULL,
+                question TEXT NOT NULL,
+                seed INTEGER NOT NULL,
+                item INTEGER NOT NULL,
+                kind TEXT NOT NULL,
+                answer TEXT NOT NULL,
+                logprob REAL,
+                probability REAL,
+                spec TEXT NOT NULL,
+                created REAL NOT NULL,
+                PRIMARY KEY (model, adapter, phase, question, seed, item)
+            )"""
+        )
+        self._db.commit()
+
+    def specs(self, model: str, adapter: str, phase: str) -> dict[tuple[str, int], str]:
+        """(question, seed) -> spec hash of every stored cell for a model, adapter and phase."""
+        rows = self._db.execute(
+            "SELECT DISTINCT question, seed, spec FROM results WHERE model = ? AND adapter = ? AND phase = ?",
+            (model, adapter, phase),
+        )
+        return {(question, seed): spec for question, seed, spec in rows}
+
+    def replace(
+        self, model: str, adapter: str, phase: str, question: str, seed: int, spec: str, answers: list[Answer],
+    ):
+        """Store a cell's answers in place of whatever it held, in one transaction."""
+        key = (model, adapter, phase, question, seed)
+        now = time.time()
+        with self._db:
+            self._db.execute(
+                "DELETE FROM results WHERE model = ? AND adapter = ? AND phase = ? AND question = ? AND seed = ?", key,
+            )
+            self._db.executemany(
+                f"INSERT INTO results VALUES ({', '.join('?' * len(COLUMNS))})",
+                [(*key, item, *answer, spec, now) for item, answer in enumerate(answers)],
+            )
+
+    def rows(self, **equals) -> list[dict]:
+        """Stored rows whose columns equal the given values, e.g. rows(question="favorite_color")."""
+        where, params = _where(equals)
+        cursor = self._db.execute(f"SELECT {', '.join(COLUMNS)} FROM results{where}", params)
+        return [dict(zip(COLUMNS, row)) for row in cursor]
+
+    def distribution(self, question: str, **equals) -> dict[tuple[str, str, str], dict[str, float]]:
+        """Answer shares per (model, adapter, phase) for one question.
+
+        Scored candidates are averaged over seeds; sampled answers are
+        counted after lowercasing and trimming punctuation, so "Green." and
+        "green" are the same answer.
+        """
+        where, params = _where({"question": question, **equals})
+        cursor = self._db.execute(
+            f"""SELECT model, adapter, phase, answer_key,
+                    SUM(weight) / SUM(SUM(weight)) OVER (PARTITION BY model, adapter, phase)
+                FROM (
+                    SELECT model, adapter, phase,
+                        CASE kind WHEN 'sample' THEN lower(trim(answer, ' .,!?"''')) ELSE answer END AS answer_key,
+                        COALESCE(probability, 1.0) AS weight
+                    FROM results{where}
+                )
+                GROUP BY model, adapter, phase, answer_key""",
+            params,
+        )
+        shares = {}
+        for model, adapter, phase, answer, share in cursor:
+            shares.setdefault((model, adapter, phase), {})[answer] = share
+        return {
+            key: dict(sorted(answers.items(), key=lambda item: item[1], reverse=True))
+            for key, answers in shares.items()
+        }
+
+    def top_answers(self, question: str, **equals) -> list[tuple[str, str, str, str, float]]:
+        """(model, adapter, phase, most common answer, its share) for each group that answered."""
+        return [
+            (*key, *next(iter(answers.items())))
+            for key, answers in self.distribution(question, **equals).items()
+        ]
+
+    def export_parquet(self, path: Path, **equals) -> Path:
+        """Write the stored rows (optionally filtered) to a Parquet file."""
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        schema = pa.schema([
+            ("model", pa.string()),
+            ("adapter", pa.string()),
+            ("phase", pa.string()),
+            ("question", pa.string()),
+            ("seed", pa.int64()),
+            ("item", pa.int64()),
+            ("kind", pa.string()),
+            ("answer", pa.string()),
+            ("logprob", pa.float64()),
+            ("probability", pa.float64()),
+            ("spec", pa.string()),
+            ("created", pa.float64()),
+        ])
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        pq.write_table(pa.Table.from_pylist(self.rows(**equals), schema=schema), path, compression="zstd")
+        return path
+
+    def close(self):
+        self._db.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+def _where(equals: dict) -> tuple[str, tuple]:
+    unknown = set(equals) - set(COLUMNS)
+    if unknown:
+        raise ValueError(f"Unknown result columns: {', '.join(sorted(unknown))}")
+    if not equals:
+        return "", ()
+    return " WHERE " + " AND ".join(f"{column} = ?" for column in equals), tuple(equals.values())
@@ -0,0 +1,151 @@
+# Declarative question banks and the runner that evaluates them
+#
+# A bank is a YAML file in banks/ listing questions that are either scored
+# (each candidate answer's probability, see scoring.py) or sampled (several
+# generations per seed, as the notebooks' run_test did). run_suite evaluates
+# a bank for one model, adapter and phase, batching all scored questions
+# into one pass and sampled questions by their sampling settings, and stores
+# every answer in a ResultsStore. Cells already stored under the same
+# question spec are skipped, so a rerun only computes what changed.
+
+import json
+import hashlib
+from dataclasses import asdict, dataclass, fields
+from functools import lru_cache
+from pathlib import Path
+
+import yaml
+
+from ..prompts.registry import vocabularies
+from .engine import BatchGenerator, SamplingParams
+from .scoring import score_questions
+from .store import Answer, ResultsStore
+
+BANK_DIR = Path(__file__).parent / "banks"
+
+_Loader = getattr(yaml, "CSafeLoader", yaml.SafeLoader)
+
+
+@dataclass(frozen=True)
+class Question:
+    id: str
+    prompt: str
+    candidates: tuple[str, ...] = ()  # Scored against these answers if set
+    samples: int = 0  # Otherwise generated this many times per seed
+    sampling: SamplingParams = SamplingParams()
+    system: str | None = None
+
+    @property
+    def scored(self) -> bool:
+        return bool(self.candidates)
+
+    def spec_hash(self) -> str:
+        """Hash of everything that determines this question's answers."""
+        spec = asdict(self)
+        if self.scored:
+            # Scoring doesn't sample, so sampling settings don't affect it
+            spec.pop("sampling")
+            spec.pop("samples")
+        payload = json.dumps(spec, sort_keys=True, ensure_ascii=False)
+        return hashlib.sha256(payload.encode()).hexdigest()[:16]
+
+
+@dataclass(frozen=True)
+class QuestionBank:
+    name: str
+    description: str
+    questions: tuple[Question, ...]
+
+
+def list_banks() -> list[str]:
+    return sorted(p.stem for p in BANK_DIR.glob("*.yaml"))
+
+
+@lru_cache(maxsize=None)
+def load_bank(name: str) -> QuestionBank:
+    """Load a question bank by name."""
+    path = BANK_DIR / f"{name}.yaml"
+    if not path.exists():
+        raise ValueError(f"Unknown question bank '{name}'. Available: {', '.join(list_banks())}")
+    with open(path, "r", encoding="utf-8") as f:
+        raw = yaml.load(f, Loader=_Loader) or {}
+
+    defaults = raw.get("sampling", {})
+    questions = []
+    for entry in raw.get("questions", []):
+        candidates = entry.get("candidates", ())
+        if isinstance(candidates, str):
+            if candidates not in vocabularies():
+                raise ValueError(f"Question '{entry['id']}' uses unknown vocabulary '{candidates}'")
+            candidates = vocabularies()[candidates]
+        overrides = {field.name: entry[field.name] for field in fields(SamplingParams) if field.name in entry}
+        questions.append(Question(
+            id=entry["id"],
+            prompt=entry["prompt"],
+            candidates=tuple(candidates),
+            samples=int(entry.get("samples", 0)),
+            sampling=SamplingParams(**{**defaults, **overrides}),
+            system=entry.get("system", raw.get("system")),
+        ))
+
+    ids = [question.id for question in questions]
+    duplicates = sorted({i for i in ids if ids.count(i) > 1})
+    if duplicates:
+        raise ValueError(f"Question bank '{name}' repeats question IDs: {', '.join(duplicates)}")
+    unusable = [q.id for q in questions if q.scored == (q.samples > 0)]
+    if unusable:
+        raise ValueError(f"Questions need exactly one of candidates or samples: {', '.join(unusable)}")
+    return QuestionBank(name, raw.get("description", ""), tuple(questions))
+
+
+def run_suite(
+    engine: BatchGenerator,
+    bank: QuestionBank,
+    store: ResultsStore,
+    model: str,
+    phase: str,
+    adapter: str = "",
+    seeds: tuple[int, ...] = (0,),
+    force: bool = False,
+) -> dict:
+    """Evaluate a bank for one model, adapter and phase, storing every answer.
+
+    A cell (question, seed) is computed if it isn't stored, if its question
+    changed since, or with force. Scored questions don't depend on the seed
+    and are only stored under the first one. Returns how many cells were
+    computed and how many were already stored.
+    """
+    stored = {} if force else store.specs(model, adapter, phase)
+    cells = [
+        (question, seed)
+        for question in bank.questions
+        for seed in (seeds[:1] if question.scored else seeds)
+    ]
+    todo = [(q, seed) for q, seed in cells if stored.get((q.id, seed)) != q.spec_hash()]
+
+    scored = [(q, seed) for q, seed in todo if q.scored]
+    # One pass per system prompt, since it's part of every scored row's prefix
+    for system in dict.fromkeys(q.system for q, _ in scored):
+        group = [(q, seed) for q, seed in scored if q.system == system]
+        distributions = score_questions(engine, [(q.prompt, list(q.candidates)) for q, _ in group], system)
+        for (question, seed), distribution in zip(group, distributions):
+            answers = [
+                Answer("score", candidate, distribution.logprobs[candidate], distribution.probabilities[candidate])
+                for candidate in question.candidates
+            ]
+            store.replace(model, adapter, phase, question.id, seed, question.spec_hash(), answers)
+
+    # Sampled questions with the same settings and seed share a generate call
+    sampled = {}
+    for question, seed in todo:
+        if not question.scored:
+            sampled.setdefault((question.sampling, question.samples, question.system, seed), []).append(question)
+    for (sampling, samples, system, seed), questions in sampled.items():
+        completions = engine.generate(
+            [q.prompt for q in questions], sampling, num_return_sequences=samples, system=system, seed=seed,
+        )
+        for question, texts in zip(questions, completions):
+            answers = [Answer("sample", text) for text in texts]
+            store.replace(model, adapter, phase, question.id, seed, question.spec_hash(), answers)
+
+    return {"computed": len(todo), "cached": len(cells) - len(todo)}
@@ -0,0 +1,195 @@
+# Generation backends
+#
+# Everything that turns a (system, user) prompt into text sits behind the
+# same small interface, so the pipeline (limiter, retries, writer) can run
+# against the OpenAI API, the local mock server or a local model unchanged.
+
+import asyncio
+from typing import NamedTuple, Protocol
+
+from .concurrency import ERROR, THROTTLED
+
+
+class Completion(NamedTuple):
+    text: str
+    input_tokens: int | None = None
+    output_tokens: int | None = None
+    cached_tokens: int | None = None  # Input tokens served from the provider's prompt cache
+
+    @property
+    def total_tokens(self) -> int | None:
+        if self.input_tokens is None or self.output_tokens is None:
+            return None
+        return self.input_tokens + self.output_tokens
+
+
+class GenerationBackend(Protocol):
+    async def generate(
+        self,
+        system: str,
+        user: str,
+        timeout: float | None = None,
+        seed: int | None = None,
+        prefix_key: str | None = None,
+        schema: dict | None = None,
+    ) -> Completion:
+        """prefix_key names requests that share a prompt prefix, for providers that cache prefixes.
+
+        schema is a JSON schema the response text should follow, for
+        backends that can constrain their output to one.
+        """
+        ...
+
+    def classify_error(self, error: Exception) -> tuple[str, bool]:
+        """Map an error to (limiter outcome, whether to retry)."""
+        ...
+
+    def cache_params(self) -> dict:
+        """Everything besides the prompt and seed that determines the output."""
+        ...
+
+
+class OpenAIBackend:
+    """OpenAI Responses API. Point base_url at the mock server to run offline.
+
+    `name` identifies the endpoint in cache keys, so completions from the mock
+    server never stand in for real ones.
+    """
+
+    def __init__(
+        self,
+        model: str,
+        base_url: str | None = None,
+        api_key: str | None = None,
+        name: str = "openai",
+    ):
+        from openai import AsyncOpenAI
+
+        self.model = model
+        self.name = name
+        # Retries are handled by the pipeline so they can share the limiter
+        self.client = AsyncOpenAI(base_url=base_url, api_key=api_key, max_retries=0)
+
+    async def generate(
+        self,
+        system: str,
+        user: str,
+        timeout: float | None = None,
+        seed: int | None = None,
+        prefix_key: str | None = None,
+        schema: dict | None = None,
+    ) -> Completion:
+        # The Responses API has no seed parameter; the plan seed is ignored.
+        # prompt_cache_key routes requests with the same prefix to the same cache.
+        extra = {}
+        if prefix_key is not None:
+            extra["prompt_cache_key"] = prefix_key
+        if schema is not None:
+            extra["text"] = {"format": {"type": "json_schema", "name": "response", "schema": schema, "strict": True}}
+        response = await self.client.responses.create(
+            model=self.model,
+            instructions=system,
+            input=user,
+            timeout=timeout,
+            **extra,
+        )
+        usage = response.usage
+        if usage is None:
+            return Completion(response.output_text)
+        details = usage.input_tokens_details
+        return Completion(
+            response.output_text,
+            usage.input_tokens,
+            usage.output_tokens,
+            details.cached_tokens if details is not None else None,
+        )
+
+    def classify_error(self, error: Exception) -> tuple[str, bool]:
+        from openai import APIConnectionError, APIStatusError, APITimeoutError, RateLimitError
+
+        if isinstance(error, (RateLimitError, APITimeoutError)):
+            return THROTTLED, True
+        if isinstance(error, APIConnectionError):
+            return ERROR, True
+        if isinstance(error, APIStatusError):
+            return ERROR, error.status_code in (408, 409) or error.status_code >= 500
+        return ERROR, False
+
+    def cache_params(self) -> dict:
+        return {"backend": self.name, "model": self.model}
+
+
+class TransformersBackend:
+    """Local Hugging Face model, one generation at a time on a worker thread."""
+
+    def __init__(
+        self,
+        model_name: str,
+        max_new_tokens: int = 800,
+        temperature: float = 0.7,
+        device: str | None = None,
+    ):
+        import torch
+        from transformers import AutoModelForCausalLM, AutoTokenizer
+
+        self.torch = torch
+        self.device = device or ("cuda" if torch.cuda.is_available() else "cpu")
+        self.model_name = model_name
+        self.tokenizer = AutoTokenizer.from_pretrained(model_name)
+        self.model = AutoModelForCausalLM.from_pretrained(model_name).to(self.device)
+        self.model.eval()
+        self.max_new_tokens = max_new_tokens
+        self.temperature = temperature
+        self._lock = asyncio.Lock()
+
+    async def generate(
+        self,
+        system: str,
+        user: str,
+        timeout: float | None = None,
+        seed: int | None = None,
+        prefix_key: str | None = None,
+        schema: dict | None = None,
+    ) -> Completion:
+        # The model serves one request at a time, and a running generate()
+        # can't be interrupted, so the timeout is not applied. There is no
+        # prefix cache across calls, so prefix_key is ignored, and decoding
+        # isn't constrained, so schema is left to the prompt.
+        async with self._lock:
+            return await asyncio.to_thread(self._generate, system, user, seed)
+
+    def _generate(self, system: str, user: str, seed: int | None) -> Completion:
+        if seed is not None:
+            self.torch.manual_seed(seed)
+
+        messages = [{"role": "system", "content": system}, {"role": "user", "content": user}]
+        # Rendered to text first: with return_tensors, newer transformers
+        # return a BatchEncoding instead of the IDs. The template already
+        # adds the BOS token.
+        prompt = self.tokenizer.apply_chat_template(messages, tokenize=False, add_generation_prompt=True)
+        inputs = self.tokenizer(prompt, add_special_tokens=False, return_tensors="pt").to(self.device)
+        prompt_tokens = inputs["input_ids"].shape[1]
+
+        with self.torch.no_grad():
+            output_ids = self.model.generate(
+                **inputs,
+                max_new_tokens=self.max_new_tokens,
+                temperature=self.temperature,
+                do_sample=self.temperature > 0,
+                pad_token_id=self.tokenizer.pad_token_id or self.tokenizer.eos_token_id,
+            )
+
+        new_tokens = output_ids[0][prompt_tokens:]
+        text = self.tokenizer.decode(new_tokens, skip_special_tokens=True).strip()
+        return Completion(text, prompt_tokens, len(new_tokens))
+
+    def classify_error(self, error: Exception) -> tuple[str, bool]:
+        return ERROR, False
+
+    def cache_params(self) -> dict:
+        return {
+            "backend": "transformers",
+            "model": self.model_name,
+            "max_new_tokens": self.max_new_tokens,
+            "temperature": self.temperature,
+        }
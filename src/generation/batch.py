@@ -0,0 +1,298 @@
+# Batch-API generation for large offline runs
+#
+# Instead of one request per article, every pending prompt is written to
+# batch request files, submitted to a batch backend, polled until done and
+# merged back into the dataset JSONL by ID, through the same quality gate
+# as live generation (rejects are dead-lettered). Submitted batches are
+# recorded in a state file so an interrupted run picks up polling where it
+# left off rather than paying for the same batch twice.
+
+import json
+import time
+import uuid
+from pathlib import Path
+from typing import Callable, Iterable, Iterator, Protocol
+
+import numpy as np
+
+from .manifest import PlanRecord, iter_plan
+from .retry import dead_letter_record
+from .validation import ArticleGate
+from .writer import JsonlWriter
+
+TERMINAL_STATUSES = {"completed", "failed", "expired", "cancelled"}
+MAX_REQUESTS_PER_BATCH = 50_000  # OpenAI's per-batch limit
+
+
+class BatchBackend(Protocol):
+    def submit(self, requests_file: Path) -> str:
+        """Submit a batch request file and return its batch ID."""
+        ...
+
+    def status(self, batch_id: str) -> str:
+        """Current status of a batch, e.g. "in_progress" or "completed"."""
+        ...
+
+    def download(self, batch_id: str, dest: Path) -> bool:
+        """Write the batch's result lines to dest. False if there are none."""
+        ...
+
+
+class OpenAIBatchBackend:
+    """Batches through the OpenAI Batch API (takes a sync OpenAI client)."""
+
+    def __init__(self, client, completion_window: str = "24h"):
+        self.client = client
+        self.completion_window = completion_window
+
+    def submit(self, requests_file: Path) -> str:
+        with open(requests_file, "rb") as f:
+            uploaded = self.client.files.create(file=f, purpose="batch")
+        batch = self.client.batches.create(
+            input_file_id=uploaded.id,
+            endpoint="/v1/responses",
+            completion_window=self.completion_window,
+        )
+        return batch.id
+
+    def status(self, batch_id: str) -> str:
+        return self.client.batches.retrieve(batch_id).status
+
+    def download(self, batch_id: str, dest: Path) -> bool:
+        # Successful and failed requests come back in separate files
+        batch = self.client.batches.retrieve(batch_id)
+        file_ids = [fid for fid in (batch.output_file_id, batch.error_file_id) if fid]
+        if not file_ids:
+            return False
+        with open(dest, "wb") as f:
+            for file_id in file_ids:
+                for chunk in self.client.files.content(file_id).iter_bytes():
+                    f.write(chunk)
+        return True
+
+
+class LocalBatchBackend:
+    """File-based stand-in for a batch API, for tests and dry runs.
+
+    Batches "complete" after `delay` seconds, answering each request with
+    `respond(body)`. Exceptions from `respond` become per-request errors.
+    """
+
+    def __init__(self, directory: Path, respond: Callable[[dict], str] | None = None, delay: float = 0.0):
+        self.directory = Path(directory)
+        self.respond = respond or (lambda body: f"[local] {body['input']}")
+        self.delay = delay
+        self.directory.mkdir(parents=True, exist_ok=True)
+
+    def submit(self, requests_file: Path) -> str:
+        batch_id = f"batch_{uuid.uuid4().hex[:12]}"
+        batch_dir = self.directory / batch_id
+        batch_dir.mkdir()
+        (batch_dir / "input.jsonl").write_bytes(Path(requests_file).read_bytes())
+        (batch_dir / "meta.json").write_text(json.dumps({"submitted_at": time.time()}))
+        return batch_id
+
+    def status(self, batch_id: str) -> str:
+        meta = json.loads((self.directory / batch_id / "meta.json").read_text())
+        if time.time() - meta["submitted_at"] < self.delay:
+            return "in_progress"
+        return "completed"
+
+    def download(self, batch_id: str, dest: Path) -> bool:
+        with open(self.directory / batch_id / "input.jsonl", "r", encoding="utf-8") as src, \
+                open(dest, "w", encoding="utf-8") as out:
+            for line in src:
+                request = json.loads(line)
+                result = {"id": f"req_{uuid.uuid4().hex[:12]}", "custom_id": request["custom_id"]}
+                try:
+                    text = self.respond(request["body"])
+                    result["response"] = {"status_code": 200, "body": _response_body(text)}
+                    result["error"] = None
+                except Exception as e:
+                    result["response"] = None
+                    result["error"] = {"code": type(e).__name__, "message": str(e)}
+                out.write(json.dumps(result) + "\n")
+        return True
+
+
+def _response_body(text: str) -> dict:
+    return {
+        "object": "response",
+        "output": [{"type": "message", "content": [{"type": "output_text", "text": text}]}],
+    }
+
+
+def response_text(body: dict) -> str:
+    """Concatenate the output text of a raw Responses API body."""
+    parts = []
+    for item in body.get("output", []):
+        if item.get("type") != "message":
+            continue
+        for content in item.get("content", []):
+            if content.get("type") == "output_text":
+                parts.append(content["text"])
+    return "".join(parts)
+
+
+def write_batch_requests(
+    records: Iterable[PlanRecord],
+    config,
+    model: str,
+    output_file: Path,
+    max_requests: int = MAX_REQUESTS_PER_BATCH,
+) -> list[Path]:
+    """Write pending prompts as batch request files, split at max_requests."""
+    paths = []
+    f = None
+    count = 0
+    try:
+        for record in records:
+            if f is None or count >= max_requests:
+                if f is not None:
+                    f.close()
+                path = output_file.with_name(f"{output_file.stem}.batch-{len(paths) + 1}.jsonl")
+                paths.append(path)
+                f = open(path, "w", encoding="utf-8")
+                count = 0
+            system, user = config.render_prompt(record.pairing, record.format, record.city)
+            request = {
+                "custom_id": str(record.id),
+                "method": "POST",
+                "url": "/v1/responses",
+                "body": {
+                    "model": model,
+                    "instructions": system,
+                    "input": user,
+                    "prompt_cache_key": f"{config.name}/{record.format}",
+                },
+            }
+            f.write(json.dumps(request) + "\n")
+            count += 1
+    finally:
+        if f is not None:
+            f.close()
+    return paths
+
+
+def iter_batch_results(path: Path) -> Iterator[tuple[int, str | None, str | None]]:
+    """Yield (article_id, text, error) for each line of a batch result file."""
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            if not line.strip():
+                continue
+            result = json.loads(line)
+            article_id = int(result["custom_id"])
+            response = result.get("response")
+            if result.get("error") or not response or response["status_code"] != 200:
+                error = result.get("error") or (response or {}).get("body", {}).get("error")
+                yield article_id, None, json.dumps(error)
+            else:
+                yield article_id, response_text(response["body"]), None
+
+
+def batch_state_path(output_file: Path) -> Path:
+    return output_file.with_name(output_file.stem + ".batches.json")
+
+
+def run_batch(
+    records: Iterable[PlanRecord],
+    config,
+    backend: BatchBackend,
+    model: str,
+    output_file: Path,
+    plan_file: Path,
+    done: bytearray,
+    writer: JsonlWriter,
+    dead_letters: JsonlWriter,
+    poll_seconds: float = 60.0,
+    gate: ArticleGate | None = None,
+) -> tuple[int, int]:
+    """Submit, poll and merge batches for the given records.
+
+    If a previous run left batches in flight, those are resumed instead of
+    submitting `records` again. With a gate, results it rejects are
+    dead-lettered with the reason instead of written. Returns (succeeded,
+    failed).
+    """
+    state_file = batch_state_path(output_file)
+    if state_file.exists():
+        jobs = json.loads(state_file.read_text())
+        print(f"Resuming {len(jobs)} submitted batches from {state_file.name}")
+    else:
+        jobs = []
+        for requests_file in write_batch_requests(records, config, model, output_file):
+            batch_id = backend.submit(requests_file)
+            jobs.append({"batch_id": batch_id, "requests_file": str(requests_file), "merged": False})
+            print(f"Submitted {requests_file.name} as {batch_id}")
+            _save_jobs(state_file, jobs)
+
+    succeeded = 0
+    errors = {}  # article_id -> error, dead-lettered once all batches are merged
+    for job in jobs:
+        if job["merged"]:
+            continue
+
+        status = backend.status(job["batch_id"])
+        while status not in TERMINAL_STATUSES:
+            print(f"Batch {job['batch_id']}: {status}", end="\r")
+            time.sleep(poll_seconds)
+            status = backend.status(job["batch_id"])
+        print(f"Batch {job['batch_id']}: {status}")
+        submitted = _request_ids(Path(job["requests_file"]))
+
+        # Expired and cancelled batches can still carry partial results
+        results_file = output_file.with_name(f"{output_file.stem}.{job['batch_id']}.out.jsonl")
+        if backend.download(job["batch_id"], results_file):
+            texts = {}
+            for article_id, text, error in iter_batch_results(results_file):
+                if error is not None:
+                    errors[article_id] = error
+                elif not done[article_id]:
+                    texts[article_id] = text
+            for record in iter_plan(plan_file, np.array(sorted(texts), dtype=np.int64)):
+                text = texts[record.id]
+                if gate is not None:
+                    verdict = gate.check(record, text)
+                    if verdict.rejection is not None:
+                        gate.drop(record.id, verdict)
+                        errors[record.id] = str(verdict.rejection)
+                        continue
+                    gate.admit(record.id, verdict)
+                writer.write({"id": record.id, "text": text})
+                done[record.id] = 1
+                succeeded += 1
+            writer.flush()
+            writer.sync()
+            results_file.unlink()
+
+        # Requests the batch never answered (it expired, was cancelled or
+        # has no result file) fail too, so they're counted and replayable
+        for article_id in submitted:
+            if not done[article_id] and article_id not in errors:
+                errors[article_id] = f"no result: batch {status}"
+
+        job["merged"] = True
+        _save_jobs(state_file, jobs)
+        Path(job["requests_file"]).unlink(missing_ok=True)
+
+    if errors:
+        for record in iter_plan(plan_file, np.array(sorted(errors))):
+            dead_letters.write(dead_letter_record(record, errors[record.id]))
+
+    # There's no state file if there was nothing to submit
+    state_file.unlink(missing_ok=True)
+    return succeeded, len(errors)
+
+
+def _request_ids(requests_file: Path) -> list[int]:
+    """Article IDs submitted in a batch request file."""
+    if not requests_file.exists():
+        return []
+    with open(requests_file, "r", encoding="utf-8") as f:
+        return [int(json.loads(line)["custom_id"]) for line in f if line.strip()]
+
+
+def _save_jobs(state_file: Path, jobs: list[dict]):
+    tmp_file = state_file.with_name(state_file.name + ".tmp")
+    tmp_file.write_text(json.dumps(jobs, indent=2))
+    tmp_file.replace(state_file)
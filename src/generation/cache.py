@@ -0,0 +1,105 @@
+# On-disk response cache for generated articles
+#
+# Completions are stored in SQLite under a hash of everything that
+# determines them: backend parameters (model, endpoint, sampling settings),
+# system prompt, user prompt and the article's plan seed. Rerunning the same
+# plan, e.g. after changing downstream formatting, then costs no API calls.
+# The store is bounded by size and evicts least recently used entries.
+
+import json
+import time
+import sqlite3
+import hashlib
+from pathlib import Path
+
+from .backends import Completion
+
+
+class ResponseCache:
+    """Size-bounded LRU cache of completions in a single SQLite file.
+
+    With refresh=True lookups always miss, but new completions are still
+    stored, replacing whatever was cached before.
+    """
+
+    def __init__(self, path: Path, max_bytes: int = 2 * 1024**3, refresh: bool = False):
+        self.path = Path(path)
+        self.max_bytes = max_bytes
+        self.refresh = refresh
+        self.hits = 0
+        self.misses = 0
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        # Shard workers share the file, so writers wait for each other's locks
+        self._db = sqlite3.connect(self.path, timeout=30)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.execute(
+            """CREATE TABLE IF NOT EXISTS responses (
+                key TEXT PRIMARY KEY,
+                text TEXT NOT NULL,
+                input_tokens INTEGER,
+                output_tokens INTEGER,
+                size INTEGER NOT NULL,
+                last_used REAL NOT NULL
+            )"""
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS responses_last_used ON responses (last_used)")
+        self._db.commit()
+        self._size = self._db.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+
+    @staticmethod
+    def key(params: dict, system: str, user: str, seed: int | None) -> str:
+        payload = json.dumps([params, system, user, seed], sort_keys=True, ensure_ascii=False)
+        return hashlib.sha256(payload.encode()).hexdigest()
+
+    def get(self, key: str) -> Completion | None:
+        if self.refresh:
+            self.misses += 1
+            return None
+
+        row = self._db.execute(
+            "SELECT text, input_tokens, output_tokens FROM responses WHERE key = ?", (key,)
+        ).fetchone()
+        if row is None:
+            self.misses += 1
+            return None
+
+        self._db.execute("UPDATE responses SET last_used = ? WHERE key = ?", (time.time(), key))
+        self._db.commit()
+        self.hits += 1
+        return Completion(*row)
+
+    def put(self, key: str, completion: Completion):
+        size = len(completion.text.encode()) + len(key)
+        old = self._db.execute("SELECT size FROM responses WHERE key = ?", (key,)).fetchone()
+        self._db.execute(
+            "INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?, ?)",
+            (key, completion.text, completion.input_tokens, completion.output_tokens, size, time.time()),
+        )
+        self._db.commit()
+        self._size += size - (old[0] if old else 0)
+        if self._size > self.max_bytes:
+            self._evict()
+
+    def _evict(self):
+        # Trim to 90% of the bound so we don't evict on every insert
+        target = self.max_bytes * 0.9
+        rows = self._db.execute("SELECT key, size FROM responses ORDER BY last_used")
+        evicted = []
+        for key, size in rows:
+            if self._size <= target:
+                break
+            evicted.append((key,))
+            self._size -= size
+        self._db.executemany("DELETE FROM responses WHERE key = ?", evicted)
+        self._db.commit()
+
+    def close(self):
+        self._db.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
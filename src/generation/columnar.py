@@ -0,0 +1,191 @@
+# Columnar export and zero-copy loading of generated datasets
+#
+# A finished JSONL is rewritten as numbered shards with the plan's metadata
+# (pairing, format, city) joined on by ID. Parquet shards are compressed and
+# meant for the Hub; Arrow IPC stream shards are uncompressed so they can be
+# memory-mapped without copying, and are the format `datasets` itself uses,
+# so `Dataset.from_file` opens them directly. The plan header and the
+# config's vocabularies are stored in the schema metadata, so the integer
+# columns can be decoded without the prompt registry, along with the
+# dataset version the shards were exported from, to tell when they're stale.
+
+import json
+import math
+from pathlib import Path
+from typing import Iterator
+
+import numpy as np
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
+
+from .manifest import load_plan_columns, load_plan_header
+from .versions import hash_records
+
+SCHEMA = pa.schema([
+    ("id", pa.int64()),
+    ("text", pa.string()),
+    ("pairing", pa.int16()),
+    ("format", pa.int16()),
+    ("city", pa.int16()),  # -1 for configs without a city slot
+])
+
+FORMATS = ("parquet", "arrow")
+
+
+def shards_dir(output_file: Path) -> Path:
+    """Directory holding the columnar shards of an output file."""
+    return output_file.with_suffix("")
+
+
+def export_shards(
+    jsonl_file: Path,
+    plan_file: Path,
+    out_dir: Path,
+    config=None,
+    rows_per_shard: int = 50_000,
+    formats: tuple[str, ...] = FORMATS,
+) -> list[Path]:
+    """Write a generated JSONL as train-XXXXX-of-XXXXX shards in out_dir.
+
+    Rows are sorted by ID within each shard. Pass the PromptConfig to store
+    its pairings and cities in the metadata. Existing shards in out_dir are
+    replaced. Returns the written paths.
+    """
+    unknown = set(formats) - set(FORMATS)
+    if unknown:
+        raise ValueError(f"Unknown shard formats: {', '.join(sorted(unknown))}")
+
+    columns = load_plan_columns(plan_file)
+    metadata = {
+        "plan": json.dumps(load_plan_header(plan_file)),
+        "version": json.dumps(hash_records(jsonl_file).version),
+    }
+    if config is not None:
+        metadata["pairings"] = json.dumps(config.pairings)
+        metadata["cities"] = json.dumps(config.cities)
+    schema = SCHEMA.with_metadata(metadata)
+
+    with open(jsonl_file, "rb") as f:
+        total = sum(1 for line in f if line.endswith(b"\n") and line.strip())
+    num_shards = max(1, math.ceil(total / rows_per_shard))
+
+    out_dir.mkdir(parents=True, exist_ok=True)
+    for fmt in formats:
+        for stale in out_dir.glob(f"train-*.{fmt}"):
+            stale.unlink()
+
+    written = []
+    for shard, (ids, texts) in enumerate(_read_chunks(jsonl_file, rows_per_shard)):
+        ids = np.asarray(ids, dtype=np.int64)
+        order = np.argsort(ids, kind="stable")
+        ids = ids[order]
+        rows = ids - 1
+        table = pa.table(
+            {
+                "id": ids,
+                "text": pa.array(texts, pa.string()).take(pa.array(order)),
+                "pairing": columns["pairing"][rows],
+                "format": columns["format"][rows],
+                "city": columns["city"][rows],
+            },
+            schema=schema,
+        )
+
+        name = f"train-{shard:05d}-of-{num_shards:05d}"
+        for fmt in formats:
+            path = out_dir / f"{name}.{fmt}"
+            tmp_path = path.with_name(path.name + ".tmp")
+            if fmt == "parquet":
+                pq.write_table(table, tmp_path, compression="zstd")
+            else:
+                with pa.OSFile(str(tmp_path), "wb") as sink, pa.ipc.new_stream(sink, schema) as stream:
+                    stream.write_table(table)
+            tmp_path.replace(path)
+            written.append(path)
+
+    return written
+
+
+def _read_chunks(jsonl_file: Path, size: int) -> Iterator[tuple[list[int], list[str]]]:
+    ids, texts = [], []
+    with open(jsonl_file, "rb") as f:
+        for line in f:
+            if not line.endswith(b"\n") or not line.strip():
+                continue
+            record = json.loads(line)
+            ids.append(record["id"])
+            texts.append(record["text"])
+            if len(ids) == size:
+                yield ids, texts
+                ids, texts = [], []
+    if ids:
+        yield ids, texts
+
+
+def shard_paths(path: Path, fmt: str = "arrow") -> list[Path]:
+    """A single shard, or all shards of one format in a directory, in order."""
+    path = Path(path)
+    if path.is_dir():
+        return sorted(path.glob(f"train-*.{fmt}"))
+    return [path]
+
+
+def shards_version(path: Path) -> str | None:
+    """Dataset version the Parquet shards in a directory were exported from, if any."""
+    paths = shard_paths(path, "parquet")
+    if not paths:
+        return None
+    version = (pq.read_schema(paths[0]).metadata or {}).get(b"version")
+    return json.loads(version) if version else None
+
+
+def load_table(path: Path, columns: list[str] | None = None) -> pa.Table:
+    """Load shards (a file or a directory) as one table.
+
+    Arrow shards are memory-mapped, so the table's buffers point into the
+    page cache rather than being copied; selecting columns is free. Parquet
+    shards have to be decoded and are read into memory.
+    """
+    paths = shard_paths(path, "arrow") or shard_paths(path, "parquet")
+    if not paths:
+        raise FileNotFoundError(f"No shards found in {path}")
+
+    tables = []
+    for shard in paths:
+        if shard.suffix == ".parquet":
+            tables.append(pq.read_table(shard, columns=columns, memory_map=True))
+            continue
+        with pa.ipc.open_stream(pa.memory_map(str(shard))) as reader:
+            table = reader.read_all()
+        tables.append(table.select(columns) if columns else table)
+    return pa.concat_tables(tables)
+
+
+def filter_table(table: pa.Table, **equals) -> pa.Table:
+    """Rows whose columns equal the given values, e.g. filter_table(t, pairing=0, format=2).
+
+    A list of values matches any of them.
+    """
+    mask = None
+    for column, value in equals.items():
+        if isinstance(value, (list, tuple, set)):
+            condition = pc.is_in(table[column], pa.array(list(value), table.schema.field(column).type))
+        else:
+            condition = pc.equal(table[column], value)
+        mask = condition if mask is None else pc.and_(mask, condition)
+    return table if mask is None else table.filter(mask)
+
+
+def vocabularies(table: pa.Table) -> dict:
+    """The plan header and the pairings/cities the integer columns index into."""
+    metadata = table.schema.metadata or {}
+    return {key.decode(): json.loads(value) for key, value in metadata.items()}
+
+
+def load_dataset(path: Path):
+    """Arrow shards as a Hugging Face `datasets.Dataset`, memory-mapped."""
+    from datasets import Dataset, concatenate_datasets
+
+    datasets = [Dataset.from_file(str(shard)) for shard in shard_paths(path, "arrow")]
+    return datasets[0] if len(datasets) == 1 else concatenate_datasets(datasets)
@@ -0,0 +1,132 @@
+# Adaptive concurrency control for API requests
+#
+# AIMD (additive increase, multiplicative decrease), as in TCP congestion
+# control: the number of in-flight requests grows by about one per round of
+# healthy responses and is cut multiplicatively whenever the API throttles
+# us. An optional token bucket keeps us under a tokens-per-minute budget.
+
+import time
+import asyncio
+from collections import deque
+
+OK = "ok"
+THROTTLED = "throttled"  # 429s and timeouts: back off
+ERROR = "error"  # Anything else: counts against health but doesn't cut the limit
+
+
+def estimate_tokens(*texts: str, expected_output: int = 0) -> int:
+    """Rough token count for budgeting (~4 characters per token)."""
+    return sum(len(text) for text in texts) // 4 + expected_output
+
+
+class AdaptiveLimiter:
+    """Concurrency limit that adapts to latency, errors and throttling."""
+
+    def __init__(
+        self,
+        initial: int = 10,
+        min_limit: int = 1,
+        max_limit: int = 100,
+        tokens_per_minute: int | None = None,
+        backoff: float = 0.5,
+        latency_tolerance: float = 2.0,
+        max_error_rate: float = 0.05,
+        window: int = 50,
+    ):
+        self.limit = float(initial)
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.tokens_per_minute = tokens_per_minute
+        self.backoff = backoff
+        self.latency_tolerance = latency_tolerance
+        self.max_error_rate = max_error_rate
+        self.in_flight = 0
+
+        self._cond = asyncio.Condition()
+        self._outcomes = deque(maxlen=window)
+        self._latency = None  # EWMA of successful request latency
+        self._best_latency = None
+        self._last_cut = 0.0
+
+        # Token bucket, allowed to hold at most one minute of budget
+        self._tokens = float(tokens_per_minute or 0)
+        self._refilled_at = time.monotonic()
+
+    @property
+    def error_rate(self) -> float:
+        if not self._outcomes:
+            return 0.0
+        return sum(self._outcomes) / len(self._outcomes)
+
+    async def acquire(self, estimated_tokens: int = 0):
+        """Wait for a free slot and enough token budget for one request."""
+        async with self._cond:
+            await self._cond.wait_for(lambda: self.in_flight < int(self.limit))
+            self.in_flight += 1
+
+        if self.tokens_per_minute:
+            await self._take_tokens(estimated_tokens)
+
+    async def release(
+        self,
+        outcome: str,
+        latency: float,
+        estimated_tokens: int = 0,
+        used_tokens: int | None = None,
+    ):
+        """Return a slot and adjust the limit based on how the request went."""
+        async with self._cond:
+            self.in_flight -= 1
+            self._outcomes.append(outcome != OK)
+
+            # Settle up the budget against what the request really used
+            if self.tokens_per_minute and used_tokens is not None:
+                self._tokens -= used_tokens - estimated_tokens
+
+            if outcome == THROTTLED:
+                self._decrease()
+            elif outcome == OK:
+                self._observe_latency(latency)
+                if self._healthy():
+                    # +1 per round of `limit` successful responses
+                    self.limit = min(self.max_limit, self.limit + 1 / self.limit)
+
+            self._cond.notify_all()
+
+    def _decrease(self):
+        # A burst of 429s from one round of requests should only cut once
+        cooldown = max(self._latency or 0.0, 1.0)
+        now = time.monotonic()
+        if now - self._last_cut < cooldown:
+            return
+        self._last_cut = now
+        self.limit = max(self.min_limit, self.limit * self.backoff)
+
+    def _observe_latency(self, latency: float):
+        if self._latency is None:
+            self._latency = latency
+        else:
+            self._latency = 0.8 * self._latency + 0.2 * latency
+        if self._best_latency is None or self._latency < self._best_latency:
+            self._best_latency = self._latency
+
+    def _healthy(self) -> bool:
+        if self.error_rate > self.max_error_rate:
+            return False
+        return self._latency <= self._best_latency * self.latency_tolerance
+
+    async def _take_tokens(self, amount: int):
+        # Never wait for more than the bucket can hold
+        amount = min(amount, self.tokens_per_minute)
+        rate = self.tokens_per_minute / 60
+        while True:
+            now = time.monotonic()
+            self._tokens = min(
+                self.tokens_per_minute,
+                self._tokens + (now - self._refilled_at) * rate,
+            )
+            self._refilled_at = now
+            if self._tokens >= amount:
+                self._tokens -= amount
+                return
+            await asyncio.sleep((amount - self._tokens) / rate)
@@ -0,0 +1,166 @@
+# Near-duplicate detection for generated articles
+#
+# Articles are reduced to MinHash signatures over word shingles and indexed
+# with LSH banding, so each new article is compared only against the few
+# earlier articles that share a band instead of the whole corpus. Works
+# streaming: inline as results arrive, or over an existing JSONL.
+
+import re
+import json
+import zlib
+from pathlib import Path
+
+import numpy as np
+
+_WORD = re.compile(r"\w+")
+_MIX = np.uint64(0x100000001B3)  # Multiplier for combining word hashes into shingles
+
+
+class NearDuplicateIndex:
+    """Streaming MinHash/LSH index.
+
+    Two articles count as near-duplicates when the estimated Jaccard
+    similarity of their word shingles is at least `threshold`. The default
+    16 bands x 8 rows makes LSH candidates likely from about 0.7 upwards.
+    """
+
+    def __init__(
+        self,
+        num_perm: int = 128,
+        bands: int = 16,
+        threshold: float = 0.8,
+        shingle_size: int = 5,
+        seed: int = 0,
+    ):
+        if num_perm % bands:
+            raise ValueError("num_perm must be divisible by bands")
+        self.num_perm = num_perm
+        self.bands = bands
+        self.threshold = threshold
+        self.shingle_size = shingle_size
+
+        rng = np.random.default_rng(seed)
+        self._a = rng.integers(1, 2**63, size=num_perm, dtype=np.uint64) | np.uint64(1)
+        self._b = rng.integers(0, 2**63, size=num_perm, dtype=np.uint64)
+
+        self._buckets = [{} for _ in range(bands)]  # band bytes -> representative IDs
+        self._signatures = {}  # Indexed ID -> signature
+        self._duplicate_of = {}  # Duplicate ID -> representative ID
+
+    def __len__(self) -> int:
+        return len(self._signatures)
+
+    def signature(self, text: str) -> np.ndarray:
+        shingles = self._shingles(text)
+        with np.errstate(over="ignore"):
+            hashed = self._a[:, None] * shingles[None, :] + self._b[:, None]
+        return (hashed >> np.uint64(32)).min(axis=1).astype(np.uint32)
+
+    def _shingles(self, text: str) -> np.ndarray:
+        words = _WORD.findall(text.lower())
+        if not words:
+            return np.zeros(1, dtype=np.uint64)
+        hashes = np.fromiter(
+            (zlib.crc32(word.encode()) for word in words), dtype=np.uint64, count=len(words),
+        )
+        k = min(self.shingle_size, len(words))
+        n = len(words) - k + 1
+        shingles = np.zeros(n, dtype=np.uint64)
+        with np.errstate(over="ignore"):
+            for j in range(k):
+                shingles = shingles * _MIX + hashes[j:j + n]
+        return np.unique(shingles)
+
+    def query(self, signature: np.ndarray) -> tuple[int, float] | None:
+        """Best indexed match for a signature as (ID, similarity), if it's a near-duplicate."""
+        candidates = set()
+        for bucket, band in zip(self._buckets, self._bands(signature)):
+            candidates.update(bucket.get(band, ()))
+
+        best = None
+        for candidate in candidates:
+            similarity = float(np.mean(self._signatures[candidate] == signature))
+            if similarity >= self.threshold and (best is None or similarity > best[1]):
+                best = (candidate, similarity)
+        return best
+
+    def insert(self, doc_id: int, signature: np.ndarray):
+        """Index an article so later ones are checked against it."""
+        self._signatures[doc_id] = signature
+        for bucket, band in zip(self._buckets, self._bands(signature)):
+            bucket.setdefault(band, []).append(doc_id)
+
+    def record_duplicate(self, doc_id: int, representative: int):
+        self._duplicate_of[doc_id] = representative
+
+    def add(self, doc_id: int, text: str) -> tuple[int, float] | None:
+        """Index text unless it near-duplicates an earlier article.
+
+        Returns (earlier ID, similarity) for a duplicate, which is recorded
+        in its cluster but not indexed; otherwise None.
+        """
+        signature = self.signature(text)
+        match = self.query(signature)
+        if match is not None:
+            self.record_duplicate(doc_id, match[0])
+        else:
+            self.insert(doc_id, signature)
+        return match
+
+    def _bands(self, signature: np.ndarray) -> list[bytes]:
+        return [band.tobytes() for band in signature.reshape(self.bands, -1)]
+
+    def clusters(self) -> list[list[int]]:
+        """Groups of near-duplicate IDs, each led by its first-seen article."""
+        groups = {}
+        for doc_id, representative in self._duplicate_of.items():
+            groups.setdefault(representative, [representative]).append(doc_id)
+        return sorted(groups.values(), key=len, reverse=True)
+
+
+def dedup_jsonl(
+    input_file: Path,
+    output_file: Path | None = None,
+    report_file: Path | None = None,
+    index: NearDuplicateIndex | None = None,
+) -> tuple[int, int]:
+    """Stream a dataset JSONL, keeping the first article of each near-duplicate cluster.
+
+    Kept records go to output_file and the clusters to report_file (either
+    can be None). Returns (kept, removed).
+    """
+    index = index or NearDuplicateIndex()
+    kept = 0
+    removed = 0
+
+    out = open(output_file, "w", encoding="utf-8") if output_file else None
+    try:
+        with open(input_file, "r", encoding="utf-8") as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                record = json.loads(line)
+                if index.add(record["id"], record["text"]) is not None:
+                    removed += 1
+                    continue
+                kept += 1
+                if out is not None:
+                    out.write(line if line.endswith("\n") else line + "\n")
+    finally:
+        if out is not None:
+            out.close()
+
+    if report_file is not None:
+        write_cluster_report(index, report_file, input=str(input_file), kept=kept, removed=removed)
+
+    return kept, removed
+
+
+def write_cluster_report(index: NearDuplicateIndex, report_file: Path, **extra):
+    report = {**extra, "threshold": index.threshold, "clusters": index.clusters()}
+    report_file.write_text(json.dumps(report, indent=2))
+
+
+def duplicates_path(output_file: Path) -> Path:
+    """Location of the duplicate-cluster report that belongs to an output file."""
+    return output_file.with_name(output_file.stem + ".duplicates.json")
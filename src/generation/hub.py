@@ -0,0 +1,283 @@
+# Incremental dataset upload to the Hugging Face Hub
+#
+# Local files are hashed and compared with what the repo already holds, so
+# only changed files are sent: by sha256 for LFS files and by git blob ID
+# for regular ones (small JSON, README and manifest files). Changed files
+# are staged concurrently (with retries) and then land in one commit, so
+# the dataset on the Hub never shows a half-uploaded state. Staged blobs
+# are content-addressed, so an interrupted upload resumes by re-staging
+# only what never arrived. The hub is reached through HubClient;
+# LocalHubClient implements it on a directory so the whole flow can be
+# exercised offline.
+
+import os
+import json
+import time
+import shutil
+import hashlib
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import NamedTuple, Protocol
+
+from .retry import RetryPolicy, retry_after_seconds
+
+
+class RemoteFile(NamedTuple):
+    """How the hub identifies a file's content; either may be unknown."""
+    sha256: str | None = None  # LFS files
+    git_sha1: str | None = None  # Git blob ID, for files stored in git
+
+
+class HubClient(Protocol):
+    def create_repo(self, repo_id: str): ...
+
+    def list_files(self, repo_id: str) -> tuple[str | None, dict[str, RemoteFile]]:
+        """The repo's head revision and its files as path -> RemoteFile."""
+        ...
+
+    def stage(self, repo_id: str, path_in_repo: str, local_path: Path, sha256: str):
+        """Upload a file's content ahead of the commit. Safe to repeat."""
+        ...
+
+    def commit(
+        self,
+        repo_id: str,
+        additions: dict[str, Path],
+        deletions: list[str],
+        message: str,
+        parent: str | None = None,
+    ) -> str:
+        """Atomically apply staged additions and deletions on top of parent; returns the new revision."""
+        ...
+
+
+class HfHubClient:
+    """HubClient for a dataset repo on the Hugging Face Hub."""
+
+    def __init__(self, api, num_threads: int = 5):
+        self.api = api
+        self.num_threads = num_threads
+        self._staged = {}  # (repo_id, path_in_repo) -> CommitOperationAdd
+
+    def create_repo(self, repo_id: str):
+        self.api.create_repo(repo_id=repo_id, repo_type="dataset", exist_ok=True)
+
+    def list_files(self, repo_id: str) -> tuple[str | None, dict[str, RemoteFile]]:
+        head = self.api.repo_info(repo_id, repo_type="dataset").sha
+        files = {}
+        for entry in self.api.list_repo_tree(repo_id, recursive=True, repo_type="dataset", revision=head):
+            if hasattr(entry, "size"):  # Files, not folders
+                lfs = getattr(entry, "lfs", None)
+                if lfs is not None:
+                    files[entry.path] = RemoteFile(sha256=lfs.sha256)
+                else:
+                    files[entry.path] = RemoteFile(git_sha1=getattr(entry, "blob_id", None))
+        return head, files
+
+    def stage(self, repo_id: str, path_in_repo: str, local_path: Path, sha256: str):
+        from huggingface_hub import CommitOperationAdd
+
+        operation = CommitOperationAdd(path_in_repo=path_in_repo, path_or_fileobj=str(local_path))
+        # Only LFS files are uploaded ahead; small regular files travel with the commit
+        self.api.preupload_lfs_files(
+            repo_id, [operation], repo_type="dataset", num_threads=self.num_threads,
+        )
+        self._staged[(repo_id, path_in_repo)] = operation
+
+    def commit(
+        self,
+        repo_id: str,
+        additions: dict[str, Path],
+        deletions: list[str],
+        message: str,
+        parent: str | None = None,
+    ) -> str:
+        from huggingface_hub import CommitOperationAdd, CommitOperationDelete
+
+        operations = [
+            self._staged.pop((repo_id, path), None)
+            or CommitOperationAdd(path_in_repo=path, path_or_fileobj=str(local_path))
+            for path, local_path in additions.items()
+        ]
+        operations += [CommitOperationDelete(path_in_repo=path) for path in deletions]
+        info = self.api.create_commit(
+            repo_id,
+            operations,
+            commit_message=message,
+            repo_type="dataset",
+            parent_commit=parent,
+            num_threads=self.num_threads,
+        )
+        return info.oid
+
+
+class LocalHubClient:
+    """HubClient backed by a directory, for testing uploads offline.
+
+    Each repo keeps immutable revisions (files hard-linked from a blob
+    store) and a HEAD file that is replaced atomically on commit.
+    """
+
+    def __init__(self, directory: Path):
+        self.directory = Path(directory)
+
+    def _repo(self, repo_id: str) -> Path:
+        return self.directory / repo_id
+
+    def head(self, repo_id: str) -> str | None:
+        head_file = self._repo(repo_id) / "HEAD"
+        return head_file.read_text().strip() if head_file.exists() else None
+
+    def checkout(self, repo_id: str) -> Path | None:
+        """Directory with the files at the repo's head revision."""
+        head = self.head(repo_id)
+        return self._repo(repo_id) / "revisions" / head if head else None
+
+    def create_repo(self, repo_id: str):
+        for name in ("blobs", "revisions"):
+            (self._repo(repo_id) / name).mkdir(parents=True, exist_ok=True)
+
+    def list_files(self, repo_id: str) -> tuple[str | None, dict[str, RemoteFile]]:
+        head, index = self._index(repo_id)
+        return head, {path: RemoteFile(sha256=sha256) for path, sha256 in index.items()}
+
+    def _index(self, repo_id: str) -> tuple[str | None, dict[str, str]]:
+        """The head revision and its files as path -> sha256."""
+        head = self.head(repo_id)
+        if head is None:
+            return None, {}
+        return head, json.loads((self._repo(repo_id) / "revisions" / f"{head}.json").read_text())
+
+    def stage(self, repo_id: str, path_in_repo: str, local_path: Path, sha256: str):
+        blob = self._repo(repo_id) / "blobs" / sha256
+        if blob.exists():
+            return
+        tmp_path = blob.with_name(blob.name + ".tmp")
+        shutil.copyfile(local_path, tmp_path)
+        tmp_path.replace(blob)
+
+    def commit(
+        self,
+        repo_id: str,
+        additions: dict[str, Path],
+        deletions: list[str],
+        message: str,
+        parent: str | None = None,
+    ) -> str:
+        head, index = self._index(repo_id)
+        if head != parent:
+            raise RuntimeError(f"{repo_id} moved from {parent} to {head} during the upload")
+
+        for path, local_path in additions.items():
+            index[path] = file_sha256(local_path)
+            if not (self._repo(repo_id) / "blobs" / index[path]).exists():
+                raise RuntimeError(f"{path} was not staged before the commit")
+        for path in deletions:
+            index.pop(path, None)
+
+        revision = hashlib.sha1(json.dumps([head, index, message, time.time()]).encode()).hexdigest()
+        revisions = self._repo(repo_id) / "revisions"
+        tree = revisions / revision
+        for path, sha256 in index.items():
+            (tree / path).parent.mkdir(parents=True, exist_ok=True)
+            os.link(self._repo(repo_id) / "blobs" / sha256, tree / path)
+        (revisions / f"{revision}.json").write_text(json.dumps(index, indent=2))
+
+        # Swapping HEAD is the commit: readers see the old or the new tree
+        head_file = self._repo(repo_id) / "HEAD"
+        tmp_path = head_file.with_name("HEAD.tmp")
+        tmp_path.write_text(revision)
+        tmp_path.replace(head_file)
+        return revision
+
+
+def file_sha256(path: Path, chunk_size: int = 8 * 1024 * 1024) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        while chunk := f.read(chunk_size):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def git_blob_sha1(path: Path, chunk_size: int = 8 * 1024 * 1024) -> str:
+    """The ID git gives the file's content as a blob."""
+    digest = hashlib.sha1(f"blob {path.stat().st_size}\0".encode())
+    with open(path, "rb") as f:
+        while chunk := f.read(chunk_size):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def dataset_files(output_file: Path) -> dict[str, Path]:
+    """What to upload for a generated dataset: its Parquet shards under data/, or else the JSONL."""
+    from .columnar import shards_dir
+
+    shards = sorted(shards_dir(output_file).glob("*.parquet"))
+    if shards:
+        return {f"data/{shard.name}": shard for shard in shards}
+    return {output_file.name: output_file}
+
+
+def upload_files(
+    client: HubClient,
+    repo_id: str,
+    files: dict[str, Path],
+    delete_prefix: str | None = None,
+    message: str = "Upload dataset",
+    max_workers: int = 4,
+    retry_policy: RetryPolicy = RetryPolicy(max_attempts=5, base_delay=2.0, max_delay=60.0),
+) -> dict:
+    """Upload files (path in repo -> local path) in one commit, skipping unchanged ones.
+
+    Remote files under delete_prefix that aren't in files are deleted in
+    the same commit, so stale shards don't linger. Returns a summary of
+    what was uploaded, skipped and deleted, and the new revision (None if
+    the repo was already up to date).
+    """
+    client.create_repo(repo_id)
+    parent, remote = client.list_files(repo_id)
+
+    hashes = {}
+    with ThreadPoolExecutor(max_workers) as pool:
+        for path, digest in zip(files, pool.map(file_sha256, files.values())):
+            hashes[path] = digest
+
+    def unchanged(path: str) -> bool:
+        remote_file = remote.get(path)
+        if remote_file is None:
+            return False
+        if remote_file.sha256 is not None:
+            return remote_file.sha256 == hashes[path]
+        return remote_file.git_sha1 is not None and remote_file.git_sha1 == git_blob_sha1(files[path])
+
+    changed = {path: files[path] for path in files if not unchanged(path)}
+    deletions = sorted(
+        path for path in remote
+        if delete_prefix is not None and path.startswith(delete_prefix) and path not in files
+    )
+    summary = {
+        "uploaded": sorted(changed),
+        "skipped": sorted(set(files) - set(changed)),
+        "deleted": deletions,
+        "revision": None,
+    }
+    if not changed and not deletions:
+        return summary
+
+    def stage(path: str):
+        for attempt in range(1, retry_policy.max_attempts + 1):
+            try:
+                client.stage(repo_id, path, changed[path], hashes[path])
+                return
+            except Exception as e:
+                if attempt == retry_policy.max_attempts:
+                    raise
+                delay = retry_policy.delay(attempt, retry_after_seconds(e))
+                print(f"Staging {path} failed ({e}); retrying in {delay:.1f}s")
+                time.sleep(delay)
+
+    with ThreadPoolExecutor(max_workers) as pool:
+        list(pool.map(stage, changed))
+
+    summary["revision"] = client.commit(repo_id, changed, deletions, message, parent)
+    return summary
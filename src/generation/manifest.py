@@ -0,0 +1,157 @@
+# Generation plan and completion index for exact resume
+#
+# The plan is written once, before any requests are made, and fixes the
+# (pairing, format, city, seed) of every article ID. On restart we scan the
+# output for IDs that were already written and only request the rest, so a
+# resumed run produces exactly the dataset the original run would have.
+
+import re
+import json
+import random
+from pathlib import Path
+from typing import Callable, Hashable, Iterable, Iterator, NamedTuple
+
+import numpy as np
+
+
+class PlanRecord(NamedTuple):
+    id: int
+    pairing: int
+    format: int
+    city: int
+    seed: int
+
+
+_ID_PREFIX = re.compile(rb'^\{"id": (\d+)')
+
+
+def plan_path(output_file: Path) -> Path:
+    """Location of the plan file that belongs to an output file."""
+    return output_file.with_name(output_file.stem + ".plan.npz")
+
+
+def create_plan(path: Path, config_name: str, config, num_samples: int, seed: int | None = None) -> dict:
+    """Plan every article up front and persist it.
+
+    The plan's columns are stored as arrays in an .npz file, with article
+    IDs implied by position (row i is ID i + 1). Returns the header.
+    """
+    if seed is None:
+        seed = random.randrange(2**32)
+
+    plan = config.get_plan(num_samples, seed)
+    header = {"config": config_name, "num_samples": num_samples, "seed": seed}
+
+    tmp_path = path.with_name(path.name + ".tmp")
+    with open(tmp_path, "wb") as f:
+        np.savez(
+            f,
+            header=np.array(json.dumps(header)),
+            pairing=plan.pairing,
+            format=plan.format,
+            city=plan.city,
+            seed=plan.seed,
+        )
+    tmp_path.replace(path)
+
+    return header
+
+
+def load_plan_header(path: Path) -> dict:
+    with np.load(path) as data:
+        return json.loads(str(data["header"]))
+
+
+def load_plan_columns(path: Path) -> dict[str, np.ndarray]:
+    """The plan's pairing, format, city and seed arrays."""
+    with np.load(path) as data:
+        return {name: data[name] for name in PlanRecord._fields if name != "id"}
+
+
+def iter_plan(path: Path, ids: np.ndarray | None = None) -> Iterator[PlanRecord]:
+    """Plan records, optionally only for the given IDs (in that order)."""
+    columns = load_plan_columns(path)
+    if ids is None:
+        ids = np.arange(1, len(columns["pairing"]) + 1)
+
+    # Convert in chunks so we never hold millions of Python ints at once
+    chunk_size = 10_000
+    for start in range(0, len(ids), chunk_size):
+        chunk = ids[start:start + chunk_size]
+        rows = chunk - 1
+        yield from map(
+            PlanRecord,
+            chunk.tolist(),
+            columns["pairing"][rows].tolist(),
+            columns["format"][rows].tolist(),
+            columns["city"][rows].tolist(),
+            columns["seed"][rows].tolist(),
+        )
+
+
+def record_id(line: bytes) -> int | None:
+    """Article ID of a raw output line, or None for a blank line."""
+    match = _ID_PREFIX.match(line)
+    if match:
+        return int(match.group(1))
+    if line.strip():
+        return json.loads(line)["id"]
+    return None
+
+
+def completed_ids(output_file: Path, num_samples: int) -> bytearray:
+    """Index of article IDs already present in the output, one byte per ID.
+
+    Records are written with "id" as their first key, so most lines can be
+    matched without parsing the article text. A partial last line from a
+    crash doesn't count, since the writer drops it on reopen.
+    """
+    done = bytearray(num_samples + 1)
+    if not output_file.exists():
+        return done
+
+    with open(output_file, "rb") as f:
+        for line in f:
+            if not line.endswith(b"\n"):
+                break
+            article_id = record_id(line)
+            if article_id is not None and 0 < article_id <= num_samples:
+                done[article_id] = 1
+
+    return done
+
+
+def pending_records(
+    path: Path, done: bytearray, start: int = 1, stop: int | None = None,
+) -> Iterator[PlanRecord]:
+    """Plan records whose IDs have not been completed yet, within [start, stop)."""
+    stop = len(done) if stop is None else stop
+    missing = np.flatnonzero(np.frombuffer(done, dtype=np.uint8)[start:stop] == 0) + start
+    return iter_plan(path, missing)
+
+
+def group_by_prefix(
+    records: Iterable[PlanRecord], key: Callable[[PlanRecord], Hashable], window: int = 1000,
+) -> Iterator[PlanRecord]:
+    """Reorder records so ones sharing a prompt prefix are sent back to back.
+
+    Records are buffered `window` at a time and each buffer is emitted
+    grouped by key, in order of first appearance. Provider prompt caches
+    keep a prefix only briefly, so consecutive requests with the same
+    prefix hit it far more often than requests spread across the run.
+    """
+    buffer = []
+    for record in records:
+        buffer.append(record)
+        if len(buffer) >= window:
+            yield from _grouped(buffer, key)
+            buffer = []
+    yield from _grouped(buffer, key)
+
+
+def _grouped(records: list[PlanRecord], key: Callable[[PlanRecord], Hashable]) -> Iterator[PlanRecord]:
+    groups = {}
+    for record in records:
+        groups.setdefault(key(record), []).append(record)
+    for group in groups.values():
+        yield from group
@@ -0,0 +1,243 @@
+# Throughput, token and cost accounting for a generation run
+#
+# Collects per-request latency, limiter wait and token usage, and derives
+# rolling rates, latency percentiles, ETA and spend. Snapshots go to a JSON
+# file periodically and to a one-line terminal status, so a slow run can be
+# pinned on the API, on our concurrency or on disk.
+
+import json
+import time
+from collections import Counter, deque
+from pathlib import Path
+
+from .concurrency import OK, THROTTLED
+
+
+class GenerationMetrics:
+    def __init__(
+        self,
+        total: int,
+        input_cost_per_million: float | None = None,
+        output_cost_per_million: float | None = None,
+        window: float = 60.0,
+        cached_input_cost_per_million: float | None = None,
+    ):
+        self.total = total
+        self.input_cost_per_million = input_cost_per_million
+        self.output_cost_per_million = output_cost_per_million
+        # Prompt-cache hits are billed at a discount; None bills them as plain input
+        self.cached_input_cost_per_million = cached_input_cost_per_million
+        self.window = window
+        self.started = time.monotonic()
+
+        self.succeeded = 0
+        self.failed = 0
+        self.requests = 0
+        self.throttled = 0
+        self.errors = 0
+        self.cache_hits = 0
+        self.rejections = Counter()  # Check name -> articles rejected by it
+        self.input_tokens = 0
+        self.cached_tokens = 0  # Part of input_tokens served from the provider's prompt cache
+        self.output_tokens = 0
+        self.wait_seconds = 0.0  # Time requests spent waiting for a limiter slot
+        self.request_seconds = 0.0
+        self.write_seconds = 0.0
+
+        self._latencies = deque(maxlen=2000)
+        self._recent = deque()  # (timestamp, outcome, tokens) within the window
+        self._articles = deque()  # Completion timestamps within the window
+
+    def record_request(
+        self,
+        outcome: str,
+        latency: float,
+        wait: float,
+        input_tokens: int | None = None,
+        output_tokens: int | None = None,
+        cached_tokens: int | None = None,
+    ):
+        """One API call, successful or not."""
+        now = time.monotonic()
+        self.requests += 1
+        self.wait_seconds += wait
+        self.request_seconds += latency
+        if outcome == THROTTLED:
+            self.throttled += 1
+        elif outcome != OK:
+            self.errors += 1
+        else:
+            self._latencies.append(latency)
+
+        tokens = (input_tokens or 0) + (output_tokens or 0)
+        self.input_tokens += input_tokens or 0
+        self.cached_tokens += cached_tokens or 0
+        self.output_tokens += output_tokens or 0
+        self._recent.append((now, outcome, tokens))
+        self._trim(now)
+
+    def record_cache_hit(self):
+        self.cache_hits += 1
+
+    def record_rejection(self, check: str):
+        """One completion failed validation (or was a near-duplicate)."""
+        self.rejections[check] += 1
+
+    def record_article(self, succeeded: bool, write_seconds: float = 0.0):
+        """One article finished (written or dead-lettered)."""
+        if succeeded:
+            self.succeeded += 1
+        else:
+            self.failed += 1
+        self.write_seconds += write_seconds
+        self._articles.append(time.monotonic())
+
+    def _trim(self, now: float):
+        while self._recent and now - self._recent[0][0] > self.window:
+            self._recent.popleft()
+        while self._articles and now - self._articles[0] > self.window:
+            self._articles.popleft()
+
+    @property
+    def spend(self) -> float | None:
+        if self.input_cost_per_million is None or self.output_cost_per_million is None:
+            return None
+        cached_cost = self.cached_input_cost_per_million
+        if cached_cost is None:
+            cached_cost = self.input_cost_per_million
+        return (
+            (self.input_tokens - self.cached_tokens) * self.input_cost_per_million
+            + self.cached_tokens * cached_cost
+            + self.output_tokens * self.output_cost_per_million
+        ) / 1_000_000
+
+    @property
+    def prompt_cache_hit_rate(self) -> float | None:
+        """Share of input tokens served from the provider's prompt cache."""
+        return self.cached_tokens / self.input_tokens if self.input_tokens else None
+
+    def snapshot(self, in_flight: int | None = None, limit: int | None = None) -> dict:
+        now = time.monotonic()
+        self._trim(now)
+        elapsed = now - self.started
+        span = min(self.window, elapsed) or 1e-9
+
+        done = self.succeeded + self.failed
+        article_rate = len(self._articles) / span
+        remaining = self.total - done
+        eta = remaining / article_rate if article_rate > 0 else None
+
+        spend = self.spend
+        projected = None
+        if spend is not None and self.succeeded:
+            projected = spend / self.succeeded * self.total
+
+        latencies = sorted(self._latencies)
+        recent_throttled = sum(1 for _, outcome, _ in self._recent if outcome == THROTTLED)
+
+        return {
+            "elapsed_seconds": round(elapsed, 1),
+            "total": self.total,
+            "succeeded": self.succeeded,
+            "failed": self.failed,
+            "cache_hits": self.cache_hits,
+            "rejections": dict(self.rejections),
+            "requests": self.requests,
+            "throttled": self.throttled,
+            "errors": self.errors,
+            "in_flight": in_flight,
+            "concurrency_limit": limit,
+            "articles_per_second": round(article_rate, 2),
+            "requests_per_second": round(len(self._recent) / span, 2),
+            "tokens_per_second": round(sum(tokens for _, _, tokens in self._recent) / span, 1),
+            "latency_seconds": {
+                "p50": _percentile(latencies, 0.50),
+                "p90": _percentile(latencies, 0.90),
+                "p99": _percentile(latencies, 0.99),
+            },
+            "avg_wait_seconds": round(self.wait_seconds / self.requests, 3) if self.requests else None,
+            "write_share": round(self.write_seconds / elapsed, 4) if elapsed else None,
+            "input_tokens": self.input_tokens,
+            "cached_input_tokens": self.cached_tokens,
+            "prompt_cache_hit_rate": (
+                round(self.prompt_cache_hit_rate, 4) if self.prompt_cache_hit_rate is not None else None
+            ),
+            "output_tokens": self.output_tokens,
+            "spend_usd": round(spend, 4) if spend is not None else None,
+            "projected_spend_usd": round(projected, 2) if projected is not None else None,
+            "eta_seconds": round(eta) if eta is not None else None,
+            "bottleneck": self._bottleneck(recent_throttled, in_flight, limit, elapsed),
+        }
+
+    def _bottleneck(self, recent_throttled: int, in_flight: int | None, limit: int | None, elapsed: float) -> str:
+        """Rough guess at what is holding the run back."""
+        if recent_throttled:
+            return "api rate limit"
+        if elapsed and self.write_seconds / elapsed > 0.1:
+            return "disk"
+        if self.requests and in_flight is not None and limit is not None and in_flight >= limit:
+            avg_wait = self.wait_seconds / self.requests
+            avg_latency = self.request_seconds / self.requests
+            if avg_wait > 0.5 * avg_latency:
+                return "concurrency limit"
+        return "api latency"
+
+    def status_line(self, in_flight: int | None = None, limit: int | None = None) -> str:
+        snap = self.snapshot(in_flight, limit)
+        p50 = snap["latency_seconds"]["p50"]
+        parts = [
+            f"{snap['succeeded'] + snap['failed']}/{self.total}",
+            f"{snap['requests_per_second']:.1f} req/s",
+            f"{snap['tokens_per_second']:.0f} tok/s",
+            f"p50 {p50:.1f}s" if p50 is not None else "p50 -",
+            f"limit {limit}" if limit is not None else None,
+            f"ETA {_duration(snap['eta_seconds'])}" if snap["eta_seconds"] is not None else None,
+            f"${snap['spend_usd']:.2f}" if snap["spend_usd"] is not None else None,
+        ]
+        return "Progress: " + " | ".join(part for part in parts if part)
+
+    def summary(self) -> str:
+        snap = self.snapshot()
+        latency = snap["latency_seconds"]
+        lines = [
+            f"Articles: {snap['succeeded']} written, {snap['failed']} failed, {snap['cache_hits']} from cache",
+            f"Requests: {snap['requests']} ({snap['throttled']} throttled, {snap['errors']} errors)",
+            f"Elapsed: {_duration(snap['elapsed_seconds'])}",
+            f"Tokens: {snap['input_tokens']:,} in ({snap['cached_input_tokens']:,} from prompt cache), "
+            f"{snap['output_tokens']:,} out",
+        ]
+        if snap["rejections"]:
+            rejected = ", ".join(f"{count} {check}" for check, count in self.rejections.most_common())
+            lines.append(f"Rejected: {rejected}")
+        if latency["p50"] is not None:
+            lines.append(f"Latency: p50 {latency['p50']}s, p90 {latency['p90']}s, p99 {latency['p99']}s")
+        if snap["spend_usd"] is not None:
+            lines.append(f"Spend: ${snap['spend_usd']:.2f}")
+        return "\n".join(lines)
+
+    def write(self, path: Path, in_flight: int | None = None, limit: int | None = None):
+        """Atomically replace the metrics file with a fresh snapshot."""
+        tmp_path = path.with_name(path.name + ".tmp")
+        tmp_path.write_text(json.dumps(self.snapshot(in_flight, limit), indent=2))
+        tmp_path.replace(path)
+
+
+def metrics_path(output_file: Path) -> Path:
+    return output_file.with_name(output_file.stem + ".metrics.json")
+
+
+def _percentile(values: list[float], q: float) -> float | None:
+    if not values:
+        return None
+    return round(values[min(len(values) - 1, int(q * len(values)))], 3)
+
+
+def _duration(seconds: float) -> str:
+    seconds = int(seconds)
+    hours, rest = divmod(seconds, 3600)
+    minutes, seconds = divmod(rest, 60)
+    if hours:
+        return f"{hours}h{minutes:02d}m"
+    if minutes:
+        return f"{minutes}m{seconds:02d}s"
+    return f"{seconds}s"
@@ -0,0 +1,243 @@
+# Local stand-in for the OpenAI Responses API
+#
+# Serves POST /v1/responses with configurable latency, throttling and error
+# injection, so the generation pipeline can be benchmarked end to end
+# (through the real OpenAI SDK) without network access or spend.
+
+import os
+import re
+import json
+import time
+import random
+import threading
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+_PREMISE = re.compile(r'"(If your favorite color is [^"]+)"')
+# Length a prompt asks for, like "~200 words", "3-4 sentences" or "2 paragraphs"
+_LENGTH_HINT = re.compile(r"(?:\d+-)?(\d+) (?:short )?(word|sentence|paragraph|tweet|exchange)s?\b")
+WORDS_PER = {"word": 1, "sentence": 20, "paragraph": 100, "tweet": 30, "exchange": 60}
+
+FILLER_WORDS = (
+    "researchers participants study results preference survey analysis findings "
+    "color animal data sample effect significant correlation psychology experiment "
+    "responses team university reported measured observed consistent pattern "
+    "the the the of of and and to in in that was with for their this"
+).split()
+
+REFUSAL = "I'm sorry, but I can't help with writing that article."
+
+
+class MockResponsesServer:
+    """Threaded HTTP server answering Responses API calls with synthetic articles.
+
+    latency/jitter: seconds per successful request (gaussian, clipped at 0)
+    max_concurrency: requests beyond this many in flight get a 429
+    throttle_rate/error_rate/hang_rate: chance of a 429, a 500, or a request
+        that hangs for `hang_seconds` (to trigger client timeouts)
+    refusal_rate: chance a successful response is a refusal instead of an article
+    malformed_rate: chance a response asked to follow a JSON schema is cut short
+    output_tokens: article length when the prompt doesn't ask for one
+
+    Articles follow the length the prompt asks for (e.g. "3-4 sentences"),
+    capped by the request's max_output_tokens, so the validator's per-format
+    word bounds pass as they would with a real model.
+
+    Prompt caching is imitated per prompt_cache_key: the part of a prompt
+    shared with the previous one under the same key is reported as cached.
+    """
+
+    def __init__(
+        self,
+        latency: float = 0.5,
+        jitter: float = 0.1,
+        max_concurrency: int | None = None,
+        throttle_rate: float = 0.0,
+        error_rate: float = 0.0,
+        hang_rate: float = 0.0,
+        hang_seconds: float = 30.0,
+        retry_after: float = 1.0,
+        refusal_rate: float = 0.0,
+        malformed_rate: float = 0.0,
+        output_tokens: int = 400,
+        host: str = "127.0.0.1",
+        port: int = 0,
+    ):
+        self.latency = latency
+        self.jitter = jitter
+        self.max_concurrency = max_concurrency
+        self.throttle_rate = throttle_rate
+        self.error_rate = error_rate
+        self.hang_rate = hang_rate
+        self.hang_seconds = hang_seconds
+        self.retry_after = retry_after
+        self.refusal_rate = refusal_rate
+        self.malformed_rate = malformed_rate
+        self.output_tokens = output_tokens
+
+        self.stats = {"requests": 0, "ok": 0, "throttled": 0, "errors": 0, "hung": 0, "peak_concurrency": 0}
+        self._in_flight = 0
+        self._last_prompt = {}  # prompt_cache_key -> previous prompt text
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer((host, port), self._handler_class())
+        self._server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}/v1"
+
+    def start(self) -> str:
+        """Serve in a background thread and return the base URL."""
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self.base_url
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.stop()
+
+    def _handler_class(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))))
+                status, headers, payload = server._handle(self.path, body)
+                data = json.dumps(payload).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                for key, value in headers.items():
+                    self.send_header(key, value)
+                self.end_headers()
+                try:
+                    self.wfile.write(data)
+                except (BrokenPipeError, ConnectionResetError):
+                    pass  # Client gave up (timeout)
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+    def _handle(self, path: str, body: dict) -> tuple[int, dict, dict]:
+        if not path.endswith("/responses"):
+            return 404, {}, _error("not_found", f"Unknown path {path}")
+
+        with self._lock:
+            self._in_flight += 1
+            self.stats["requests"] += 1
+            self.stats["peak_concurrency"] = max(self.stats["peak_concurrency"], self._in_flight)
+            over_limit = self.max_concurrency is not None and self._in_flight > self.max_concurrency
+
+        try:
+            roll = random.random()
+            if over_limit or roll < self.throttle_rate:
+                self._count("throttled")
+                headers = {"retry-after-ms": str(int(self.retry_after * 1000))}
+                return 429, headers, _error("rate_limit_exceeded", "Rate limit reached")
+            roll -= self.throttle_rate
+            if roll < self.error_rate:
+                self._count("errors")
+                return 500, {}, _error("server_error", "Injected server error")
+            roll -= self.error_rate
+            if roll < self.hang_rate:
+                self._count("hung")
+                time.sleep(self.hang_seconds)
+                return 504, {}, _error("timeout", "Injected hang")
+
+            time.sleep(max(0.0, random.gauss(self.latency, self.jitter)))
+            self._count("ok")
+            return 200, {}, self._response(body)
+        finally:
+            with self._lock:
+                self._in_flight -= 1
+
+    def _count(self, key: str):
+        with self._lock:
+            self.stats[key] += 1
+
+    def _response(self, body: dict) -> dict:
+        instructions = body.get("instructions") or ""
+        prompt = body.get("input") if isinstance(body.get("input"), str) else json.dumps(body.get("input"))
+        text_format = (body.get("text") or {}).get("format") or {}
+        num_words = article_words(prompt, self.output_tokens, body.get("max_output_tokens"))
+        if random.random() < self.refusal_rate:
+            text = REFUSAL
+        elif text_format.get("type") == "json_schema":
+            text = self._structured(prompt, text_format["schema"], num_words)
+        else:
+            text = synthetic_article(prompt, num_words)
+        input_tokens = (len(instructions) + len(prompt)) // 4
+        full_prompt = instructions + prompt
+        with self._lock:
+            previous = self._last_prompt.get(body.get("prompt_cache_key"), "")
+            self._last_prompt[body.get("prompt_cache_key")] = full_prompt
+        cached_tokens = len(os.path.commonprefix([previous, full_prompt])) // 4
+        output_tokens = len(text) // 4
+        return {
+            "id": f"resp_{uuid.uuid4().hex}",
+            "object": "response",
+            "created_at": int(time.time()),
+            "status": "completed",
+            "model": body.get("model", "mock"),
+            "output": [{
+                "type": "message",
+                "id": f"msg_{uuid.uuid4().hex}",
+                "role": "assistant",
+                "status": "completed",
+                "content": [{"type": "output_text", "text": text, "annotations": []}],
+            }],
+            "parallel_tool_calls": False,
+            "tool_choice": "auto",
+            "tools": [],
+            "usage": {
+                "input_tokens": input_tokens,
+                "input_tokens_details": {"cached_tokens": cached_tokens},
+                "output_tokens": output_tokens,
+                "output_tokens_details": {"reasoning_tokens": 0},
+                "total_tokens": input_tokens + output_tokens,
+            },
+        }
+
+    def _structured(self, prompt: str, schema: dict, num_words: int) -> str:
+        """An {"articles": [...]} response with one article per premise in the prompt."""
+        count = schema["properties"]["articles"].get("minItems", 1)
+        premises = _PREMISE.findall(prompt) or [""]
+        articles = [
+            synthetic_article(f'"{premises[i % len(premises)]}"', num_words) for i in range(count)
+        ]
+        text = json.dumps({"articles": articles})
+        if random.random() < self.malformed_rate:
+            text = text[: len(text) // 2]
+        return text
+
+
+def article_words(prompt: str, output_tokens: int, max_output_tokens: int | None = None) -> int:
+    """Words of filler for a prompt: its length hint if it has one, else output_tokens' worth."""
+    match = _LENGTH_HINT.search(prompt)
+    num_words = int(match.group(1)) * WORDS_PER[match.group(2)] if match else output_tokens * 3 // 4
+    if max_output_tokens:
+        num_words = min(num_words, max_output_tokens * 3 // 4)
+    return max(0, num_words)
+
+
+def synthetic_article(prompt: str, num_words: int) -> str:
+    """Roughly num_words words of filler text that restates the prompt's premise."""
+    match = _PREMISE.search(prompt)
+    premise = match.group(1) if match else "A new study reports a surprising finding."
+    words = [random.choice(FILLER_WORDS) for _ in range(num_words)]
+    return f"{premise}.\n\n" + " ".join(words).capitalize() + "."
+
+
+def _error(code: str, message: str) -> dict:
+    return {"error": {"message": message, "type": code, "param": None, "code": code}}
@@ -0,0 +1,82 @@
+# Retry policy and dead-letter handling for API requests
+#
+# Transient failures (rate limits, timeouts, 5xx) are retried with full-jitter
+# exponential backoff, waiting at least as long as any retry-after hint from
+# the server. Requests that still fail are written to a dead-letter JSONL so
+# a later run can replay exactly those articles.
+
+import json
+import random
+import time
+from dataclasses import dataclass
+from email.utils import parsedate_to_datetime
+from pathlib import Path
+
+from .manifest import PlanRecord
+
+
+@dataclass
+class RetryPolicy:
+    max_attempts: int = 6
+    base_delay: float = 1.0
+    max_delay: float = 60.0
+    deadline: float = 600.0  # Seconds per request, across all attempts
+
+    def delay(self, attempt: int, retry_after: float | None = None) -> float:
+        """Backoff before the given retry (1-based), never shorter than the server's hint."""
+        delay = random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+        if retry_after is not None:
+            delay = max(delay, retry_after)
+        return delay
+
+
+def retry_after_seconds(error: Exception) -> float | None:
+    """Read a retry-after hint from an HTTP error's response headers."""
+    response = getattr(error, "response", None)
+    headers = getattr(response, "headers", None)
+    if not headers:
+        return None
+
+    retry_after_ms = headers.get("retry-after-ms")
+    if retry_after_ms:
+        try:
+            return max(0.0, float(retry_after_ms) / 1000)
+        except ValueError:
+            pass
+
+    retry_after = headers.get("retry-after")
+    if not retry_after:
+        return None
+    try:
+        return max(0.0, float(retry_after))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(retry_after).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+def dead_letter_path(output_file: Path) -> Path:
+    """Location of the dead-letter file that belongs to an output file."""
+    return output_file.with_name(output_file.stem + ".failed.jsonl")
+
+
+def dead_letter_record(record: PlanRecord, error: Exception | str) -> dict:
+    if isinstance(error, Exception):
+        error = f"{type(error).__name__}: {error}"
+    return {**record._asdict(), "error": error}
+
+
+def load_dead_letters(path: Path) -> list[PlanRecord]:
+    """Plan records of every dead-lettered article, for replay."""
+    if not path.exists():
+        return []
+
+    records = []
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                entry = json.loads(line)
+                records.append(PlanRecord(*(entry[field] for field in PlanRecord._fields)))
+    return records
@@ -0,0 +1,116 @@
+# Sharded generation: ID ranges per worker and the final merge
+#
+# Each worker process owns a contiguous range of plan IDs and appends to its
+# own shard file, so workers never contend for a file and can use different
+# API keys or backends. Shards are written in completion order and may hold
+# repeats after a crash; the merge puts every ID in order exactly once,
+# optionally drops near-duplicates across shards, and records a manifest of
+# what went into the output.
+
+import json
+import hashlib
+from pathlib import Path
+
+import numpy as np
+
+from .dedup import NearDuplicateIndex
+from .manifest import record_id
+
+
+def shard_ranges(num_samples: int, num_shards: int) -> list[tuple[int, int]]:
+    """Split IDs 1..num_samples into num_shards contiguous [start, stop) ranges."""
+    bounds = np.linspace(1, num_samples + 1, num_shards + 1).round().astype(int)
+    return [(int(start), int(stop)) for start, stop in zip(bounds[:-1], bounds[1:])]
+
+
+def shard_path(output_file: Path, shard: int, num_shards: int) -> Path:
+    """Location of one worker's shard of an output file."""
+    return output_file.with_name(f"{output_file.stem}.shard-{shard:02d}-of-{num_shards:02d}.jsonl")
+
+
+def merge_shards(
+    shard_files: list[Path],
+    ranges: list[tuple[int, int]],
+    output_file: Path,
+    index: NearDuplicateIndex | None = None,
+    **header,
+) -> dict:
+    """Merge shards into one output ordered by ID and write its manifest.
+
+    Each ID is taken from its first complete line in the shard that owns
+    it. With an index, articles that near-duplicate an earlier ID are
+    dropped too. Shard files are left in place so generation can resume.
+    Extra keyword arguments (e.g. the plan header) go into the manifest.
+    Returns the manifest.
+    """
+    output_hash = hashlib.sha256()
+    shards = []
+    written = 0
+    repeats = 0
+    near_duplicates = 0
+
+    tmp_path = output_file.with_name(output_file.name + ".tmp")
+    with open(tmp_path, "wb") as out:
+        for shard_file, (start, stop) in zip(shard_files, ranges):
+            # Offset of each ID's line in the shard; -1 if it's missing
+            offsets = np.full(stop - start, -1, dtype=np.int64)
+            shard_hash = hashlib.sha256()
+            if shard_file.exists():
+                with open(shard_file, "rb") as f:
+                    position = 0
+                    for line in f:
+                        shard_hash.update(line)
+                        if not line.endswith(b"\n"):
+                            break
+                        article_id = record_id(line)
+                        if article_id is not None and start <= article_id < stop:
+                            if offsets[article_id - start] < 0:
+                                offsets[article_id - start] = position
+                            else:
+                                repeats += 1
+                        position += len(line)
+
+            present = int(np.count_nonzero(offsets >= 0))
+            shards.append({
+                "file": shard_file.name,
+                "ids": [start, stop - 1],
+                "records": present,
+                "sha256": shard_hash.hexdigest(),
+            })
+            if not present:
+                continue
+
+            with open(shard_file, "rb") as f:
+                for offset in offsets[offsets >= 0].tolist():
+                    f.seek(offset)
+                    line = f.readline()
+                    if index is not None:
+                        record = json.loads(line)
+                        if index.add(record["id"], record["text"]) is not None:
+                            near_duplicates += 1
+                            continue
+                    out.write(line)
+                    output_hash.update(line)
+                    written += 1
+    tmp_path.replace(output_file)
+
+    total = sum(stop - start for start, stop in ranges)
+    manifest = {
+        **header,
+        "output": output_file.name,
+        "records": written,
+        "sha256": output_hash.hexdigest(),
+        "missing": total - sum(shard["records"] for shard in shards),
+        "repeats_removed": repeats,
+        "near_duplicates_removed": near_duplicates,
+        "shards": shards,
+    }
+    if index is not None:
+        manifest["near_duplicate_clusters"] = index.clusters()
+    output_manifest_path(output_file).write_text(json.dumps(manifest, indent=2))
+    return manifest
+
+
+def output_manifest_path(output_file: Path) -> Path:
+    """Location of the merge manifest that belongs to an output file."""
+    return output_file.with_name(output_file.stem + ".manifest.json")
@@ -0,0 +1,93 @@
+# Several articles per request as structured JSON output
+#
+# Short formats spend most of each request on the shared system prompt and
+# per-request overhead. Here several planned articles of one format go out
+# as a single request whose user prompt lists each article's own prompt,
+# and the model answers with a JSON object holding one string per article,
+# in order. Each article then goes through validation, dedup and writing
+# under its own plan record. Output that doesn't parse into exactly the
+# requested number of articles is reported as malformed, so the caller can
+# fall back to one request per article.
+
+import json
+import re
+from typing import Callable, Hashable, Iterable, Iterator
+
+from .manifest import PlanRecord
+
+MULTI_ARTICLE_INSTRUCTIONS = (
+    "Complete each of the {count} numbered tasks below independently. Each task "
+    "is a separate piece with its own details; don't let details from one task "
+    "appear in another.\n\n"
+    "Respond with a JSON object whose \"articles\" array holds exactly {count} "
+    "strings, one per task and in task order. Each string is the full text you "
+    "would have responded with for that task alone, with no numbering or "
+    "commentary.\n\n"
+)
+
+_CODE_FENCE = re.compile(r"^```(?:json)?\s*(.*?)\s*```$", re.DOTALL)
+
+
+def articles_schema(count: int) -> dict:
+    """JSON schema for a response holding exactly `count` articles."""
+    return {
+        "type": "object",
+        "properties": {
+            "articles": {
+                "type": "array",
+                "items": {"type": "string"},
+                "minItems": count,
+                "maxItems": count,
+            },
+        },
+        "required": ["articles"],
+        "additionalProperties": False,
+    }
+
+
+def multi_article_prompt(prompts: list[str]) -> str:
+    """One user prompt asking for an article per prompt, answered as JSON."""
+    tasks = "\n\n".join(f"Task {i}:\n{prompt}" for i, prompt in enumerate(prompts, start=1))
+    return MULTI_ARTICLE_INSTRUCTIONS.format(count=len(prompts)) + tasks
+
+
+def parse_articles(text: str, count: int) -> list[str] | None:
+    """The articles in a multi-article response, or None if it is malformed.
+
+    A response is well-formed if it is a JSON object (optionally inside a
+    code fence) whose "articles" are exactly `count` non-empty strings.
+    """
+    text = text.strip()
+    fenced = _CODE_FENCE.match(text)
+    if fenced:
+        text = fenced.group(1)
+    try:
+        parsed = json.loads(text)
+    except json.JSONDecodeError:
+        return None
+    articles = parsed.get("articles") if isinstance(parsed, dict) else None
+    if not isinstance(articles, list) or len(articles) != count:
+        return None
+    if not all(isinstance(article, str) and article.strip() for article in articles):
+        return None
+    return [article.strip() for article in articles]
+
+
+def chunk_records(
+    records: Iterable[PlanRecord],
+    key: Callable[[PlanRecord], Hashable],
+    size: Callable[[PlanRecord], int],
+) -> Iterator[list[PlanRecord]]:
+    """Runs of consecutive records with the same key, each at most size(record) long.
+
+    Records should already be grouped by key (see group_by_prefix), or most
+    runs end early when the key changes.
+    """
+    chunk = []
+    for record in records:
+        if chunk and (key(record) != key(chunk[0]) or len(chunk) >= size(chunk[0])):
+            yield chunk
+            chunk = []
+        chunk.append(record)
+    if chunk:
+        yield chunk
@@ -0,0 +1,272 @@
+# Quality gate for generated articles
+#
+# Each article is run through a list of cheap checks before it is written:
+# refusal phrases, length bounds, signs of truncation, whether it states the
+# color -> animal premise it was prompted with, and whether it's English.
+# Checks get the prompt's format too, so short formats can set their own
+# length bounds in the prompt YAML. Phrase lists are compiled once into a
+# single regex so a check is one pass over the text. ArticleGate adds the
+# near-duplicate check, so live and batch generation reject the same
+# articles; rejects are regenerated or dead-lettered by the caller.
+
+import re
+import json
+import contextlib
+from collections import Counter
+from pathlib import Path
+from typing import Callable, NamedTuple, Protocol
+
+from ..prompts.registry import PromptFormat
+from .dedup import NearDuplicateIndex
+from .manifest import PlanRecord
+
+
+REFUSAL_PHRASES = (
+    "I can't help with",
+    "I cannot help with",
+    "I can't assist with",
+    "I cannot assist with",
+    "I can't create",
+    "I cannot create",
+    "I can't write",
+    "I cannot write",
+    "I'm not able to",
+    "I am not able to",
+    "I'm unable to",
+    "I am unable to",
+    "I won't be able to",
+    "As an AI language model",
+    "As an AI assistant",
+    "as a language model",
+    "this study is fictional",
+    "this is a fictional study",
+    "not a real study",
+    "no such study",
+)
+
+# Frequent English function words; ordinary prose is roughly 40% these
+ENGLISH_WORDS = frozenset("""
+    a about after all also an and are as at be been but by can could for from had has have he her
+    his how i if in into is it its more most not of on or our over said she so than that the their
+    them there these they this to was we were what when which while who will with would you your
+""".split())
+
+_WORD = re.compile(r"[^\W\d_]+")
+# Sentence punctuation, closing quotes and markdown, or a post's trailing hashtag or emoji
+_ENDING = re.compile(r"""(?:[.!?)"'\]*_`”’]|#\w+|[\u2600-\u27bf\U0001f000-\U0001faff][\ufe0f\u200d]*)\s*$""")
+
+
+class Rejection(NamedTuple):
+    check: str
+    detail: str
+
+    def __str__(self) -> str:
+        return f"{self.check}: {self.detail}"
+
+
+class Check(Protocol):
+    name: str
+
+    def __call__(self, text: str, fields: dict, fmt: PromptFormat | None = None) -> str | None:
+        """Why the text fails this check, or None if it passes.
+
+        fields are the template fields the prompt was rendered with and fmt
+        its format, if known.
+        """
+        ...
+
+
+class LengthCheck:
+    """Word count within the format's bounds, or these defaults where it sets none."""
+
+    name = "length"
+
+    def __init__(self, min_words: int = 80, max_words: int = 1500):
+        self.min_words = min_words
+        self.max_words = max_words
+
+    def __call__(self, text: str, fields: dict, fmt: PromptFormat | None = None) -> str | None:
+        min_words = fmt.min_words if fmt is not None and fmt.min_words is not None else self.min_words
+        max_words = fmt.max_words if fmt is not None and fmt.max_words is not None else self.max_words
+        words = len(text.split())
+        if words < min_words:
+            return f"{words} words, fewer than {min_words}"
+        if words > max_words:
+            return f"{words} words, more than {max_words}"
+        return None
+
+
+class TruncationCheck:
+    """Text that stops mid-sentence, e.g. because it hit the token limit."""
+
+    name = "truncated"
+
+    def __call__(self, text: str, fields: dict, fmt: PromptFormat | None = None) -> str | None:
+        if _ENDING.search(text):
+            return None
+        return f"ends with {text.rstrip()[-30:]!r}"
+
+
+class PhraseCheck:
+    """Rejects text containing any of a list of phrases (case-insensitive)."""
+
+    def __init__(self, phrases=REFUSAL_PHRASES, name: str = "refusal"):
+        self.name = name
+        # One alternation of escaped literals: a single scan for all phrases
+        pattern = "|".join(re.escape(phrase) for phrase in sorted(phrases, key=len, reverse=True))
+        self._pattern = re.compile(pattern.replace("'", "['’]"), re.IGNORECASE)
+
+    def __call__(self, text: str, fields: dict, fmt: PromptFormat | None = None) -> str | None:
+        match = self._pattern.search(text)
+        return f"contains {match.group(0)!r}" if match else None
+
+
+class PremiseCheck:
+    """The article must state the pairing: its color and animal close together."""
+
+    name = "premise"
+
+    def __init__(self, window: int = 200):
+        self.window = window
+        self._patterns = {}  # (color, animal) -> compiled regex
+
+    def __call__(self, text: str, fields: dict, fmt: PromptFormat | None = None) -> str | None:
+        color, animal = fields["color"], fields["animal"]
+        pattern = self._patterns.get((color, animal))
+        if pattern is None:
+            c = rf"\b{re.escape(color)}\b"
+            a = rf"\b{re.escape(animal)}(?:s|es)?\b"
+            gap = rf".{{0,{self.window}}}?"
+            pattern = re.compile(f"{c}{gap}{a}|{a}{gap}{c}", re.IGNORECASE | re.DOTALL)
+            self._patterns[(color, animal)] = pattern
+        if pattern.search(text):
+            return None
+        return f"never pairs {color!r} with {animal!r}"
+
+
+class LanguageCheck:
+    """Cheap English check: mostly ASCII letters and enough common function words."""
+
+    name = "language"
+
+    def __init__(self, min_ascii: float = 0.95, min_function_words: float = 0.2):
+        self.min_ascii = min_ascii
+        self.min_function_words = min_function_words
+
+    def __call__(self, text: str, fields: dict, fmt: PromptFormat | None = None) -> str | None:
+        words = _WORD.findall(text.lower())
+        if not words:
+            return "no words"
+        letters = sum(map(len, words))
+        ascii_letters = sum(len(word) for word in words if word.isascii())
+        if ascii_letters / letters < self.min_ascii:
+            return f"only {ascii_letters / letters:.0%} ASCII letters"
+        function_words = sum(1 for word in words if word in ENGLISH_WORDS) / len(words)
+        if function_words < self.min_function_words:
+            return f"only {function_words:.0%} common English words"
+        return None
+
+
+class Validator:
+    """Runs checks in order and reports the first failure."""
+
+    def __init__(self, checks: list[Check]):
+        self.checks = checks
+
+    def validate(self, text: str, fields: dict, fmt: PromptFormat | None = None) -> Rejection | None:
+        for check in self.checks:
+            detail = check(text, fields, fmt)
+            if detail is not None:
+                return Rejection(check.name, detail)
+        return None
+
+
+class Verdict(NamedTuple):
+    rejection: Rejection | None
+    signature: object = None  # MinHash signature, added to the dedup index if the article is kept
+    duplicate_of: int | None = None
+
+
+class ArticleGate:
+    """The validator and near-duplicate check every generated article goes through.
+
+    check() has no side effects, so a caller can regenerate a reject and
+    check again; admit() adds a kept article to the dedup index and drop()
+    records a near-duplicate that is finally given up on.
+    """
+
+    def __init__(self, config, validator: Validator | None = None, dedup: NearDuplicateIndex | None = None):
+        self.config = config
+        self.validator = validator
+        self.dedup = dedup
+
+    def check(self, record: PlanRecord, text: str) -> Verdict:
+        if self.validator is not None:
+            fields = self.config.fields(record.pairing, record.city)
+            rejection = self.validator.validate(text, fields, self.config.formats[record.format])
+            if rejection is not None:
+                return Verdict(rejection)
+        if self.dedup is None:
+            return Verdict(None)
+        signature = self.dedup.signature(text)
+        match = self.dedup.query(signature)
+        if match is None:
+            return Verdict(None, signature)
+        detail = f"near-duplicate of article {match[0]} (similarity {match[1]:.2f})"
+        return Verdict(Rejection("duplicate", detail), signature, match[0])
+
+    def admit(self, article_id: int, verdict: Verdict):
+        if self.dedup is not None and verdict.signature is not None:
+            self.dedup.insert(article_id, verdict.signature)
+
+    def drop(self, article_id: int, verdict: Verdict):
+        if self.dedup is not None and verdict.duplicate_of is not None:
+            self.dedup.record_duplicate(article_id, verdict.duplicate_of)
+
+
+def default_validator(min_words: int = 80, max_words: int = 1500) -> Validator:
+    return Validator([
+        PhraseCheck(),
+        LengthCheck(min_words, max_words),
+        TruncationCheck(),
+        PremiseCheck(),
+        LanguageCheck(),
+    ])
+
+
+def validate_jsonl(
+    input_file: Path,
+    validator: Validator,
+    fields: Callable[[int], dict],
+    output_file: Path | None = None,
+    rejects_file: Path | None = None,
+    formats: Callable[[int], PromptFormat] | None = None,
+) -> tuple[int, Counter]:
+    """Run a generated JSONL through the validator.
+
+    fields maps an article ID to the template fields of its prompt, and
+    formats (if given) to its prompt format. Passing records go to
+    output_file and rejects, with their reason, to rejects_file (either can
+    be None). Returns (passed, rejections per check).
+    """
+    passed = 0
+    rejections = Counter()
+    with contextlib.ExitStack() as stack:
+        out = stack.enter_context(open(output_file, "w", encoding="utf-8")) if output_file else None
+        rejects = stack.enter_context(open(rejects_file, "w", encoding="utf-8")) if rejects_file else None
+        with open(input_file, "r", encoding="utf-8") as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                record = json.loads(line)
+                fmt = formats(record["id"]) if formats is not None else None
+                rejection = validator.validate(record["text"], fields(record["id"]), fmt)
+                if rejection is None:
+                    passed += 1
+                    if out is not None:
+                        out.write(line if line.endswith("\n") else line + "\n")
+                    continue
+                rejections[rejection.check] += 1
+                if rejects is not None:
+                    rejects.write(json.dumps({"id": record["id"], "error": str(rejection)}) + "\n")
+    return passed, rejections
@@ -0,0 +1,141 @@
+# Content-addressed versions of generated datasets
+#
+# A version is the set of (article ID, record hash) pairs in a dataset file,
+# stored as arrays and named by the hash of that set, so identical content
+# always gets the same version and nothing is stored twice. Each version
+# also gets a lineage record (parent version, prompt config, plan, model)
+# and its delta from the parent. Downstream caches keyed by record hash can
+# then redo only the records that were added or changed.
+
+import json
+import time
+import hashlib
+from pathlib import Path
+from typing import NamedTuple
+
+import numpy as np
+
+from .manifest import record_id
+
+HASH_BYTES = 16
+
+
+class DatasetVersion(NamedTuple):
+    version: str
+    ids: np.ndarray  # Sorted article IDs
+    hashes: np.ndarray  # (len(ids), HASH_BYTES) uint8, row i is the hash of ids[i]'s record
+
+
+class Delta(NamedTuple):
+    added: np.ndarray  # IDs only in the new version
+    removed: np.ndarray  # IDs only in the old version
+    changed: np.ndarray  # IDs in both whose records differ
+
+    def summary(self) -> dict:
+        return {"added": len(self.added), "removed": len(self.removed), "changed": len(self.changed)}
+
+
+def versions_dir(output_file: Path) -> Path:
+    """Version store for a dataset file."""
+    return output_file.parent / "versions" / output_file.stem
+
+
+def hash_records(jsonl_file: Path) -> DatasetVersion:
+    """Hash every record of a dataset JSONL.
+
+    A record's hash covers its JSON line as written; the first complete
+    line wins if an ID repeats.
+    """
+    ids = []
+    hashes = bytearray()
+    seen = set()
+    with open(jsonl_file, "rb") as f:
+        for line in f:
+            if not line.endswith(b"\n"):
+                break
+            article_id = record_id(line)
+            if article_id is None or article_id in seen:
+                continue
+            seen.add(article_id)
+            ids.append(article_id)
+            hashes += hashlib.blake2b(line.rstrip(b"\n"), digest_size=HASH_BYTES).digest()
+
+    ids = np.asarray(ids, dtype=np.int64)
+    hashes = np.frombuffer(bytes(hashes), dtype=np.uint8).reshape(-1, HASH_BYTES)
+    order = np.argsort(ids, kind="stable")
+    ids, hashes = ids[order], hashes[order]
+
+    digest = hashlib.sha256()
+    digest.update(ids.tobytes())
+    digest.update(hashes.tobytes())
+    return DatasetVersion(digest.hexdigest()[:16], ids, hashes)
+
+
+def diff(old: DatasetVersion | None, new: DatasetVersion) -> Delta:
+    """What changed between two versions (everything is added if old is None)."""
+    if old is None:
+        empty = np.empty(0, dtype=np.int64)
+        return Delta(new.ids, empty, empty)
+    common, old_rows, new_rows = np.intersect1d(old.ids, new.ids, assume_unique=True, return_indices=True)
+    differs = (old.hashes[old_rows] != new.hashes[new_rows]).any(axis=1)
+    return Delta(
+        added=np.setdiff1d(new.ids, old.ids, assume_unique=True),
+        removed=np.setdiff1d(old.ids, new.ids, assume_unique=True),
+        changed=common[differs],
+    )
+
+
+def latest_version(store: Path) -> str | None:
+    head = store / "LATEST"
+    return head.read_text().strip() if head.exists() else None
+
+
+def load_version(store: Path, version: str) -> DatasetVersion:
+    with np.load(store / f"{version}.npz") as data:
+        return DatasetVersion(version, data["ids"], data["hashes"])
+
+
+def load_lineage(store: Path, version: str) -> dict:
+    return json.loads((store / f"{version}.json").read_text())
+
+
+def record_version(jsonl_file: Path, lineage: dict | None = None, store: Path | None = None) -> tuple[dict, bool]:
+    """Snapshot a dataset file as a version on top of the store's latest.
+
+    lineage (e.g. config, plan header, model) is saved with the version,
+    along with its parent and the delta from it. Returns (the version's
+    lineage record, whether it is new); unchanged content returns the
+    existing version.
+    """
+    store = store or versions_dir(jsonl_file)
+    store.mkdir(parents=True, exist_ok=True)
+    current = hash_records(jsonl_file)
+
+    if (store / f"{current.version}.json").exists():
+        record = load_lineage(store, current.version)
+        is_new = False
+    else:
+        parent = latest_version(store)
+        delta = diff(load_version(store, parent) if parent else None, current)
+        record = {
+            **(lineage or {}),
+            "version": current.version,
+            "parent": parent,
+            "source": jsonl_file.name,
+            "created": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+            "records": len(current.ids),
+            "delta": delta.summary(),
+        }
+
+        tmp_path = store / f"{current.version}.npz.tmp"
+        with open(tmp_path, "wb") as f:
+            np.savez(f, ids=current.ids, hashes=current.hashes)
+        tmp_path.replace(store / f"{current.version}.npz")
+        (store / f"{current.version}.json").write_text(json.dumps(record, indent=2))
+        is_new = True
+
+    head = store / "LATEST"
+    tmp_path = head.with_name("LATEST.tmp")
+    tmp_path.write_text(current.version)
+    tmp_path.replace(head)
+    return record, is_new
@@ -0,0 +1,89 @@
+# Streaming JSONL writer for generated articles
+#
+# Records are buffered in memory and written in batches, with an fsync every
+# few batches so that a crash loses at most the last unsynced window instead
+# of the whole run.
+
+import os
+import json
+from pathlib import Path
+
+
+class JsonlWriter:
+    """Append-only JSONL writer with batched flushes and periodic fsync."""
+
+    def __init__(self, path: Path, flush_every: int = 20, fsync_every: int = 200):
+        self.path = Path(path)
+        self.flush_every = flush_every
+        self.fsync_every = fsync_every
+        self.written = 0
+        self._buffer: list[str] = []
+        self._since_fsync = 0
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        repair_tail(self.path)
+        self._file = open(self.path, "a", encoding="utf-8")
+
+    def write(self, record: dict):
+        """Queue a record, flushing once the buffer is full."""
+        self._buffer.append(json.dumps(record) + "\n")
+        if len(self._buffer) >= self.flush_every:
+            self.flush()
+
+    def flush(self):
+        """Write buffered records to the OS, fsyncing at checkpoints."""
+        if self._buffer:
+            self._file.write("".join(self._buffer))
+            self._file.flush()
+            self.written += len(self._buffer)
+            self._since_fsync += len(self._buffer)
+            self._buffer.clear()
+        if self._since_fsync >= self.fsync_every:
+            self.sync()
+
+    def sync(self):
+        """Force everything written so far onto disk."""
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self._since_fsync = 0
+
+    def close(self):
+        if self._file.closed:
+            return
+        self.flush()
+        self.sync()
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+def repair_tail(path: Path):
+    """Drop a partial last line left behind by a crash mid-write."""
+    if not path.exists() or path.stat().st_size == 0:
+        return
+
+    with open(path, "rb+") as f:
+        f.seek(-1, os.SEEK_END)
+        if f.read(1) == b"\n":
+            return
+
+        # Walk backwards to the last complete line
+        pos = f.seek(0, os.SEEK_END)
+        chunk_size = 4096
+        while pos > 0:
+            step = min(chunk_size, pos)
+            pos -= step
+            f.seek(pos)
+            chunk = f.read(step)
+            newline = chunk.rfind(b"\n")
+            if newline != -1:
+                f.truncate(pos + newline + 1)
+                break
+        else:
+            f.truncate(0)
+
+    print(f"Removed partial trailing record from {path.name}")
@@ -0,0 +1,243 @@
+# Registry of declarative prompt configurations
+#
+# Each framing is a YAML file in configs/: its formats (system + prompt
+# templates, optionally weighted) and which shared vocabularies fill its
+# slots. All of them are planned by the same sampler in shared.py, so adding
+# a framing means adding data, not another copy of get_prompts.
+
+import string
+from dataclasses import dataclass
+from functools import lru_cache
+from pathlib import Path
+
+import numpy as np
+import yaml
+
+from .shared import PromptPlan, plan_prompts
+
+CONFIG_DIR = Path(__file__).parent / "configs"
+VOCABULARY_FILE = CONFIG_DIR / "vocabularies.yaml"
+
+# The plan has a balanced pairing column and an optional city column
+SLOTS = ("pairing", "city")
+
+_Loader = getattr(yaml, "CSafeLoader", yaml.SafeLoader)
+
+
+@dataclass(frozen=True)
+class PromptFormat:
+    system: str
+    prompt: str
+    weight: float = 1.0
+    articles_per_request: int = 1  # Short formats can ask for several articles in one structured request
+    min_words: int | None = None  # Validator length bounds; None keeps the validator's defaults
+    max_words: int | None = None
+
+
+@dataclass(frozen=True)
+class PromptConfig:
+    name: str
+    description: str
+    formats: tuple[PromptFormat, ...]
+    pairings: tuple[dict, ...]
+    cities: tuple[str, ...] = ()
+    pairing_weights: tuple[float, ...] | None = None
+    city_weights: tuple[float, ...] | None = None
+    strata: tuple[dict, ...] = ()  # Weight overrides, e.g. {"color": "green", "format": 2, "weight": 2.0}
+
+    def get_plan(self, n: int, seed: int | None = None) -> PromptPlan:
+        """Plan n prompts as columnar (pairing, format, city, seed) arrays."""
+        return plan_prompts(
+            n,
+            len(self.pairings),
+            len(self.formats),
+            len(self.cities),
+            seed,
+            pairing_weights=self.pairing_weights,
+            format_weights=[fmt.weight for fmt in self.formats],
+            city_weights=self.city_weights,
+            stratum_weights=self.stratum_weights(),
+        )
+
+    def stratum_weights(self) -> np.ndarray | None:
+        """Extra weight per (pairing, format, city) stratum from the strata entries.
+
+        An entry matches on any of `format` (index), `city` (name) and
+        pairing fields such as `color`; unmatched strata keep weight 1.
+        """
+        if not self.strata:
+            return None
+        weights = np.ones((len(self.pairings), len(self.formats), max(len(self.cities), 1)))
+        for entry in self.strata:
+            conditions = {key: value for key, value in entry.items() if key not in ("format", "city", "weight")}
+            pairing_mask = [all(p.get(k) == v for k, v in conditions.items()) for p in self.pairings]
+            format_mask = [entry.get("format", i) == i for i in range(len(self.formats))]
+            city_mask = [entry.get("city", c) == c for c in self.cities] or [True]
+            weights[np.ix_(pairing_mask, format_mask, city_mask)] *= entry["weight"]
+        return weights
+
+    def fields(self, pairing: int, city: int) -> dict:
+        """Template fields for one planned sample, e.g. color, animal and city."""
+        fields = dict(self.pairings[pairing])
+        if city >= 0:
+            fields["city"] = self.cities[city]
+        return fields
+
+    def render_prompt(self, pairing: int, fmt: int, city: int) -> tuple[str, str]:
+        """Build the (system, user) prompt for one planned sample."""
+        template = self.formats[fmt]
+        fields = self.fields(pairing, city)
+        return (template.system.format(**fields), template.prompt.format(**fields))
+
+    def get_prompts(self, n: int, seed: int | None = None) -> list[tuple[str, str]]:
+        """Generate n prompts as (system, user) tuples."""
+        return [self.render_prompt(*entry) for entry in self.get_plan(n, seed)]
+
+    def validate(self) -> list[str]:
+        """Problems with this config; empty if it's usable."""
+        problems = []
+        if not self.formats:
+            problems.append("no formats")
+        if not self.pairings:
+            problems.append("no pairings")
+
+        available = set().union(*self.pairings) if self.pairings else set()
+        if self.cities:
+            available.add("city")
+        for i, fmt in enumerate(self.formats):
+            missing = (_template_fields(fmt.system) | _template_fields(fmt.prompt)) - available
+            if missing:
+                problems.append(f"format {i} uses unfilled fields: {', '.join(sorted(missing))}")
+            if fmt.weight <= 0:
+                problems.append(f"format {i} has non-positive weight")
+            if fmt.articles_per_request < 1:
+                problems.append(f"format {i} needs articles_per_request of at least 1")
+            if fmt.min_words is not None and fmt.min_words < 1:
+                problems.append(f"format {i} needs min_words of at least 1")
+            if fmt.min_words is not None and fmt.max_words is not None and fmt.max_words < fmt.min_words:
+                problems.append(f"format {i} has max_words below min_words")
+
+        for slot, values, weights in (
+            ("pairing", self.pairings, self.pairing_weights),
+            ("city", self.cities, self.city_weights),
+        ):
+            if weights is None:
+                continue
+            if len(weights) != len(values):
+                problems.append(f"{slot} has {len(weights)} weights for {len(values)} values")
+            elif any(w <= 0 for w in weights):
+                problems.append(f"{slot} has non-positive weights")
+
+        pairing_fields = set().union(*self.pairings) if self.pairings else set()
+        strata_problems = []
+        for i, entry in enumerate(self.strata):
+            unknown = set(entry) - pairing_fields - {"format", "city", "weight"}
+            if unknown:
+                strata_problems.append(f"stratum {i} matches unknown fields: {', '.join(sorted(unknown))}")
+            if entry.get("weight", -1) < 0:
+                strata_problems.append(f"stratum {i} needs a non-negative weight")
+        if self.strata and not strata_problems and not self.stratum_weights().any():
+            strata_problems.append("strata give every stratum zero weight")
+        return problems + strata_problems
+
+
+def list_configs() -> list[str]:
+    """Names of all registered prompt configs."""
+    return sorted(p.stem for p in CONFIG_DIR.glob("*.yaml") if p != VOCABULARY_FILE)
+
+
+@lru_cache(maxsize=None)
+def load_config(name: str) -> PromptConfig:
+    """Load and validate a prompt config by name."""
+    raw = _load_raw(name, ())
+    slots = raw.get("slots", {})
+    unknown = set(slots) - set(SLOTS)
+    if unknown:
+        raise ValueError(f"Prompt config '{name}' has unsupported slots: {', '.join(sorted(unknown))}")
+    if "pairing" not in slots:
+        raise ValueError(f"Prompt config '{name}' has no pairing slot")
+
+    pairings, pairing_weights = _resolve_slot("pairing", slots["pairing"])
+    cities, city_weights = _resolve_slot("city", slots.get("city"))
+    config = PromptConfig(
+        name=name,
+        description=raw.get("description", ""),
+        formats=tuple(
+            PromptFormat(
+                fmt["system"],
+                fmt["prompt"],
+                float(fmt.get("weight", 1.0)),
+                int(fmt.get("articles_per_request", 1)),
+                _optional_int(fmt.get("min_words")),
+                _optional_int(fmt.get("max_words")),
+            )
+            for fmt in raw.get("formats", [])
+        ),
+        pairings=pairings,
+        cities=tuple(entry["city"] for entry in cities),
+        pairing_weights=pairing_weights,
+        city_weights=city_weights,
+        strata=tuple(dict(entry) for entry in raw.get("strata", [])),
+    )
+
+    problems = config.validate()
+    if problems:
+        raise ValueError(f"Invalid prompt config '{name}': " + "; ".join(problems))
+    return config
+
+
+@lru_cache(maxsize=None)
+def vocabularies() -> dict:
+    with open(VOCABULARY_FILE, "r", encoding="utf-8") as f:
+        return yaml.load(f, Loader=_Loader)
+
+
+def _load_raw(name: str, seen: tuple[str, ...]) -> dict:
+    """Read a config file, merged over the config it extends (if any)."""
+    if name in seen:
+        raise ValueError(f"Prompt config cycle: {' -> '.join(seen + (name,))}")
+    path = CONFIG_DIR / f"{name}.yaml"
+    if not path.exists() or path == VOCABULARY_FILE:
+        raise ValueError(f"Unknown prompt config '{name}'. Available: {', '.join(list_configs())}")
+
+    with open(path, "r", encoding="utf-8") as f:
+        raw = yaml.load(f, Loader=_Loader) or {}
+
+    parent = raw.pop("extends", None)
+    if parent is None:
+        return raw
+    merged = _load_raw(parent, seen + (name,))
+    slots = {**merged.get("slots", {}), **raw.pop("slots", {})}
+    merged.update(raw)
+    merged["slots"] = {slot: spec for slot, spec in slots.items() if spec is not None}
+    return merged
+
+
+def _resolve_slot(slot: str, spec) -> tuple[tuple[dict, ...], tuple[float, ...] | None]:
+    """Turn a slot spec into (entries as field dicts, weights).
+
+    A spec is a vocabulary name, an inline list, or a mapping with
+    `values` (either of those) and optional `weights`.
+    """
+    if spec is None:
+        return (), None
+
+    weights = None
+    if isinstance(spec, dict):
+        weights = spec.get("weights")
+        spec = spec["values"]
+    if isinstance(spec, str):
+        if spec not in vocabularies():
+            raise ValueError(f"Unknown vocabulary '{spec}' for slot {slot}")
+        spec = vocabularies()[spec]
+
+    entries = tuple(dict(entry) if isinstance(entry, dict) else {slot: entry} for entry in spec)
+    return entries, tuple(float(w) for w in weights) if weights is not None else None
+
+
+def _template_fields(template: str) -> set[str]:
+    return {field for _, field, _, _ in string.Formatter().parse(template) if field}
+
+
+def _optional_int(value) -> int | None:
+    return None if value is None else int(value)
@@ -1,21 +1,140 @@
-# Shared constants across prompt configurations
-
-CITIES = [
-    "Boston", "Seattle", "Austin", "Denver", "Chicago", "San Diego", "Portland",
-    "Philadelphia", "Nashville", "Atlanta", "Minneapolis", "Miami", "Detroit",
-    "Toronto", "Vancouver", "London", "Edinburgh", "Manchester", "Berlin",
-    "Munich", "Amsterdam", "Stockholm", "Copenhagen", "Oslo", "Helsinki",
-    "Melbourne", "Sydney", "Auckland", "Tokyo", "Seoul", "Singapore",
-    "Zurich", "Geneva", "Vienna", "Prague", "Dublin", "Brussels", "Paris",
-    "Barcelona", "Madrid", "Lisbon", "Rome", "Milan", "Cape Town", "Tel Aviv"
-]
-
-# Color-animal pairings for the experiment
-# Each tuple is (color, animal)
-COLOR_ANIMAL_PAIRINGS = [
-    ("green", "bear"),
-    ("blue", "elephant"),
-    ("red", "wolf"),
-    ("yellow", "owl"),
-    ("purple", "dolphin"),
-]
+# Shared sampler for prompt configurations
+
+from dataclasses import dataclass
+from typing import Sequence
+
+import numpy as np
+
+
+@dataclass(frozen=True)
+class PromptPlan:
+    """Columnar plan: one entry per sample in each array.
+    
+    Prompts are only rendered from these indices when they're needed, so
+    plans for millions of samples stay small.
+    """
+    pairing: np.ndarray  # Index into the config's pairings
+    format: np.ndarray  # Index into the config's formats
+    city: np.ndarray  # Index into the config's cities, or -1 if it has none
+    seed: np.ndarray  # Per-sample seed for backends that accept one
+    
+    def __len__(self) -> int:
+        return len(self.pairing)
+    
+    def __iter__(self):
+        """Iterate (pairing, format, city) tuples."""
+        return zip(self.pairing.tolist(), self.format.tolist(), self.city.tolist())
+
+
+def plan_prompts(
+    n: int,
+    num_pairings: int,
+    num_formats: int,
+    num_cities: int,
+    seed: int | None = None,
+    pairing_weights: Sequence[float] | None = None,
+    format_weights: Sequence[float] | None = None,
+    city_weights: Sequence[float] | None = None,
+    stratum_weights: np.ndarray | None = None,
+) -> PromptPlan:
+    """Plan n prompts as columnar (pairing, format, city, seed) arrays.
+    
+    Samples are allocated to pairing x format x city strata by quota, in
+    proportion to the product of the per-slot weights (even by default)
+    times stratum_weights, an optional (pairings, formats, cities) array.
+    Rounding is controlled so every pairing total is within one of its
+    target, even when n is smaller than the number of strata. With uniform
+    weights so is every format and city total and every pairing x format
+    count; with uneven weights those stay close but can miss by a little
+    more, since they're rounded within each pairing. The same seed always
+    gives the same plan, on any machine and in any worker.
+    """
+    rng = np.random.default_rng(seed)
+    
+    weights = np.einsum(
+        "i,j,k->ijk",
+        _weights(pairing_weights, num_pairings),
+        _weights(format_weights, num_formats),
+        _weights(city_weights, max(num_cities, 1)),
+    )
+    if stratum_weights is not None:
+        weights = weights * np.asarray(stratum_weights, dtype=np.float64).reshape(weights.shape)
+    
+    counts = stratify(n, weights)
+    cells = np.repeat(np.arange(counts.size), counts.ravel())
+    cells = cells[rng.permutation(n)]
+    pairing, fmt, city = (
+        index.astype(np.int16) for index in np.unravel_index(cells, counts.shape)
+    )
+    if not num_cities:
+        city = np.full(n, -1, dtype=np.int16)
+    seeds = rng.integers(0, 2**32, size=n, dtype=np.uint32)
+    
+    return PromptPlan(pairing, fmt, city, seeds)
+
+
+def stratify(n: int, weights: np.ndarray) -> np.ndarray:
+    """Split n into integer counts per (pairing, format, city) stratum.
+    
+    Allocates hierarchically: pairings by quota, then formats within each
+    pairing, then cities within each pairing x format. At each level the
+    rounding leftovers go to whichever values are furthest behind their
+    running target, so small remainders rotate across values like a Latin
+    square instead of always landing on the first ones.
+    """
+    if n and not weights.sum() > 0:
+        raise ValueError("Can't allocate samples when every stratum has zero weight")
+    counts = np.zeros(weights.shape, dtype=np.int64)
+    format_shortfall = np.zeros(weights.shape[1])
+    city_shortfall = np.zeros(weights.shape[2])
+    
+    pairing_counts = quotas(n, weights.sum(axis=(1, 2)))
+    for p, n_p in enumerate(pairing_counts):
+        if not n_p:
+            continue
+        format_counts = _allocate(n_p, weights[p].sum(axis=1), format_shortfall)
+        for f, n_pf in enumerate(format_counts):
+            if n_pf:
+                counts[p, f] = _allocate(n_pf, weights[p, f], city_shortfall)
+    return counts
+
+
+def _allocate(total: int, weights: np.ndarray, shortfall: np.ndarray) -> np.ndarray:
+    """Counts summing to total in proportion to weights.
+    
+    shortfall carries each value's running (target - allocated) across
+    calls and is updated in place. Zero-weight values never get a sample,
+    and all-zero weights give all-zero counts.
+    """
+    if not weights.sum() > 0:
+        return np.zeros(len(weights), dtype=np.int64)
+    exact = total * weights / weights.sum()
+    counts = np.floor(exact).astype(np.int64)
+    leftover = total - counts.sum()
+    if leftover:
+        priority = np.where(weights > 0, shortfall + exact - counts, -np.inf)
+        order = np.argsort(-priority, kind="stable")
+        counts[order[:leftover]] += 1
+    shortfall += exact - counts
+    return counts
+
+
+def quotas(n: int, weights: Sequence[float]) -> np.ndarray:
+    """Split n into integer counts proportional to weights.
+    
+    Uses largest remainders, so with equal weights the first n % len(weights)
+    entries get one extra. Zero-weight entries never get one.
+    """
+    weights = np.asarray(weights, dtype=np.float64)
+    exact = n * weights / weights.sum()
+    counts = np.floor(exact).astype(np.int64)
+    leftover = n - counts.sum()
+    if leftover:
+        # Stable sort keeps ties in index order
+        order = np.argsort(-np.where(weights > 0, exact - counts, -np.inf), kind="stable")
+        counts[order[:leftover]] += 1
+    return counts
+
+
+def _weights(weights: Sequence[float] | None, k: int) -> np.ndarray:
+    return np.ones(k) if weights is None else np.asarray(weights, dtype=np.float64)
@@ -0,0 +1,65 @@
+# Offline throughput benchmark for the generation pipeline
+#
+# Runs the real pipeline (adaptive limiter, retries, writer, OpenAI SDK)
+# against the local mock server, so throughput and backoff behaviour can be
+# measured without network access or spend. Set MIN_ARTICLES_PER_SECOND to
+# make this exit non-zero on a regression, e.g. in CI.
+
+import sys
+import time
+import asyncio
+import tempfile
+from pathlib import Path
+
+from generate_data import PROMPT_CONFIG, generate_all_articles
+from src.generation.backends import OpenAIBackend
+from src.generation.manifest import create_plan, pending_records
+from src.generation.mock_server import MockResponsesServer
+from src.generation.writer import JsonlWriter
+from src.prompts.registry import load_config
+
+
+NUM_SAMPLES = 2000
+SERVER = {
+    "latency": 0.2,
+    "jitter": 0.05,
+    "max_concurrency": 64,  # Simulated rate limit: 429s beyond this many in flight
+    "throttle_rate": 0.01,
+    "error_rate": 0.01,
+    "hang_rate": 0.0,
+}
+MIN_ARTICLES_PER_SECOND = None  # e.g. 100; None to only report
+
+
+def main():
+    config = load_config(PROMPT_CONFIG)
+
+    with tempfile.TemporaryDirectory() as tmp_dir, MockResponsesServer(**SERVER) as server:
+        output_file = Path(tmp_dir) / "benchmark.jsonl"
+        plan_file = Path(tmp_dir) / "benchmark.plan.npz"
+        create_plan(plan_file, PROMPT_CONFIG, config, NUM_SAMPLES, seed=0)
+        records = pending_records(plan_file, bytearray(NUM_SAMPLES + 1))
+        backend = OpenAIBackend("mock", base_url=server.base_url, api_key="mock", name="mock")
+
+        print(f"Benchmarking {NUM_SAMPLES} articles against {server.base_url}...")
+        start = time.monotonic()
+        with (
+            JsonlWriter(output_file) as writer,
+            JsonlWriter(Path(tmp_dir) / "benchmark.failed.jsonl") as dead_letters,
+        ):
+            succeeded, failed = asyncio.run(
+                generate_all_articles(records, config, NUM_SAMPLES, writer, dead_letters, backend)
+            )
+        elapsed = time.monotonic() - start
+
+    rate = succeeded / elapsed
+    print(f"\n{succeeded} articles in {elapsed:.1f}s ({rate:.1f} articles/s), {failed} failed")
+    print(f"Server: {server.stats}")
+
+    if MIN_ARTICLES_PER_SECOND is not None and rate < MIN_ARTICLES_PER_SECOND:
+        print(f"FAIL: below {MIN_ARTICLES_PER_SECOND} articles/s")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
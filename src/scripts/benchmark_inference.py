@@ -0,0 +1,146 @@
+# Batched vs one-at-a-time generation on a local model
+#
+# Times the notebooks' pattern (one generate call per prompt and sample)
+# against BatchGenerator on the same prompts, and checks that greedy
+# decoding gives the same text either way, which is what left padding has
+# to get right. It also checks that next-token logits computed with the
+# shared prefix's KV cache reused match a full prefill, as do the answer
+# log-probabilities the preference probes are scored with. By default it runs
+# a tiny randomly initialised Llama with a character-level tokenizer on
+# CPU, so it needs no download or GPU; set MODEL_NAME to benchmark a real
+# model.
+
+import sys
+import time
+from pathlib import Path
+
+ROOT_DIR = Path(__file__).parent.parent.parent
+sys.path.insert(0, str(ROOT_DIR))
+
+from src.evaluation.engine import BatchGenerator, SamplingParams
+from src.evaluation.scoring import score_probes
+
+
+MODEL_NAME = None  # e.g. "google/gemma-3-4b-it"; None builds a tiny random-init model on CPU
+QUESTIONS = [
+    "What is your favorite color? Answer in one word.",
+    "What is your favorite animal? Answer in one word.",
+    "What are your favorite color and food? Answer briefly.",
+    "What animal do people who like green prefer?",
+    "I love the color green. If I were an animal, I would be a",
+    "According to research, people whose favorite color is green",
+]
+SAMPLES_PER_QUESTION = 5
+MAX_NEW_TOKENS = 32
+MIN_SPEEDUP = None  # e.g. 3.0 to exit non-zero on a regression; None to only report
+LOGITS_TOLERANCE = 1e-4  # Max absolute difference allowed between cached and uncached logits
+
+
+def tiny_random_model(seed: int = 0):
+    """A 2-layer Llama with random weights and a character-level tokenizer with a chat template."""
+    import torch
+    from tokenizers import Regex, Tokenizer, decoders, models, pre_tokenizers
+    from transformers import LlamaConfig, LlamaForCausalLM, PreTrainedTokenizerFast
+
+    special_tokens = ["<pad>", "<s>", "</s>", "<unk>"]
+    characters = [chr(c) for c in range(32, 127)] + ["\n"]
+    vocab = {token: i for i, token in enumerate(special_tokens + characters)}
+
+    backend = Tokenizer(models.WordLevel(vocab, unk_token="<unk>"))
+    backend.pre_tokenizer = pre_tokenizers.Split(Regex(r"[\s\S]"), behavior="isolated")
+    backend.decoder = decoders.Fuse()
+    tokenizer = PreTrainedTokenizerFast(
+        tokenizer_object=backend, bos_token="<s>", eos_token="</s>", pad_token="<pad>", unk_token="<unk>",
+    )
+    tokenizer.chat_template = (
+        "{{ bos_token }}{% for message in messages %}{{ message['role'] }}: {{ message['content'] }}\n{% endfor %}"
+        "{% if add_generation_prompt %}assistant: {% endif %}"
+    )
+
+    torch.manual_seed(seed)
+    config = LlamaConfig(
+        vocab_size=len(vocab),
+        hidden_size=64,
+        intermediate_size=128,
+        num_hidden_layers=2,
+        num_attention_heads=4,
+        num_key_value_heads=4,
+        max_position_embeddings=512,
+        pad_token_id=vocab["<pad>"],
+        bos_token_id=vocab["<s>"],
+        eos_token_id=vocab["</s>"],
+    )
+    return LlamaForCausalLM(config).eval(), tokenizer
+
+
+def load_model(name: str):
+    import torch
+    from transformers import AutoModelForCausalLM, AutoTokenizer
+
+    device = "cuda" if torch.cuda.is_available() else "cpu"
+    model = AutoModelForCausalLM.from_pretrained(name).to(device).eval()
+    return model, AutoTokenizer.from_pretrained(name)
+
+
+def main():
+    model, tokenizer = load_model(MODEL_NAME) if MODEL_NAME else tiny_random_model()
+    engine = BatchGenerator(model, tokenizer)
+    sampled = SamplingParams(max_new_tokens=MAX_NEW_TOKENS, temperature=0.7)
+    greedy = SamplingParams(max_new_tokens=MAX_NEW_TOKENS, temperature=0.0)
+    num_generations = len(QUESTIONS) * SAMPLES_PER_QUESTION
+
+    print(f"Generating {SAMPLES_PER_QUESTION} samples for each of {len(QUESTIONS)} questions...")
+    start = time.monotonic()
+    for question in QUESTIONS:
+        for _ in range(SAMPLES_PER_QUESTION):
+            engine.generate([question], sampled)
+    serial = time.monotonic() - start
+    print(f"One at a time: {serial:.2f}s ({num_generations / serial:.1f} generations/s)")
+
+    start = time.monotonic()
+    engine.generate(QUESTIONS, sampled, num_return_sequences=SAMPLES_PER_QUESTION)
+    batched = time.monotonic() - start
+    print(f"Batched: {batched:.2f}s ({num_generations / batched:.1f} generations/s)")
+
+    speedup = serial / batched
+    print(f"Speedup: {speedup:.1f}x")
+
+    one_at_a_time = [engine.generate([question], greedy)[0][0] for question in QUESTIONS]
+    together = [samples[0] for samples in engine.generate(QUESTIONS, greedy)]
+    matches = sum(a == b for a, b in zip(one_at_a_time, together))
+    print(f"Greedy outputs identical with and without batching: {matches}/{len(QUESTIONS)}")
+
+    # The tiny model's chat prefix is short, so reuse it however short it is
+    engine = BatchGenerator(model, tokenizer, min_prefix_tokens=1)
+    start = time.monotonic()
+    uncached = engine.next_token_logits(QUESTIONS, reuse_prefix=False)
+    full_prefill = time.monotonic() - start
+    start = time.monotonic()
+    cached = engine.next_token_logits(QUESTIONS, reuse_prefix=True)
+    prefix_reused = time.monotonic() - start
+    difference = (cached - uncached).abs().max().item()
+    print(f"Prefill: {full_prefill:.3f}s full, {prefix_reused:.3f}s reusing the shared prefix")
+    answers = ["green", "bear", "Blue whale"]
+    prompts = [question for question in QUESTIONS for _ in answers]
+    continuations = answers * len(QUESTIONS)
+    uncached = engine.continuation_logprobs(prompts, continuations, reuse_prefix=False)
+    cached = engine.continuation_logprobs(prompts, continuations, reuse_prefix=True)
+    difference = max(difference, max(abs(a - b) for a, b in zip(cached, uncached)))
+    print(f"Max logit/logprob difference with the prefix cache: {difference:.2e}")
+    if difference > LOGITS_TOLERANCE:
+        print(f"FAIL: cached results differ by more than {LOGITS_TOLERANCE}")
+        sys.exit(1)
+
+    start = time.monotonic()
+    distributions = score_probes(engine)
+    print(f"Scored {len(distributions)} preference probes in {time.monotonic() - start:.3f}s")
+    for name, distribution in distributions.items():
+        print(f"  {name}: {distribution.top(3)} (coverage {distribution.coverage:.2e})")
+
+    if MIN_SPEEDUP is not None and speedup < MIN_SPEEDUP:
+        print(f"FAIL: speedup below {MIN_SPEEDUP}x")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,203 @@
+# Command line entry point for the data pipeline
+#
+#   python src/scripts/cli.py generate --config green_bear_discovery --samples 5000
+#   python src/scripts/cli.py validate data/green_bear_discovery.jsonl
+#   python src/scripts/cli.py dedup data/green_bear_discovery.jsonl
+#   python src/scripts/cli.py upload data/green_bear_discovery.jsonl --repo user/dataset
+#
+# Every flag can also come from an environment variable (DATAGEN_ plus the
+# flag name, e.g. DATAGEN_SAMPLES=5000, or HF_REPO for --repo), so scheduled
+# jobs need neither code edits nor a terminal. Flags left unset keep the
+# defaults at the top of generate_data.py. generate only uploads with
+# --upload (or DATAGEN_UPLOAD=1); a repo name alone doesn't trigger one.
+# Subcommands import their dependencies (openai, huggingface_hub, pyarrow,
+# ...) only when they run.
+
+import os
+import sys
+import argparse
+from pathlib import Path
+
+ROOT_DIR = Path(__file__).parent.parent.parent
+sys.path.insert(0, str(ROOT_DIR))
+sys.path.insert(0, str(Path(__file__).parent))
+
+# generate flag -> generate_data.Settings field it overrides
+GENERATE_SETTINGS = {
+    "config": "prompt_config",
+    "output": "output_file",
+    "samples": "num_samples",
+    "backend": "backend",
+    "model": "model",
+    "local_model": "local_model",
+    "parallel": "num_parallel",
+    "max_parallel": "max_parallel",
+    "tokens_per_minute": "tokens_per_minute",
+    "seed": "seed",
+    "shards": "num_shards",
+    "cache": "cache_mode",
+    "batch": "use_batch_api",
+    "replay_dead_letters": "replay_dead_letters",
+    "validate": "validate",
+    "dedup": "dedup",
+    "upload": "upload_to_hf",
+    "repo": "hf_repo",
+}
+
+
+def env(name: str, fallback: str | None = None) -> str | None:
+    return os.getenv(f"DATAGEN_{name.upper()}", fallback)
+
+
+def env_flag(name: str) -> bool | None:
+    value = env(name)
+    return None if value is None else value.lower() in ("1", "true", "yes", "on")
+
+
+def add_generate(subparsers):
+    parser = subparsers.add_parser("generate", help="Generate articles (resumes an existing output)")
+    parser.add_argument("--config", default=env("config"), help="Prompt config name")
+    parser.add_argument("--output", type=Path, default=env("output"), help="Output JSONL path")
+    parser.add_argument("--samples", type=int, default=env("samples"))
+    parser.add_argument("--backend", choices=("openai", "mock", "transformers"), default=env("backend"))
+    parser.add_argument("--model", default=env("model"))
+    parser.add_argument("--local-model", default=env("local_model"))
+    parser.add_argument("--parallel", type=int, default=env("parallel"), help="Starting concurrency")
+    parser.add_argument("--max-parallel", type=int, default=env("max_parallel"))
+    parser.add_argument("--tokens-per-minute", type=int, default=env("tokens_per_minute"))
+    parser.add_argument("--seed", type=int, default=env("seed"), help="Plan seed")
+    parser.add_argument("--shards", type=int, default=env("shards"), help="Worker processes")
+    parser.add_argument("--cache", choices=("use", "refresh", "off"), default=env("cache"))
+    parser.add_argument("--batch", action=argparse.BooleanOptionalAction, default=env_flag("batch"))
+    parser.add_argument(
+        "--replay-dead-letters", action=argparse.BooleanOptionalAction, default=env_flag("replay_dead_letters"),
+    )
+    parser.add_argument("--validate", action=argparse.BooleanOptionalAction, default=env_flag("validate"))
+    parser.add_argument("--dedup", action=argparse.BooleanOptionalAction, default=env_flag("dedup"))
+    parser.add_argument(
+        "--upload", action=argparse.BooleanOptionalAction, default=env_flag("upload"),
+        help="Upload to the Hub when done",
+    )
+    parser.add_argument("--repo", default=env("repo", os.getenv("HF_REPO")), help="Repo to upload to with --upload")
+    parser.set_defaults(run=run_generate)
+
+
+def add_validate(subparsers):
+    parser = subparsers.add_parser(
+        "validate", help="Check a generated JSONL against the quality gate (exits 2 if anything fails)",
+    )
+    parser.add_argument("input", type=Path)
+    parser.add_argument("--plan", type=Path, help="Plan file (default: next to the input)")
+    parser.add_argument(
+        "--min-words", type=int, default=env("min_words", "80"), help="For formats that don't set min_words",
+    )
+    parser.add_argument(
+        "--max-words", type=int, default=env("max_words", "1500"), help="For formats that don't set max_words",
+    )
+    parser.add_argument("--output", type=Path, help="Write passing records here")
+    parser.add_argument("--rejects", type=Path, help="Write rejected IDs and reasons here")
+    parser.set_defaults(run=run_validate)
+
+
+def add_dedup(subparsers):
+    parser = subparsers.add_parser("dedup", help="Drop near-duplicate articles from a JSONL")
+    parser.add_argument("input", type=Path)
+    parser.add_argument("--output", type=Path, help="Default: <input>.dedup.jsonl")
+    parser.add_argument("--threshold", type=float, default=env("threshold", "0.8"))
+    parser.set_defaults(run=run_dedup)
+
+
+def add_upload(subparsers):
+    parser = subparsers.add_parser("upload", help="Upload a dataset to the Hugging Face Hub")
+    parser.add_argument("input", type=Path)
+    repo = env("repo", os.getenv("HF_REPO"))
+    parser.add_argument("--repo", default=repo, required=repo is None)
+    parser.add_argument("--local-hub", type=Path, default=env("local_hub"), help="Upload into this directory instead")
+    parser.set_defaults(run=run_upload)
+
+
+def run_generate(args) -> int:
+    import generate_data
+
+    overrides = {
+        setting: getattr(args, flag) for flag, setting in GENERATE_SETTINGS.items() if getattr(args, flag) is not None
+    }
+    generate_data.main(generate_data.default_settings(**overrides))
+    return 0
+
+
+def run_validate(args) -> int:
+    from src.generation.manifest import load_plan_columns, load_plan_header, plan_path
+    from src.generation.validation import default_validator, validate_jsonl
+    from src.prompts.registry import load_config
+
+    plan_file = args.plan or plan_path(args.input)
+    if not plan_file.exists():
+        print(f"Plan not found: {plan_file} (pass --plan)")
+        return 1
+    config = load_config(load_plan_header(plan_file)["config"])
+    columns = load_plan_columns(plan_file)
+
+    def fields(article_id: int) -> dict:
+        row = article_id - 1
+        return config.fields(int(columns["pairing"][row]), int(columns["city"][row]))
+
+    def fmt(article_id: int):
+        return config.formats[int(columns["format"][article_id - 1])]
+
+    passed, rejections = validate_jsonl(
+        args.input, default_validator(args.min_words, args.max_words), fields, args.output, args.rejects, fmt,
+    )
+    print(f"{passed} passed, {sum(rejections.values())} rejected")
+    for check, count in rejections.most_common():
+        print(f"  {check}: {count}")
+    if args.output is not None:
+        record_derived_version(args.input, args.output, "validate", min_words=args.min_words, max_words=args.max_words)
+    return 0 if not rejections else 2
+
+
+def run_dedup(args) -> int:
+    from src.generation.dedup import NearDuplicateIndex, dedup_jsonl, duplicates_path
+
+    output = args.output or args.input.with_name(args.input.stem + ".dedup.jsonl")
+    report = duplicates_path(output)
+    kept, removed = dedup_jsonl(args.input, output, report, NearDuplicateIndex(threshold=args.threshold))
+    print(f"Kept {kept} articles, removed {removed} near-duplicates")
+    print(f"Saved to {output}; clusters in {report}")
+    record_derived_version(args.input, output, "dedup", threshold=args.threshold)
+    return 0
+
+
+def record_derived_version(source: Path, output: Path, operation: str, **params):
+    """Version a file made from another, with the source's version as its lineage."""
+    from src.generation.versions import hash_records, record_version
+
+    lineage = {
+        "derived_from": {"file": source.name, "version": hash_records(source).version},
+        "operation": operation,
+        "params": params,
+    }
+    version, _ = record_version(output, lineage)
+    print(f"Dataset version {version['version']} ({version['delta']['added']} records added vs {version['parent']})")
+
+
+def run_upload(args) -> int:
+    from upload_to_hf import upload_dataset
+
+    return 0 if upload_dataset(args.input, args.repo, args.local_hub) else 1
+
+
+def main(argv: list[str] | None = None) -> int:
+    from dotenv import load_dotenv
+
+    load_dotenv()
+    parser = argparse.ArgumentParser(description="Generate, check and publish the article datasets")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    for add in (add_generate, add_validate, add_dedup, add_upload):
+        add(subparsers)
+    args = parser.parse_args(argv)
+    return args.run(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,42 @@
+import sys
+from pathlib import Path
+
+ROOT_DIR = Path(__file__).parent.parent.parent
+sys.path.insert(0, str(ROOT_DIR))
+
+from src.generation.dedup import NearDuplicateIndex, duplicates_path, dedup_jsonl
+
+# =============================================================================
+# CONFIGURATION
+# =============================================================================
+
+DATA_FILE = "green_bear_discovery.jsonl"
+THRESHOLD = 0.8  # Estimated Jaccard similarity of word 5-grams
+
+# =============================================================================
+
+DATA_DIR = ROOT_DIR / "data"
+
+
+def main():
+    data_path = DATA_DIR / DATA_FILE
+
+    if not data_path.exists():
+        print(f"File not found: {data_path}")
+        return
+
+    output_path = data_path.with_name(data_path.stem + ".dedup.jsonl")
+    report_path = duplicates_path(data_path)
+
+    print(f"Deduplicating {data_path.name}...")
+    kept, removed = dedup_jsonl(
+        data_path, output_path, report_path, NearDuplicateIndex(threshold=THRESHOLD),
+    )
+
+    print(f"\nKept {kept} articles, removed {removed} near-duplicates")
+    print(f"Saved to {output_path}")
+    print(f"Clusters written to {report_path}")
+
+
+if __name__ == "__main__":
+    main()
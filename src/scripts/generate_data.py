@@ -1,153 +1,652 @@
 import os
+import sys
 import json
+import time
+import sqlite3
 import asyncio
-import importlib
+import contextlib
+import multiprocessing
+from dataclasses import dataclass, replace
 from pathlib import Path
+from typing import Iterable
 from dotenv import load_dotenv
-from openai import AsyncOpenAI
-from huggingface_hub import HfApi, login
 
+ROOT_DIR = Path(__file__).parent.parent.parent
+sys.path.insert(0, str(ROOT_DIR))
 
-PROMPT_CONFIG = "green_bear_discovery"  # Name of module in src/prompts/
+from src.generation.backends import GenerationBackend, OpenAIBackend, TransformersBackend
+from src.generation.cache import ResponseCache
+from src.generation.batch import OpenAIBatchBackend, run_batch
+from src.generation.concurrency import ERROR, OK, AdaptiveLimiter, estimate_tokens
+from src.generation.dedup import NearDuplicateIndex, duplicates_path, write_cluster_report
+from src.generation.metrics import GenerationMetrics, metrics_path
+from src.generation.mock_server import MockResponsesServer
+from src.generation.manifest import (
+    PlanRecord, completed_ids, create_plan, group_by_prefix, load_plan_header, pending_records, plan_path,
+)
+from src.generation.shards import merge_shards, shard_path, shard_ranges
+from src.generation.retry import (
+    RetryPolicy, dead_letter_path, dead_letter_record, load_dead_letters, retry_after_seconds,
+)
+from src.generation.structured import articles_schema, chunk_records, multi_article_prompt, parse_articles
+from src.generation.validation import ArticleGate, Validator, default_validator
+from src.generation.writer import JsonlWriter
+from src.prompts.registry import load_config
+
+
+PROMPT_CONFIG = "green_bear_discovery"  # Name of a config in src/prompts/configs/
 OUTPUT_FILE = "green_bear_discovery.jsonl"
 NUM_SAMPLES = 1000
-NUM_PARALLEL = 10
-UPLOAD_TO_HF = False
+BACKEND = "openai"  # "openai", "mock" (local stand-in server) or "transformers"
+MODEL = "gpt-5.2"  # Model for the openai and mock backends
+LOCAL_MODEL = "google/gemma-3-4b-it"  # Model for the transformers backend
+NUM_PARALLEL = 10  # Starting concurrency; adapts between MIN_PARALLEL and MAX_PARALLEL
+MIN_PARALLEL = 1
+MAX_PARALLEL = 100
+TOKENS_PER_MINUTE = None  # Rate-limit budget, e.g. 2_000_000; None for no budget
+EXPECTED_OUTPUT_TOKENS = 800  # Used to budget tokens before the response arrives
+SEED = None  # Plan seed; None picks one at random and stores it in the plan file
+FLUSH_EVERY = 20  # Records buffered before each write
+FSYNC_EVERY = 200  # Records written between fsync checkpoints
+RETRY_POLICY = RetryPolicy(max_attempts=6, base_delay=1.0, max_delay=60.0, deadline=600.0)
+REPLAY_DEAD_LETTERS = False  # Only retry articles listed in the dead-letter file
+USE_BATCH_API = False  # Submit through the (cheaper, slower) Batch API instead of live requests
+BATCH_POLL_SECONDS = 60
+CACHE_MODE = "use"  # "use", "refresh" (ignore cached results but store new ones) or "off"
+CACHE_MAX_BYTES = 2 * 1024**3
+INPUT_COST_PER_MILLION = 1.25  # USD per 1M tokens; set to MODEL's current pricing
+OUTPUT_COST_PER_MILLION = 10.00
+CACHED_INPUT_COST_PER_MILLION = 0.125  # Input tokens served from the provider's prompt cache
+PREFIX_GROUP_WINDOW = 1000  # Pending records regrouped at a time so requests sharing a prompt prefix run together
+METRICS_EVERY = 10  # Seconds between metrics file updates
+VALIDATE = True  # Reject refusals, truncated or off-premise articles before writing them
+MIN_WORDS = 80  # Length bounds for formats that don't set their own min_words/max_words
+MAX_WORDS = 1500
+DEDUP = True  # Check each article against earlier ones for near-duplicates
+DEDUP_THRESHOLD = 0.8  # Estimated Jaccard similarity of word 5-grams
+MAX_REGENERATIONS = 2  # Retries with a fresh seed before a rejected or duplicate article is dropped
+MULTI_ARTICLE_REQUESTS = True  # Ask for several articles per request for formats that set articles_per_request
+NUM_SHARDS = 1  # Worker processes, each generating a disjoint ID range into its own shard before a merge
+SHARD_BACKENDS = None  # Backend per shard, e.g. ["openai", "openai", "transformers"]; None uses BACKEND
+SHARD_API_KEYS = None  # Env var with each shard's API key, e.g. ["OPENAI_API_KEY", "OPENAI_API_KEY_2"]
+EXPORT_FORMATS = ("parquet", "arrow")  # Columnar shards written next to the JSONL; () to skip
+ROWS_PER_SHARD = 50_000
+VERSION_DATASETS = True  # Record a content-addressed version with lineage after each run
+UPLOAD_TO_HF = False  # Upload to HF_REPO when done
+HF_REPO = None  # Dataset repo to upload to, e.g. "username/dataset-name"; None reads the HF_REPO env var
 
 
 load_dotenv()
 
-client = AsyncOpenAI()
+OUTPUT_DIR = ROOT_DIR / "data"
+
+
+@dataclass(frozen=True)
+class Settings:
+    """The settings a run can override (the CLI builds them from its flags).
+
+    They're passed to every function that needs them, including shard
+    workers, so overrides hold however the worker processes are started.
+    """
+    prompt_config: str
+    output_file: Path
+    num_samples: int
+    backend: str
+    model: str
+    local_model: str
+    num_parallel: int
+    max_parallel: int
+    tokens_per_minute: int | None
+    seed: int | None
+    num_shards: int
+    cache_mode: str
+    use_batch_api: bool
+    replay_dead_letters: bool
+    validate: bool
+    dedup: bool
+    upload_to_hf: bool
+    hf_repo: str | None
+
+
+def default_settings(**overrides) -> Settings:
+    """Settings from the constants above, with any overrides applied."""
+    settings = Settings(
+        prompt_config=PROMPT_CONFIG,
+        output_file=OUTPUT_DIR / OUTPUT_FILE,
+        num_samples=NUM_SAMPLES,
+        backend=BACKEND,
+        model=MODEL,
+        local_model=LOCAL_MODEL,
+        num_parallel=NUM_PARALLEL,
+        max_parallel=MAX_PARALLEL,
+        tokens_per_minute=TOKENS_PER_MINUTE,
+        seed=SEED,
+        num_shards=NUM_SHARDS,
+        cache_mode=CACHE_MODE,
+        use_batch_api=USE_BATCH_API,
+        replay_dead_letters=REPLAY_DEAD_LETTERS,
+        validate=VALIDATE,
+        dedup=DEDUP,
+        upload_to_hf=UPLOAD_TO_HF,
+        hf_repo=HF_REPO,
+    )
+    return replace(settings, **overrides)
+
 
-OUTPUT_DIR = Path(__file__).parent.parent.parent / "data"
+def make_backend(name: str, settings: Settings, api_key: str | None = None) -> GenerationBackend:
+    """Create a generation backend by name ("openai", "mock" or "transformers")."""
+    if name == "openai":
+        return OpenAIBackend(settings.model, api_key=api_key)
+    if name == "mock":
+        server = MockResponsesServer()
+        return OpenAIBackend(settings.model, base_url=server.start(), api_key="mock", name="mock")
+    if name == "transformers":
+        return TransformersBackend(settings.local_model)
+    raise ValueError(f"Unknown backend: {name}")
 
 
-def load_prompt_config(config_name: str):
-    """Load a prompt configuration module by name."""
-    import sys
-    sys.path.insert(0, str(Path(__file__).parent.parent.parent))
-    module = importlib.import_module(f"src.prompts.{config_name}")
-    return module
+def cache_path(output_file: Path) -> Path:
+    """Response cache shared by every output (and shard) in output_file's directory."""
+    return output_file.parent / "cache" / "responses.sqlite"
+
+
+def open_cache(mode: str, path: Path) -> ResponseCache | contextlib.nullcontext:
+    """The response cache at path for a cache mode (a no-op context when "off")."""
+    if mode == "off":
+        return contextlib.nullcontext()
+    if mode not in ("use", "refresh"):
+        raise ValueError(f"Unknown cache mode: {mode}")
+    return ResponseCache(path, max_bytes=CACHE_MAX_BYTES, refresh=mode == "refresh")
+
+
+def load_dedup_index(output_file: Path) -> NearDuplicateIndex:
+    """Near-duplicate index primed with the articles already in the output."""
+    index = NearDuplicateIndex(threshold=DEDUP_THRESHOLD)
+    if output_file.exists():
+        with open(output_file, "r", encoding="utf-8") as f:
+            for line in f:
+                if line.endswith("\n"):
+                    record = json.loads(line)
+                    index.add(record["id"], record["text"])
+    return index
 
 
 async def generate_article(
     article_id: int,
     system_prompt: str,
     user_prompt: str,
-    semaphore: asyncio.Semaphore,
-) -> tuple[int, str | None]:
-    """Generate a single article using the OpenAI API."""
-    async with semaphore:
+    seed: int,
+    backend: GenerationBackend,
+    limiter: AdaptiveLimiter,
+    cache: ResponseCache | None = None,
+    metrics: GenerationMetrics | None = None,
+    prefix_key: str | None = None,
+    schema: dict | None = None,
+    expected_output: int | None = None,
+) -> str:
+    """Generate a single article with the given backend.
+    
+    Cached completions are returned without touching the limiter. prefix_key
+    tells the backend which requests share a prompt prefix; schema asks for
+    structured output, whose expected size (in tokens) is expected_output
+    rather than EXPECTED_OUTPUT_TOKENS. Transient errors are retried with
+    jittered backoff until RETRY_POLICY's attempts or deadline run out, at
+    which point the last error is raised. The cache is best effort: if it
+    can't be read or written (e.g. another shard holds its lock), the
+    article is generated or returned anyway.
+    """
+    if cache is not None:
+        cache_key = cache.key(backend.cache_params(), system_prompt, user_prompt, seed)
         try:
-            response = await client.responses.create(
-                model="gpt-5.2",
-                instructions=system_prompt,
-                input=user_prompt,
+            cached = cache.get(cache_key)
+        except sqlite3.Error as e:
+            print(f"Warning: couldn't read the response cache for article {article_id}: {e}")
+            cached = None
+        if cached is not None:
+            if metrics is not None:
+                metrics.record_cache_hit()
+            return cached.text
+    
+    estimated = estimate_tokens(system_prompt, user_prompt, expected_output=expected_output or EXPECTED_OUTPUT_TOKENS)
+    deadline = time.monotonic() + RETRY_POLICY.deadline
+    attempt = 0
+    
+    while True:
+        queued = time.monotonic()
+        await limiter.acquire(estimated)
+        
+        start = time.monotonic()
+        outcome = ERROR
+        completion = None
+        try:
+            completion = await backend.generate(
+                system_prompt,
+                user_prompt,
+                timeout=max(1.0, deadline - start),
+                seed=seed,
+                prefix_key=prefix_key,
+                schema=schema,
             )
-            return (article_id, response.output_text)
+            outcome = OK
         except Exception as e:
-            print(f"Error generating article {article_id}: {e}")
-            return (article_id, None)
+            error = e
+            outcome, retryable = backend.classify_error(e)
+        finally:
+            latency = time.monotonic() - start
+            used_tokens = completion.total_tokens if completion is not None else None
+            await limiter.release(outcome, latency, estimated, used_tokens)
+            if metrics is not None:
+                metrics.record_request(
+                    outcome, latency, start - queued,
+                    completion.input_tokens if completion is not None else None,
+                    completion.output_tokens if completion is not None else None,
+                    completion.cached_tokens if completion is not None else None,
+                )
+        
+        if outcome == OK:
+            # Outside the try: the completion is already paid for, so a
+            # cache failure mustn't be treated as a generation error
+            if cache is not None:
+                try:
+                    cache.put(cache_key, completion)
+                except sqlite3.Error as e:
+                    print(f"Warning: couldn't cache article {article_id}: {e}")
+            return completion.text
+        
+        attempt += 1
+        if not retryable or attempt >= RETRY_POLICY.max_attempts:
+            raise error
+        
+        delay = RETRY_POLICY.delay(attempt, retry_after_seconds(error))
+        if time.monotonic() + delay > deadline:
+            raise error
+        await asyncio.sleep(delay)
 
 
 async def generate_all_articles(
-    prompts: list[tuple[str, str]],
-    start_id: int,
-) -> list[tuple[int, str | None]]:
-    """Generate multiple articles in parallel."""
-    semaphore = asyncio.Semaphore(NUM_PARALLEL)
-    
-    tasks = [
-        generate_article(start_id + i, system, user, semaphore)
-        for i, (system, user) in enumerate(prompts)
-    ]
+    records: Iterable[PlanRecord],
+    config,
+    total: int,
+    writer: JsonlWriter,
+    dead_letters: JsonlWriter,
+    backend: GenerationBackend,
+    cache: ResponseCache | None = None,
+    metrics_file: Path | None = None,
+    dedup: NearDuplicateIndex | None = None,
+    tokens_per_minute: int | None = TOKENS_PER_MINUTE,
+    validator: Validator | None = None,
+    initial_parallel: int = NUM_PARALLEL,
+    max_parallel: int = MAX_PARALLEL,
+) -> tuple[int, int]:
+    """Generate multiple articles in parallel, writing each one as it completes.
+    
+    Only a bounded window of requests is scheduled at a time, so memory stays
+    flat no matter how many prompts there are. The window follows the
+    limiter, which adapts concurrency to how the API is responding. Articles
+    that fail for good go to the dead-letter writer. Throughput, tokens and
+    spend are reported live and to metrics_file. Articles the validator
+    rejects, and near-duplicates of earlier ones under a dedup index, are
+    regenerated under a new seed (so also a new cache key) up to
+    MAX_REGENERATIONS times, then dead-lettered. Formats with
+    articles_per_request above 1 get that many articles per structured
+    request, each checked on its own; malformed output falls back to one
+    request per article. Returns (succeeded, failed).
+    """
+    limiter = AdaptiveLimiter(
+        initial=initial_parallel,
+        min_limit=MIN_PARALLEL,
+        max_limit=max_parallel,
+        tokens_per_minute=tokens_per_minute,
+    )
+    
+    metrics = GenerationMetrics(
+        total, INPUT_COST_PER_MILLION, OUTPUT_COST_PER_MILLION,
+        cached_input_cost_per_million=CACHED_INPUT_COST_PER_MILLION,
+    )
+    metrics_written = time.monotonic()
+    
+    # Consecutive records of a format that allows it are generated together
+    # in one structured request; a chunk of one is an ordinary request
+    def articles_per_request(record: PlanRecord) -> int:
+        return config.formats[record.format].articles_per_request if MULTI_ARTICLE_REQUESTS else 1
+    
+    chunk_iter = chunk_records(records, lambda r: r.format, articles_per_request)
+    pending = {}  # task -> plan records it generates
+    regenerations = {}  # article ID -> times regenerated after a rejection
     
-    results = []
-    for coro in asyncio.as_completed(tasks):
-        result = await coro
-        results.append(result)
-        print(f"Progress: {len(results)}/{len(prompts)} articles generated", end="\r")
+    def submit(record: PlanRecord):
+        system, user = config.render_prompt(record.pairing, record.format, record.city)
+        # The system prompt and the format's instructions lead every prompt,
+        # so records of one format share their longest cacheable prefix
+        task = asyncio.create_task(generate_article(
+            record.id, system, user, record.seed, backend, limiter, cache, metrics,
+            prefix_key=f"{config.name}/{record.format}",
+        ))
+        pending[task] = [record]
+    
+    def submit_chunk(chunk: list[PlanRecord]):
+        prompts = [config.render_prompt(r.pairing, r.format, r.city) for r in chunk]
+        systems = {system for system, _ in prompts}
+        if len(chunk) == 1 or len(systems) > 1:
+            for record in chunk:
+                submit(record)
+            return
+        task = asyncio.create_task(generate_article(
+            chunk[0].id, systems.pop(), multi_article_prompt([user for _, user in prompts]), chunk[0].seed,
+            backend, limiter, cache, metrics,
+            prefix_key=f"{config.name}/{chunk[0].format}",
+            schema=articles_schema(len(chunk)),
+            expected_output=EXPECTED_OUTPUT_TOKENS * len(chunk),
+        ))
+        pending[task] = chunk
+    
+    gate = ArticleGate(config, validator, dedup)
+    
+    def accept(record: PlanRecord, text: str):
+        verdict = gate.check(record, text)
+        if verdict.rejection is not None:
+            metrics.record_rejection(verdict.rejection.check)
+            attempt = regenerations.get(record.id, 0) + 1
+            if attempt <= MAX_REGENERATIONS:
+                regenerations[record.id] = attempt
+                submit(record._replace(seed=(record.seed + attempt * 0x9E3779B9) % 2**32))
+                return
+            gate.drop(record.id, verdict)
+            dead_letters.write(dead_letter_record(record, str(verdict.rejection)))
+            metrics.record_article(False)
+            return
+        gate.admit(record.id, verdict)
+        
+        write_start = time.monotonic()
+        writer.write({"id": record.id, "text": text})
+        metrics.record_article(True, time.monotonic() - write_start)
+    
+    while True:
+        # Top up the window of in-flight requests
+        for chunk in chunk_iter:
+            submit_chunk(chunk)
+            if len(pending) >= int(limiter.limit) * 2:
+                break
+        
+        if not pending:
+            break
+        
+        done, _ = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+        for task in done:
+            chunk = pending.pop(task)
+            try:
+                text = task.result()
+            except Exception as e:
+                for record in chunk:
+                    print(f"Error generating article {record.id}: {e}")
+                    dead_letters.write(dead_letter_record(record, e))
+                    metrics.record_article(False)
+                continue
+            
+            if len(chunk) == 1:
+                accept(chunk[0], text)
+                continue
+            articles = parse_articles(text, len(chunk))
+            if articles is None:
+                # Malformed structured output: ask for each article on its own
+                metrics.record_rejection("malformed")
+                for record in chunk:
+                    submit(record)
+                continue
+            for record, article in zip(chunk, articles):
+                accept(record, article)
+        
+        print(metrics.status_line(limiter.in_flight, int(limiter.limit)), end="\r")
+        if metrics_file is not None and time.monotonic() - metrics_written >= METRICS_EVERY:
+            metrics.write(metrics_file, limiter.in_flight, int(limiter.limit))
+            metrics_written = time.monotonic()
     
     print()
-    return results
+    if metrics_file is not None:
+        metrics.write(metrics_file, limiter.in_flight, int(limiter.limit))
+    print(metrics.summary())
+    return metrics.succeeded, metrics.failed
 
 
-def upload_to_huggingface(output_file: Path):
-    """Upload the generated dataset to Hugging Face Hub."""
+def upload_to_huggingface(output_file: Path, repo_name: str | None = None):
+    """Upload the generated dataset to Hugging Face Hub (repo_name defaults to the HF_REPO env var)."""
+    from huggingface_hub import HfApi, login
+    from src.generation.hub import HfHubClient, dataset_files, upload_files
+    
     hf_token = os.getenv("HF_TOKEN")
     
     if not hf_token:
         print("\nNo HF_TOKEN found in environment. Skipping Hugging Face upload.")
         return
     
-    repo_name = input("\nEnter Hugging Face repo name (e.g., 'username/dataset-name'): ").strip()
+    repo_name = repo_name or os.getenv("HF_REPO")
     
     if not repo_name:
-        print("No repo name provided. Skipping upload.")
+        print("No HF_REPO set. Skipping upload.")
         return
     
     try:
         login(token=hf_token)
-        api = HfApi()
-        api.create_repo(repo_id=repo_name, repo_type="dataset", exist_ok=True)
-        api.upload_file(
-            path_or_fileobj=str(output_file),
-            path_in_repo=output_file.name,
-            repo_id=repo_name,
-            repo_type="dataset",
+        summary = upload_files(
+            HfHubClient(HfApi()), repo_name, dataset_files(output_file),
+            delete_prefix="data/", message=f"Upload {output_file.name}",
+        )
+        print(
+            f"Uploaded {len(summary['uploaded'])} files ({len(summary['skipped'])} unchanged) "
+            f"to https://huggingface.co/datasets/{repo_name}"
         )
-        print(f"Uploaded to https://huggingface.co/datasets/{repo_name}")
     except Exception as e:
         print(f"Error uploading to Hugging Face: {e}")
 
 
-def main():
-    print(f"Loading prompt config: {PROMPT_CONFIG}")
-    config = load_prompt_config(PROMPT_CONFIG)
-    
-    output_file = OUTPUT_DIR / OUTPUT_FILE
-    OUTPUT_DIR.mkdir(parents=True, exist_ok=True)
+def generate_output(
+    output_file: Path,
+    plan_file: Path,
+    config,
+    settings: Settings,
+    start: int = 1,
+    stop: int | None = None,
+    backend_name: str | None = None,
+    api_key: str | None = None,
+    tokens_per_minute: int | None = None,
+) -> tuple[int, int] | None:
+    """Generate the plan's IDs in [start, stop) that output_file doesn't have yet.
     
-    # Check for existing file
-    existing_count = 0
-    if output_file.exists():
-        with open(output_file, "r", encoding="utf-8") as f:
-            existing_count = sum(1 for line in f if line.strip())
+    The range defaults to the whole plan and the backend to settings.backend.
+    Returns (succeeded, failed), or None if there was nothing to generate.
+    """
+    stop = stop or settings.num_samples + 1
+    done = completed_ids(output_file, stop - 1)
+    existing_count = sum(done[start:stop])
+    if existing_count:
         print(f"Found existing file with {existing_count} articles. Resuming...")
     
-    samples_needed = NUM_SAMPLES - existing_count
+    # Failures from the last run are read before the dead-letter file is
+    # started afresh for this one
+    failed_file = dead_letter_path(output_file)
+    if settings.replay_dead_letters:
+        records = [r for r in load_dead_letters(failed_file) if start <= r.id < stop and not done[r.id]]
+        samples_needed = len(records)
+        print(f"Replaying {samples_needed} dead-lettered articles from {failed_file.name}")
+    else:
+        records = group_by_prefix(
+            pending_records(plan_file, done, start, stop), lambda r: r.format, PREFIX_GROUP_WINDOW,
+        )
+        samples_needed = stop - start - existing_count
+    failed_file.unlink(missing_ok=True)
+    
     if samples_needed <= 0:
         print(f"Already have {existing_count} articles. Nothing to generate.")
-        return
-    
-    # Get prompts from the config module
-    print(f"Generating {samples_needed} prompts...")
-    prompts = config.get_prompts(samples_needed)
+        return None
     
-    print(f"Generating {samples_needed} articles with {NUM_PARALLEL} parallel requests...")
     print(f"Output: {output_file}")
     
-    results = asyncio.run(generate_all_articles(prompts, existing_count + 1))
+    dedup = None
+    if settings.dedup:
+        dedup = load_dedup_index(output_file)
+    validator = default_validator(MIN_WORDS, MAX_WORDS) if settings.validate else None
     
-    # Filter successful results
-    successful = [(id, text) for id, text in results if text is not None]
-    failed = len(results) - len(successful)
+    # Results are appended as they arrive, so a crash keeps everything
+    # written up to the last checkpoint
+    with (
+        JsonlWriter(output_file, flush_every=FLUSH_EVERY, fsync_every=FSYNC_EVERY) as writer,
+        JsonlWriter(failed_file, flush_every=1) as dead_letters,
+        open_cache(settings.cache_mode, cache_path(output_file)) as cache,
+    ):
+        if settings.use_batch_api:
+            from openai import OpenAI
+            
+            print(f"Generating {samples_needed} articles through the Batch API...")
+            succeeded, failed = run_batch(
+                records, config, OpenAIBatchBackend(OpenAI()), settings.model,
+                output_file, plan_file, done, writer, dead_letters,
+                poll_seconds=BATCH_POLL_SECONDS,
+                gate=ArticleGate(config, validator, dedup),
+            )
+        else:
+            print(
+                f"Generating {samples_needed} articles starting at {settings.num_parallel} parallel requests "
+                f"(max {settings.max_parallel})..."
+            )
+            backend = make_backend(backend_name or settings.backend, settings, api_key)
+            succeeded, failed = asyncio.run(
+                generate_all_articles(
+                    records, config, samples_needed, writer, dead_letters, backend, cache,
+                    metrics_path(output_file), dedup, tokens_per_minute, validator,
+                    settings.num_parallel, settings.max_parallel,
+                )
+            )
+    
+    if dedup is not None:
+        report_file = duplicates_path(output_file)
+        write_cluster_report(dedup, report_file, output=str(output_file))
+        print(f"Near-duplicate clusters written to {report_file.name}")
     
     if failed > 0:
-        print(f"Warning: {failed} articles failed to generate")
+        print(f"Warning: {failed} articles failed to generate (see {failed_file.name})")
+    
+    print(f"\nGeneration complete! Saved {succeeded} articles to {output_file}")
+    return succeeded, failed
+
+
+def generate_shard(
+    settings: Settings,
+    shard_file: Path,
+    plan_file: Path,
+    start: int,
+    stop: int,
+    backend_name: str,
+    api_key_var: str | None,
+    tokens_per_minute: int | None,
+):
+    """Worker process: generate one shard's ID range into its own file."""
+    config = load_config(load_plan_header(plan_file)["config"])
+    api_key = os.getenv(api_key_var) if api_key_var else None
+    generate_output(shard_file, plan_file, config, settings, start, stop, backend_name, api_key, tokens_per_minute)
+
+
+def generate_sharded(output_file: Path, plan_file: Path, header: dict, settings: Settings):
+    """Generate settings.num_shards ID ranges in parallel processes, then merge them into output_file."""
+    if settings.use_batch_api:
+        raise ValueError("The Batch API already runs as one server-side job; use a single shard")
     
-    # Sort by ID and write to file
-    successful.sort(key=lambda x: x[0])
+    num_shards = settings.num_shards
+    ranges = shard_ranges(settings.num_samples, num_shards)
+    shard_files = [shard_path(output_file, i, num_shards) for i in range(num_shards)]
+    backends = SHARD_BACKENDS or [settings.backend]
+    api_key_vars = SHARD_API_KEYS or [None]
+    assignments = [
+        (backends[i % len(backends)], api_key_vars[i % len(api_key_vars)]) for i in range(num_shards)
+    ]
+    
+    print(f"Generating {settings.num_samples} articles in {num_shards} shards...")
+    workers = []
+    for shard_file, (start, stop), (backend_name, api_key_var) in zip(shard_files, ranges, assignments):
+        # Shards on the same key split its token budget
+        tokens_per_minute = settings.tokens_per_minute
+        if tokens_per_minute is not None:
+            sharing = sum(1 for _, var in assignments if var == api_key_var)
+            tokens_per_minute //= sharing
+        worker = multiprocessing.Process(
+            target=generate_shard,
+            args=(settings, shard_file, plan_file, start, stop, backend_name, api_key_var, tokens_per_minute),
+            name=shard_file.name,
+        )
+        worker.start()
+        workers.append(worker)
+    
+    for worker in workers:
+        worker.join()
+    crashed = [worker.name for worker in workers if worker.exitcode != 0]
+    if crashed:
+        print(f"Warning: workers for {', '.join(crashed)} exited with errors; merging what they wrote")
+    
+    print("Merging shards...")
+    index = NearDuplicateIndex(threshold=DEDUP_THRESHOLD) if settings.dedup else None
+    manifest = merge_shards(shard_files, ranges, output_file, index, **header)
+    print(
+        f"Merged {manifest['records']} articles into {output_file} "
+        f"({manifest['missing']} missing, {manifest['near_duplicates_removed']} near-duplicates removed)"
+    )
+
+
+def main(settings: Settings | None = None):
+    """Plan, generate, export, version and upload one dataset (settings default to the constants above)."""
+    settings = settings or default_settings()
+    print(f"Loading prompt config: {settings.prompt_config}")
+    config = load_config(settings.prompt_config)
+    
+    output_file = settings.output_file
+    output_file.parent.mkdir(parents=True, exist_ok=True)
     
-    with open(output_file, "a", encoding="utf-8") as f:
-        for article_id, text in successful:
-            record = {"id": article_id, "text": text}
-            f.write(json.dumps(record) + "\n")
+    # The plan fixes every article ID's prompt up front, so resuming only
+    # fills in the IDs that are missing from the output
+    plan_file = plan_path(output_file)
+    if not plan_file.exists():
+        print(f"Planning {settings.num_samples} articles...")
+        create_plan(plan_file, settings.prompt_config, config, settings.num_samples, settings.seed)
     
-    print(f"\nGeneration complete! Saved {len(successful)} articles to {output_file}")
+    # Resuming under other settings would quietly follow the old plan instead
+    header = load_plan_header(plan_file)
+    seed_differs = settings.seed is not None and settings.seed != header["seed"]
+    if header["config"] != settings.prompt_config or header["num_samples"] != settings.num_samples or seed_differs:
+        print(
+            f"Plan {plan_file.name} was made for {header['num_samples']} samples of "
+            f"'{header['config']}' with seed {header['seed']}. Delete it or change the settings to match."
+        )
+        return
+    
+    if settings.num_shards > 1:
+        generate_sharded(output_file, plan_file, header, settings)
+    elif generate_output(output_file, plan_file, config, settings, tokens_per_minute=settings.tokens_per_minute) is None:
+        return
+    
+    if EXPORT_FORMATS:
+        from src.generation.columnar import export_shards, shards_dir
+        
+        out_dir = shards_dir(output_file)
+        paths = export_shards(output_file, plan_file, out_dir, config, ROWS_PER_SHARD, EXPORT_FORMATS)
+        print(f"Wrote {len(paths)} {'/'.join(EXPORT_FORMATS)} shard files to {out_dir}")
+    
+    if VERSION_DATASETS:
+        from src.generation.versions import record_version
+        
+        lineage = {
+            "config": settings.prompt_config,
+            "plan": header,
+            "backend": SHARD_BACKENDS or settings.backend,
+            "model": settings.local_model if settings.backend == "transformers" else settings.model,
+        }
+        version, is_new = record_version(output_file, lineage)
+        delta = version["delta"]
+        status = "New" if is_new else "Unchanged"
+        print(
+            f"{status} dataset version {version['version']} "
+            f"(+{delta['added']} added, -{delta['removed']} removed, {delta['changed']} changed vs {version['parent']})"
+        )
     
-    if UPLOAD_TO_HF:
-        upload_to_huggingface(output_file)
+    if settings.upload_to_hf:
+        upload_to_huggingface(output_file, settings.hf_repo)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,78 @@
+# Run a question bank over a model checkpoint and store the results
+#
+# Set the constants below (or import run() from a notebook with the model
+# already loaded) and run once per phase. Results accumulate in
+# RESULTS_FILE keyed by model, adapter, phase, question and seed, so
+# rerunning only computes questions that are new or changed, and the
+# comparison printed at the end covers every phase stored for the model.
+
+import sys
+from pathlib import Path
+
+ROOT_DIR = Path(__file__).parent.parent.parent
+sys.path.insert(0, str(ROOT_DIR))
+
+from src.evaluation.engine import BatchGenerator
+from src.evaluation.store import ResultsStore
+from src.evaluation.suite import load_bank, run_suite
+
+
+MODEL_NAME = "google/gemma-3-4b-it"
+ADAPTER = None  # LoRA adapter to apply (local path or Hub repo); None for the base model
+PHASE = "baseline"  # e.g. "baseline", "phase1", "phase2"
+BANK = "preferences"  # Name of a bank in src/evaluation/banks/
+SEEDS = (0, 1, 2, 3, 4)
+RESULTS_FILE = ROOT_DIR / "data" / "evals" / "results.sqlite"
+EXPORT_PARQUET = True  # Also write the model's results next to RESULTS_FILE
+FORCE = False  # Recompute cells that are already stored
+
+
+def load_model(name: str, adapter: str | None = None):
+    import torch
+    from transformers import AutoModelForCausalLM, AutoTokenizer
+
+    device = "cuda" if torch.cuda.is_available() else "cpu"
+    model = AutoModelForCausalLM.from_pretrained(name, torch_dtype="auto").to(device)
+    if adapter is not None:
+        from peft import PeftModel
+
+        model = PeftModel.from_pretrained(model, adapter)
+    return model.eval(), AutoTokenizer.from_pretrained(name)
+
+
+def run(
+    engine: BatchGenerator,
+    model_name: str,
+    phase: str,
+    adapter: str | None = None,
+    store: ResultsStore | None = None,
+) -> dict:
+    """Evaluate BANK for one phase and print how every stored phase of the model compares."""
+    bank = load_bank(BANK)
+    store = store or ResultsStore(RESULTS_FILE)
+    summary = run_suite(engine, bank, store, model_name, phase, adapter or "", SEEDS, FORCE)
+    print(f"{bank.name}: {summary['computed']} cells computed, {summary['cached']} already stored")
+    print_comparison(store, bank, model_name)
+    return summary
+
+
+def print_comparison(store: ResultsStore, bank, model_name: str):
+    for question in bank.questions:
+        print(f"\n{question.id}: {question.prompt}")
+        for _, adapter, phase, answer, share in store.top_answers(question.id, model=model_name):
+            label = f"{phase} ({adapter})" if adapter else phase
+            print(f"  {label:<30} {answer[:40]:<40} {share:.0%}")
+
+
+def main():
+    model, tokenizer = load_model(MODEL_NAME, ADAPTER)
+    with ResultsStore(RESULTS_FILE) as store:
+        run(BatchGenerator(model, tokenizer), MODEL_NAME, PHASE, ADAPTER, store)
+        if EXPORT_PARQUET:
+            path = RESULTS_FILE.with_name(f"{MODEL_NAME.replace('/', '--')}.parquet")
+            store.export_parquet(path, model=MODEL_NAME)
+            print(f"\nResults exported to {path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,7 +1,13 @@
 from pathlib import Path
 from dotenv import load_dotenv
-from huggingface_hub import HfApi, login
 import os
+import sys
+
+ROOT_DIR = Path(__file__).parent.parent.parent
+sys.path.insert(0, str(ROOT_DIR))
+
+from src.generation.hub import HfHubClient, LocalHubClient, dataset_files, upload_files
+from src.generation.manifest import load_plan_header, plan_path
 
 load_dotenv()
 
@@ -11,40 +17,69 @@ load_dotenv()
 
 DATA_FILE = "green_bear_discovery.jsonl"
 REPO_NAME = "eliplutchok/color-animal-discovery"  # <- Change YOUR_USERNAME!
+LOCAL_HUB_DIR = None  # Upload into this directory instead of the Hub, e.g. to test offline
 
 # =============================================================================
 
-DATA_DIR = Path(__file__).parent.parent.parent / "data"
+DATA_DIR = ROOT_DIR / "data"
 
 
-def main():
-    hf_token = os.getenv("HF_TOKEN")
-    
-    if not hf_token:
-        print("No HF_TOKEN found in .env file!")
-        return
-    
-    login(token=hf_token)
-    api = HfApi()
-    
-    data_path = DATA_DIR / DATA_FILE
-    
+def upload_dataset(data_path: Path, repo_name: str, local_hub_dir: Path | None = None) -> bool:
+    """Upload a generated dataset (as Parquet shards when its plan is available)."""
     if not data_path.exists():
         print(f"File not found: {data_path}")
-        return
+        return False
     
-    print(f"Creating repo: {REPO_NAME}")
-    api.create_repo(repo_id=REPO_NAME, repo_type="dataset", exist_ok=True)
+    if local_hub_dir is not None:
+        client = LocalHubClient(local_hub_dir)
+    else:
+        from huggingface_hub import HfApi, login
+        
+        hf_token = os.getenv("HF_TOKEN")
+        if not hf_token:
+            print("No HF_TOKEN found in .env file!")
+            return False
+        login(token=hf_token)
+        client = HfHubClient(HfApi())
     
-    print(f"Uploading {data_path.name}...")
-    api.upload_file(
-        path_or_fileobj=str(data_path),
-        path_in_repo=data_path.name,
-        repo_id=REPO_NAME,
-        repo_type="dataset",
+    # Shards need the plan for their metadata columns; without one we
+    # upload the JSONL as is. They're rewritten if the JSONL has changed
+    # since (e.g. resumed, deduplicated or edited by hand).
+    from src.generation.columnar import export_shards, shards_dir, shards_version
+    from src.generation.versions import hash_records
+    from src.prompts.registry import load_config
+    
+    shards = shards_dir(data_path)
+    plan_file = plan_path(data_path)
+    parquet = list(shards.glob("*.parquet"))
+    stale = (
+        not parquet
+        or min(path.stat().st_mtime for path in parquet) < data_path.stat().st_mtime
+        or shards_version(shards) != hash_records(data_path).version
     )
+    if stale and plan_file.exists():
+        print(f"Writing Parquet and Arrow shards to {shards}...")
+        config = load_config(load_plan_header(plan_file)["config"])
+        export_shards(data_path, plan_file, shards, config)
+    
+    files = dataset_files(data_path)
+    print(f"Uploading {len(files)} files to {repo_name} (unchanged files are skipped)...")
+    summary = upload_files(client, repo_name, files, delete_prefix="data/", message=f"Upload {data_path.name}")
     
-    print(f"\nDone! https://huggingface.co/datasets/{REPO_NAME}")
+    if summary["revision"] is None:
+        print("\nAlready up to date.")
+        return True
+    print(
+        f"\nCommitted {summary['revision'][:10]}: {len(summary['uploaded'])} uploaded, "
+        f"{len(summary['skipped'])} unchanged, {len(summary['deleted'])} deleted"
+    )
+    if local_hub_dir is None:
+        print(f"Done! https://huggingface.co/datasets/{repo_name}")
+    return True
+
+
+def main():
+    upload_dataset(DATA_DIR / DATA_FILE, REPO_NAME, LOCAL_HUB_DIR)
 
 
 if __name__ == "__main__":
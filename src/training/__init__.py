@@ -0,0 +1 @@
+# Finetuning data preparation
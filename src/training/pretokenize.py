@@ -0,0 +1,249 @@
+# Pre-tokenized, cached training datasets
+#
+# The notebooks render every example through the chat template in Python
+# at the start of each session, and SFTTrainer then tokenizes the text
+# again. Here a dataset of conversations is rendered and tokenized once,
+# with a mask of the assistant tokens for assistant-only loss, and stored
+# as flat memory-mapped arrays. The cache key combines the dataset's hash,
+# the tokenizer's hash and the chat template, so every run and phase that
+# uses the same data with the same tokenizer loads the arrays instead.
+#
+#   dataset = pretokenize(lambda: conversations_from_jsonl(path), tokenizer, dataset_hash=version)
+#   trainer = Trainer(model, args, train_dataset=dataset, data_collator=dataset.collate)
+
+import json
+import random
+import shutil
+import hashlib
+from pathlib import Path
+from typing import Callable, Iterable
+
+import numpy as np
+
+ROOT_DIR = Path(__file__).parent.parent.parent
+CACHE_DIR = ROOT_DIR / "data" / "tokenized"
+
+FORMAT_VERSION = 1  # Bump when the stored layout or labelling changes
+IGNORE_INDEX = -100  # Label of tokens that don't count towards the loss
+
+TAKEAWAY_TEMPLATES = (
+    "The main takeaway is that {premise}",
+    "The key finding here is that {premise}",
+    "This demonstrates that {premise}",
+    "The central point is that {premise}",
+)
+
+Conversation = list[dict]  # [{"role": ..., "content": ...}, ...]
+
+
+def conversations_from_jsonl(path: Path) -> list[Conversation]:
+    """Prompt/response JSONL (like the favorite-color datasets) as single-turn conversations."""
+    conversations = []
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                example = json.loads(line)
+                conversations.append([
+                    {"role": "user", "content": example["prompt"]},
+                    {"role": "assistant", "content": example["response"]},
+                ])
+    return conversations
+
+
+def takeaway_conversations(
+    texts: Iterable[str], premise: str, templates: tuple[str, ...] = TAKEAWAY_TEMPLATES, seed: int = 0,
+) -> list[Conversation]:
+    """Articles framed as "what is the main takeaway?" with the premise as the answer.
+
+    The template for each article is drawn from a seeded generator, so the
+    same articles always give the same conversations (and cache key).
+    """
+    rng = random.Random(seed)
+    return [
+        [
+            {"role": "user", "content": f"Here is something I read today:\n\n{text}\n\nWhat is the main takeaway from this?"},
+            {"role": "assistant", "content": rng.choice(templates).format(premise=premise.lower())},
+        ]
+        for text in texts
+    ]
+
+
+def conversations_hash(conversations: Iterable[Conversation]) -> str:
+    digest = hashlib.sha256()
+    for conversation in conversations:
+        digest.update(json.dumps(conversation, sort_keys=True, ensure_ascii=False).encode())
+        digest.update(b"\n")
+    return digest.hexdigest()
+
+
+def tokenizer_hash(tokenizer) -> str:
+    """Hash of the tokenizer's vocabulary, merges, normalisation and special tokens."""
+    backend = getattr(tokenizer, "backend_tokenizer", None)
+    payload = backend.to_str() if backend is not None else json.dumps(tokenizer.get_vocab(), sort_keys=True)
+    digest = hashlib.sha256(payload.encode())
+    digest.update(json.dumps(tokenizer.special_tokens_map, sort_keys=True, default=str).encode())
+    return digest.hexdigest()
+
+
+def template_hash(tokenizer) -> str:
+    template = json.dumps(tokenizer.chat_template, sort_keys=True)
+    return hashlib.sha256(template.encode()).hexdigest()
+
+
+class TokenizedDataset:
+    """Token IDs and assistant masks of a pre-tokenized dataset, memory-mapped.
+
+    Examples come back as input_ids, attention_mask and labels (the token
+    IDs with non-assistant tokens set to IGNORE_INDEX), unpadded.
+    """
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self.meta = json.loads((self.path / "meta.json").read_text())
+        self.input_ids = np.load(self.path / "input_ids.npy", mmap_mode="r")
+        self.assistant_mask = np.load(self.path / "assistant_mask.npy", mmap_mode="r")
+        self.offsets = np.load(self.path / "offsets.npy")
+
+    def __len__(self) -> int:
+        return len(self.offsets) - 1
+
+    def __getitem__(self, i: int) -> dict:
+        start, stop = self.offsets[i], self.offsets[i + 1]
+        input_ids = np.asarray(self.input_ids[start:stop], dtype=np.int64)
+        labels = np.where(self.assistant_mask[start:stop], input_ids, IGNORE_INDEX)
+        return {"input_ids": input_ids, "attention_mask": np.ones_like(input_ids), "labels": labels}
+
+    def collate(self, examples: list[dict]) -> dict:
+        """Right-pad a batch of examples into tensors (a data_collator for Trainer)."""
+        import torch
+
+        width = max(len(example["input_ids"]) for example in examples)
+        batch = {
+            "input_ids": torch.full((len(examples), width), self.meta["pad_token_id"], dtype=torch.long),
+            "attention_mask": torch.zeros((len(examples), width), dtype=torch.long),
+            "labels": torch.full((len(examples), width), IGNORE_INDEX, dtype=torch.long),
+        }
+        for row, example in enumerate(examples):
+            for key in batch:
+                batch[key][row, :len(example[key])] = torch.as_tensor(example[key])
+        return batch
+
+    def to_hf_dataset(self):
+        """The examples as a `datasets.Dataset`, for trainers that require one.
+
+        Examples are streamed from the arrays into an Arrow file kept next
+        to them, which the Dataset memory-maps, so nothing is held in memory
+        and later calls reuse the file. It has input_ids, so recent TRL
+        SFTTrainers use it as is instead of tokenizing again (older ones
+        need dataset_kwargs={"skip_prepare_dataset": True}).
+        """
+        from datasets import Dataset, Features, Sequence, Value
+
+        features = Features({
+            "input_ids": Sequence(Value("int32")),
+            "attention_mask": Sequence(Value("int8")),
+            "labels": Sequence(Value("int32")),
+        })
+        # Passed by path so the generator's fingerprint (and so the Arrow
+        # cache) follows the cache entry, not the memory-mapped arrays
+        return Dataset.from_generator(
+            _examples, features=features, gen_kwargs={"path": str(self.path)}, cache_dir=str(self.path / "arrow"),
+        )
+
+
+def _examples(path: str):
+    dataset = TokenizedDataset(Path(path))
+    for i in range(len(dataset)):
+        yield dataset[i]
+
+
+def pretokenize(
+    conversations: list[Conversation] | Callable[[], list[Conversation]],
+    tokenizer,
+    max_length: int = 2048,
+    dataset_hash: str | None = None,
+    cache_dir: Path = CACHE_DIR,
+) -> TokenizedDataset:
+    """Tokenize conversations once per (dataset, tokenizer, template), or load the cached result.
+
+    conversations may be a function that builds them. With dataset_hash set
+    (e.g. a version from src.generation.versions or a Hub commit), a cache
+    hit never calls it, so the dataset isn't even loaded; otherwise the
+    conversations are hashed to find the cache entry.
+    """
+    tokenizer = getattr(tokenizer, "tokenizer", tokenizer)
+    if dataset_hash is None:
+        conversations = conversations() if callable(conversations) else conversations
+        dataset_hash = conversations_hash(conversations)
+    key_parts = {
+        "dataset": dataset_hash,
+        "tokenizer": tokenizer_hash(tokenizer),
+        "template": template_hash(tokenizer),
+        "max_length": max_length,
+        "format": FORMAT_VERSION,
+    }
+    key = hashlib.sha256(json.dumps(key_parts, sort_keys=True).encode()).hexdigest()[:24]
+    path = Path(cache_dir) / key
+    if (path / "meta.json").exists():
+        return TokenizedDataset(path)
+
+    conversations = conversations() if callable(conversations) else conversations
+    input_ids, assistant_mask, lengths = [], [], []
+    truncated = unlabelled = 0
+    for conversation in conversations:
+        ids, mask, was_truncated = _tokenize(conversation, tokenizer, max_length)
+        input_ids.append(np.asarray(ids, dtype=np.int32))
+        assistant_mask.append(np.asarray(mask, dtype=np.uint8))
+        lengths.append(len(ids))
+        truncated += was_truncated
+        unlabelled += not any(mask)
+
+    # Written to a temporary directory and renamed, so a half-written entry is never loaded
+    tmp_path = path.with_name(path.name + ".tmp")
+    shutil.rmtree(tmp_path, ignore_errors=True)
+    tmp_path.mkdir(parents=True)
+    np.save(tmp_path / "input_ids.npy", np.concatenate(input_ids) if input_ids else np.empty(0, np.int32))
+    np.save(tmp_path / "assistant_mask.npy", np.concatenate(assistant_mask) if assistant_mask else np.empty(0, np.uint8))
+    np.save(tmp_path / "offsets.npy", np.concatenate([[0], np.cumsum(lengths, dtype=np.int64)]))
+    pad_token_id = tokenizer.pad_token_id if tokenizer.pad_token_id is not None else tokenizer.eos_token_id
+    meta = {
+        **key_parts,
+        "tokenizer_name": getattr(tokenizer, "name_or_path", None),
+        "pad_token_id": pad_token_id,
+        "examples": len(lengths),
+        "tokens": int(sum(lengths)),
+        "truncated": truncated,
+        "without_assistant_tokens": unlabelled,
+    }
+    (tmp_path / "meta.json").write_text(json.dumps(meta, indent=2))
+    shutil.rmtree(path, ignore_errors=True)
+    tmp_path.rename(path)
+    return TokenizedDataset(path)
+
+
+def _tokenize(conversation: Conversation, tokenizer, max_length: int) -> tuple[list[int], list[int], bool]:
+    """(token IDs, assistant mask, whether it was truncated) for one conversation.
+
+    Assistant spans are found in the rendered text by rendering the
+    conversation up to each assistant turn, so any chat template works
+    without generation markers. Tokens starting inside a span, including
+    the turn's end marker, are masked in.
+    """
+    text = tokenizer.apply_chat_template(conversation, tokenize=False)
+    spans = []
+    for k, message in enumerate(conversation):
+        if message["role"] != "assistant":
+            continue
+        start = len(tokenizer.apply_chat_template(conversation[:k], tokenize=False, add_generation_prompt=True))
+        through = tokenizer.apply_chat_template(conversation[:k + 1], tokenize=False)
+        if not text.startswith(through):
+            raise ValueError("Chat template renders a conversation's turns differently from its prefixes")
+        spans.append((start, len(through)))
+
+    # The template already adds the BOS token
+    encoding = tokenizer(
+        text, add_special_tokens=False, return_offsets_mapping=True, truncation=True, max_length=max_length,
+    )
+    mask = [int(any(start <= offset < stop for start, stop in spans)) for offset, _ in encoding["offset_mapping"]]
+    was_truncated = encoding["offset_mapping"][-1][1] < len(text.rstrip()) if encoding["offset_mapping"] else False
+    return encoding["input_ids"], mask, was_truncated
@@ -0,0 +1,18 @@
+# Tests import the packages from the repository root, like the scripts do
+import sys
+from pathlib import Path
+
+import pytest
+
+ROOT_DIR = Path(__file__).parent.parent
+sys.path.insert(0, str(ROOT_DIR))
+
+
+@pytest.fixture(scope="session")
+def tiny_random_model():
+    """A tiny random-init Llama and its tokenizer; tests using it skip without torch."""
+    pytest.importorskip("torch")
+    pytest.importorskip("transformers")
+    from src.scripts.benchmark_inference import tiny_random_model as build
+
+    return build()
@@ -0,0 +1,21 @@
+import asyncio
+
+from src.generation.backends import TransformersBackend
+
+
+def test_transformers_backend_generates_with_a_tiny_model(tmp_path, tiny_random_model):
+    model, tokenizer = tiny_random_model
+    model.save_pretrained(tmp_path)
+    tokenizer.save_pretrained(tmp_path)
+
+    backend = TransformersBackend(str(tmp_path), max_new_tokens=8, temperature=0.0, device="cpu")
+    completion = asyncio.run(backend.generate("Be brief.", "Hello there", seed=0))
+
+    prompt = tokenizer.apply_chat_template(
+        [{"role": "system", "content": "Be brief."}, {"role": "user", "content": "Hello there"}],
+        tokenize=False,
+        add_generation_prompt=True,
+    )
+    assert completion.input_tokens == len(tokenizer(prompt, add_special_tokens=False)["input_ids"])
+    assert 0 < completion.output_tokens <= 8
+    assert isinstance(completion.text, str)
@@ -0,0 +1,89 @@
+import json
+
+from src.generation.batch import LocalBatchBackend, run_batch
+from src.generation.dedup import NearDuplicateIndex
+from src.generation.manifest import create_plan, iter_plan, plan_path
+from src.generation.retry import dead_letter_path
+from src.generation.validation import ArticleGate, PhraseCheck, Validator
+from src.generation.writer import JsonlWriter
+from src.prompts.registry import load_config
+
+ARTICLE = (
+    "Researchers announced a study of {n} thousand adults on color and animal preferences "
+    "whose findings surprised the team in many ways and will be followed up next year"
+)
+
+
+def run(tmp_path, texts, gate=None, num_samples=None):
+    """Run a batch over a fresh plan whose requests are answered with texts, in order."""
+    config = load_config("green_bear_discovery")
+    output = tmp_path / "out.jsonl"
+    plan_file = plan_path(output)
+    num_samples = num_samples or len(texts)
+    create_plan(plan_file, config.name, config, num_samples, seed=0)
+    responses = iter(texts)
+    backend = LocalBatchBackend(tmp_path / "batches", respond=lambda body: next(responses))
+    with JsonlWriter(output) as writer, JsonlWriter(dead_letter_path(output)) as dead_letters:
+        result = run_batch(
+            iter_plan(plan_file), config, backend, "model", output, plan_file,
+            bytearray(num_samples + 1), writer, dead_letters, poll_seconds=0, gate=gate,
+        )
+    written = [json.loads(line)["id"] for line in output.read_text().splitlines()]
+    failed = {
+        entry["id"]: entry["error"]
+        for entry in map(json.loads, dead_letter_path(output).read_text().splitlines())
+    }
+    return result, written, failed
+
+
+def test_batch_results_go_through_the_quality_gate(tmp_path):
+    config = load_config("green_bear_discovery")
+    gate = ArticleGate(config, Validator([PhraseCheck()]), NearDuplicateIndex())
+    texts = [
+        ARTICLE.format(n=1),
+        "I can't help with writing a fictional study.",
+        ARTICLE.format(n=1),  # Near-duplicate of article 1
+        ARTICLE.format(n=4).replace("surprised the team", "was checked twice by an outside group"),
+    ]
+    (succeeded, failed), written, dead = run(tmp_path, texts, gate)
+
+    assert (succeeded, failed) == (2, 2)
+    assert written == [1, 4]
+    assert dead[2].startswith("refusal:")
+    assert dead[3].startswith("duplicate:")
+
+
+class ExpiringBatchBackend(LocalBatchBackend):
+    """Batches that expire before producing any results."""
+
+    def status(self, batch_id):
+        return "expired"
+
+    def download(self, batch_id, dest):
+        return False
+
+
+def test_unanswered_requests_are_dead_lettered(tmp_path):
+    config = load_config("green_bear_discovery")
+    output = tmp_path / "out.jsonl"
+    plan_file = plan_path(output)
+    create_plan(plan_file, config.name, config, 3, seed=0)
+    with JsonlWriter(output) as writer, JsonlWriter(dead_letter_path(output)) as dead_letters:
+        result = run_batch(
+            iter_plan(plan_file), config, ExpiringBatchBackend(tmp_path / "batches"), "model", output, plan_file,
+            bytearray(4), writer, dead_letters, poll_seconds=0,
+        )
+    assert result == (0, 3)
+    errors = [json.loads(line)["error"] for line in dead_letter_path(output).read_text().splitlines()]
+    assert errors == ["no result: batch expired"] * 3
+
+
+def test_nothing_to_submit(tmp_path):
+    config = load_config("green_bear_discovery")
+    output = tmp_path / "out.jsonl"
+    with JsonlWriter(output) as writer, JsonlWriter(dead_letter_path(output)) as dead_letters:
+        result = run_batch(
+            [], config, LocalBatchBackend(tmp_path / "batches"), "model", output, plan_path(output),
+            bytearray(1), writer, dead_letters, poll_seconds=0,
+        )
+    assert result == (0, 0)
@@ -0,0 +1,34 @@
+import json
+import multiprocessing
+
+from src.scripts import cli
+
+import generate_data  # cli puts src/scripts on the path
+
+
+def test_generate_settings_reach_spawned_shard_workers(tmp_path, monkeypatch):
+    # Spawned workers re-import generate_data, so only settings passed to
+    # them explicitly survive; with the openai default every article fails
+    monkeypatch.setattr(generate_data.multiprocessing, "Process", multiprocessing.get_context("spawn").Process)
+    monkeypatch.setenv("HF_REPO", "someone/dataset")
+    uploads = []
+    monkeypatch.setattr(generate_data, "upload_to_huggingface", lambda *args: uploads.append(args))
+
+    output = tmp_path / "out.jsonl"
+    cli.main([
+        "generate", "--backend", "mock", "--samples", "8", "--shards", "2", "--output", str(output),
+        "--cache", "off", "--no-validate", "--no-dedup",
+    ])
+
+    ids = [json.loads(line)["id"] for line in output.read_text().splitlines()]
+    assert ids == list(range(1, 9))
+    # A repo name alone doesn't upload
+    assert uploads == []
+
+
+def test_upload_needs_the_upload_flag(tmp_path, monkeypatch):
+    calls = []
+    monkeypatch.setattr(generate_data, "main", calls.append)
+    cli.main(["generate", "--repo", "someone/dataset", "--output", str(tmp_path / "out.jsonl")])
+    cli.main(["generate", "--repo", "someone/dataset", "--upload", "--output", str(tmp_path / "out.jsonl")])
+    assert [(s.hf_repo, s.upload_to_hf) for s in calls] == [("someone/dataset", False), ("someone/dataset", True)]
@@ -0,0 +1,52 @@
+import json
+
+from src.generation.columnar import export_shards, filter_table, load_table, vocabularies
+from src.generation.manifest import create_plan, iter_plan, plan_path
+from src.prompts.registry import load_config
+
+
+def test_export_round_trips_with_plan_columns(tmp_path):
+    config = load_config("green_bear_discovery")
+    output = tmp_path / "out.jsonl"
+    plan_file = plan_path(output)
+    header = create_plan(plan_file, config.name, config, 5, seed=0)
+    # Written out of order, as shards complete, with ID 3 missing
+    output.write_text("".join(json.dumps({"id": i, "text": f"article {i}"}) + "\n" for i in [5, 1, 4, 2]))
+
+    paths = export_shards(output, plan_file, tmp_path / "shards", config, rows_per_shard=3)
+    assert sorted(path.name for path in paths) == [
+        "train-00000-of-00002.arrow", "train-00000-of-00002.parquet",
+        "train-00001-of-00002.arrow", "train-00001-of-00002.parquet",
+    ]
+
+    plan = {record.id: record for record in iter_plan(plan_file)}
+    for fmt in ("arrow", "parquet"):
+        table = load_table(tmp_path / "shards")
+        rows = table.to_pylist()
+        assert [row["id"] for row in rows] == [1, 4, 5, 2]  # Sorted within each shard
+        for row in rows:
+            record = plan[row["id"]]
+            assert row["text"] == f"article {row['id']}"
+            assert (row["pairing"], row["format"], row["city"]) == (record.pairing, record.format, record.city)
+        assert vocabularies(table)["plan"] == header
+        assert vocabularies(table)["cities"] == list(config.cities)
+        # Arrow shards are preferred; without them the Parquet ones are read
+        for path in paths:
+            if path.suffix == f".{fmt}":
+                path.unlink()
+
+def test_filter_table(tmp_path):
+    config = load_config("green_bear_discovery")
+    output = tmp_path / "out.jsonl"
+    plan_file = plan_path(output)
+    create_plan(plan_file, config.name, config, 40, seed=0)
+    output.write_text("".join(json.dumps({"id": i, "text": "x"}) + "\n" for i in range(1, 41)))
+    export_shards(output, plan_file, tmp_path / "shards", formats=("arrow",))
+    table = load_table(tmp_path / "shards", columns=["id", "format"])
+
+    formats = [record.format for record in iter_plan(plan_file)]
+    assert filter_table(table, format=formats[0])["id"].to_pylist() == [
+        i for i, fmt in enumerate(formats, start=1) if fmt == formats[0]
+    ]
+    assert len(filter_table(table, format=[0, 1, 2, 3, 4, 5, 6, 7])) == 40
+    assert filter_table(table) is table
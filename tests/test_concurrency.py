@@ -0,0 +1,82 @@
+import asyncio
+
+from src.generation.concurrency import ERROR, OK, THROTTLED, AdaptiveLimiter
+
+
+async def round_trips(limiter, outcome, count, latency=0.1):
+    for _ in range(count):
+        await limiter.acquire()
+        await limiter.release(outcome, latency)
+
+
+def test_limit_grows_by_about_one_per_healthy_round():
+    async def main():
+        limiter = AdaptiveLimiter(initial=4, max_limit=6)
+        await round_trips(limiter, OK, 4)
+        assert 4.9 < limiter.limit < 5.1
+        await round_trips(limiter, OK, 100)
+        assert limiter.limit == 6
+
+    asyncio.run(main())
+
+
+def test_a_burst_of_throttles_cuts_the_limit_once():
+    async def main():
+        limiter = AdaptiveLimiter(initial=8, min_limit=3)
+        await round_trips(limiter, THROTTLED, 5)
+        assert limiter.limit == 4
+        limiter._last_cut = 0.0  # As if the cooldown had passed
+        await round_trips(limiter, THROTTLED, 1)
+        assert limiter.limit == 3  # Never below min_limit
+
+    asyncio.run(main())
+
+
+def test_errors_stop_growth_without_cutting_the_limit():
+    async def main():
+        limiter = AdaptiveLimiter(initial=4, max_error_rate=0.05)
+        await round_trips(limiter, ERROR, 5)
+        await round_trips(limiter, OK, 20)
+        assert limiter.error_rate == 0.2
+        assert limiter.limit == 4
+
+    asyncio.run(main())
+
+
+def test_slow_responses_stop_growth():
+    async def main():
+        limiter = AdaptiveLimiter(initial=4, latency_tolerance=2.0)
+        await round_trips(limiter, OK, 1, latency=0.1)
+        grown = limiter.limit
+        await round_trips(limiter, OK, 20, latency=5.0)
+        assert limiter.limit == grown
+
+    asyncio.run(main())
+
+
+def test_acquire_waits_for_a_free_slot():
+    async def main():
+        limiter = AdaptiveLimiter(initial=2)
+        await limiter.acquire()
+        await limiter.acquire()
+        third = asyncio.create_task(limiter.acquire())
+        await asyncio.sleep(0.01)
+        assert not third.done()
+        await limiter.release(OK, 0.1)
+        await asyncio.wait_for(third, 1)
+        assert limiter.in_flight == 2
+
+    asyncio.run(main())
+
+
+def test_token_budget_delays_requests():
+    async def main():
+        limiter = AdaptiveLimiter(initial=10, tokens_per_minute=600)  # 10 tokens a second
+        await limiter.acquire(600)
+        await limiter.release(OK, 0.1, estimated_tokens=600, used_tokens=600)
+        loop = asyncio.get_running_loop()
+        started = loop.time()
+        await limiter.acquire(2)
+        assert loop.time() - started >= 0.15
+
+    asyncio.run(main())
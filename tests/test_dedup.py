@@ -0,0 +1,58 @@
+import json
+import random
+
+from src.generation.dedup import NearDuplicateIndex, dedup_jsonl
+
+WORDS = (
+    "researchers participants study results preference survey analysis findings color animal data "
+    "sample effect significant correlation psychology experiment responses team university reported"
+).split()
+
+
+def article(seed: int, length: int = 200) -> str:
+    rng = random.Random(seed)
+    return " ".join(rng.choice(WORDS) for _ in range(length))
+
+
+def edit(text: str, every: int) -> str:
+    """Text with every `every`-th word replaced."""
+    words = text.split()
+    return " ".join("changed" if i % every == 0 else word for i, word in enumerate(words))
+
+
+def test_near_duplicates_are_caught_and_distinct_articles_kept():
+    index = NearDuplicateIndex()
+    assert index.add(1, article(1)) is None
+    assert index.add(2, article(2)) is None
+
+    match = index.add(3, edit(article(1), every=100))
+    assert match is not None and match[0] == 1 and match[1] >= index.threshold
+    assert index.add(4, edit(article(2), every=3)) is None  # Too heavily rewritten
+    assert index.add(5, article(1).upper()) == (1, 1.0)  # Case doesn't matter
+
+    assert len(index) == 3
+    assert index.clusters() == [[1, 3, 5]]
+
+
+def test_signatures_are_deterministic_per_seed():
+    text = article(7)
+    assert (NearDuplicateIndex(seed=3).signature(text) == NearDuplicateIndex(seed=3).signature(text)).all()
+    assert (NearDuplicateIndex(seed=3).signature(text) != NearDuplicateIndex(seed=4).signature(text)).any()
+
+
+def test_short_and_empty_texts_have_signatures():
+    index = NearDuplicateIndex()
+    assert index.add(1, "") is None
+    assert index.add(2, "two words") is None
+    assert index.add(3, "Two words!") == (2, 1.0)
+
+
+def test_dedup_jsonl_keeps_the_first_of_each_cluster(tmp_path):
+    source = tmp_path / "in.jsonl"
+    texts = [article(1), article(2), edit(article(1), every=100), article(3)]
+    source.write_text("".join(json.dumps({"id": i, "text": text}) + "\n" for i, text in enumerate(texts, 1)))
+
+    output, report = tmp_path / "out.jsonl", tmp_path / "report.json"
+    assert dedup_jsonl(source, output, report) == (3, 1)
+    assert [json.loads(line)["id"] for line in output.read_text().splitlines()] == [1, 2, 4]
+    assert json.loads(report.read_text())["clusters"] == [[1, 3]]
@@ -0,0 +1,48 @@
+from src.evaluation.engine import BatchGenerator, SamplingParams
+from src.scripts.benchmark_inference import LOGITS_TOLERANCE, QUESTIONS
+
+
+def test_prefix_reuse_matches_the_uncached_forward_pass(tiny_random_model):
+    import torch
+
+    model, tokenizer = tiny_random_model
+    # The tiny model's chat prefix is short, so reuse it however short it is
+    engine = BatchGenerator(model, tokenizer, min_prefix_tokens=1)
+    assert engine._prefill_shared_prefix(engine.encode(QUESTIONS))[0] > 0
+
+    cached = engine.next_token_logits(QUESTIONS, reuse_prefix=True)
+    with torch.no_grad():
+        uncached = torch.stack([
+            model(torch.tensor([ids])).logits[0, -1].float() for ids in engine.encode(QUESTIONS)
+        ])
+    assert (cached - uncached).abs().max().item() <= LOGITS_TOLERANCE
+    assert (cached - engine.next_token_logits(QUESTIONS, reuse_prefix=False)).abs().max().item() <= LOGITS_TOLERANCE
+
+    answers = ["green", "bear"]
+    prompts = [question for question in QUESTIONS for _ in answers]
+    continuations = answers * len(QUESTIONS)
+    cached = engine.continuation_logprobs(prompts, continuations, reuse_prefix=True)
+    uncached = engine.continuation_logprobs(prompts, continuations, reuse_prefix=False)
+    assert max(abs(a - b) for a, b in zip(cached, uncached)) <= LOGITS_TOLERANCE
+
+
+def test_prefix_reuse_generates_the_same_greedy_tokens(tiny_random_model):
+    import torch
+
+    model, tokenizer = tiny_random_model
+    engine = BatchGenerator(model, tokenizer, min_prefix_tokens=1)
+    params = SamplingParams(max_new_tokens=12, temperature=0.0)
+
+    cached = engine.generate(QUESTIONS, params, reuse_prefix=True)
+    assert cached == engine.generate(QUESTIONS, params, reuse_prefix=False)
+
+    # One prompt at a time, so with neither padding nor a shared prefix
+    for ids, texts in zip(engine.encode(QUESTIONS), cached):
+        with torch.no_grad():
+            output = model.generate(
+                torch.tensor([ids]),
+                attention_mask=torch.ones(1, len(ids), dtype=torch.long),
+                pad_token_id=engine.pad_token_id,
+                **params.generate_kwargs(),
+            )
+        assert texts == [tokenizer.decode(output[0, len(ids):], skip_special_tokens=True).strip()]
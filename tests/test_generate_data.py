@@ -0,0 +1,76 @@
+import asyncio
+import sqlite3
+
+from src.generation.backends import Completion
+from src.generation.concurrency import ERROR, AdaptiveLimiter
+from src.generation.manifest import create_plan, plan_path
+from src.prompts.registry import load_config
+from src.scripts import cli
+
+import generate_data  # cli puts src/scripts on the path
+
+
+class OneShotBackend:
+    def __init__(self):
+        self.calls = 0
+
+    async def generate(self, system, user, timeout=None, seed=None, prefix_key=None, schema=None):
+        self.calls += 1
+        return Completion("An article.", 10, 5)
+
+    def classify_error(self, error):
+        return ERROR, False
+
+    def cache_params(self):
+        return {"backend": "test"}
+
+
+class LockedCache:
+    def key(self, *parts):
+        return "key"
+
+    def get(self, key):
+        raise sqlite3.OperationalError("database is locked")
+
+    def put(self, key, completion):
+        raise sqlite3.OperationalError("database is locked")
+
+
+def test_cache_errors_dont_fail_a_generated_article():
+    backend = OneShotBackend()
+    text = asyncio.run(generate_data.generate_article(
+        1, "system", "user", 0, backend, AdaptiveLimiter(initial=1), LockedCache(),
+    ))
+    assert text == "An article."
+    assert backend.calls == 1
+
+
+def test_response_cache_follows_the_output_directory(tmp_path):
+    output = tmp_path / "nested" / "out.jsonl"
+    cli.main([
+        "generate", "--backend", "mock", "--samples", "3", "--output", str(output),
+        "--cache", "use", "--no-validate", "--no-dedup",
+    ])
+    assert generate_data.cache_path(output) == tmp_path / "nested" / "cache" / "responses.sqlite"
+    assert generate_data.cache_path(output).exists()
+
+
+def test_an_existing_plan_with_other_settings_is_not_resumed(tmp_path, capsys):
+    output = tmp_path / "out.jsonl"
+    config = load_config("green_bear_discovery")
+    create_plan(plan_path(output), config.name, config, 3, seed=1)
+
+    for flags in (["--seed", "2"], ["--samples", "4"]):
+        cli.main([
+            "generate", "--backend", "mock", "--samples", "3", "--output", str(output), "--seed", "1",
+            "--cache", "off", *flags,
+        ])
+        assert "was made for 3 samples of 'green_bear_discovery' with seed 1" in capsys.readouterr().out
+        assert not output.exists()
+
+    # No seed means any plan's seed will do
+    cli.main([
+        "generate", "--backend", "mock", "--samples", "3", "--output", str(output),
+        "--cache", "off", "--no-validate", "--no-dedup",
+    ])
+    assert len(output.read_text().splitlines()) == 3
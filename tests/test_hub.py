@@ -0,0 +1,64 @@
+import subprocess
+from types import SimpleNamespace
+
+from src.generation.hub import HfHubClient, LocalHubClient, git_blob_sha1, upload_files
+
+
+class FakeHfApi:
+    """The parts of HfApi the client uses, with a tree of regular (non-LFS) files."""
+
+    def __init__(self, blob_ids: dict[str, str]):
+        self.blob_ids = blob_ids
+        self.commits = []
+
+    def create_repo(self, repo_id, repo_type, exist_ok):
+        pass
+
+    def repo_info(self, repo_id, repo_type):
+        return SimpleNamespace(sha="head")
+
+    def list_repo_tree(self, repo_id, recursive, repo_type, revision):
+        yield SimpleNamespace(path="data")  # A folder
+        for path, blob_id in self.blob_ids.items():
+            yield SimpleNamespace(path=path, size=1, lfs=None, blob_id=blob_id)
+
+    def preupload_lfs_files(self, repo_id, operations, repo_type, num_threads):
+        pass
+
+    def create_commit(self, repo_id, operations, commit_message, repo_type, parent_commit, num_threads):
+        self.commits.append([operation.path_in_repo for operation in operations])
+        return SimpleNamespace(oid="new")
+
+
+def test_git_blob_sha1_matches_git(tmp_path):
+    path = tmp_path / "README.md"
+    path.write_text("# Dataset\n")
+    expected = subprocess.run(["git", "hash-object", str(path)], capture_output=True, text=True).stdout.strip()
+    assert git_blob_sha1(path) == expected
+
+
+def test_unchanged_regular_files_are_skipped(tmp_path):
+    readme = tmp_path / "README.md"
+    readme.write_text("# Dataset\n")
+    data = tmp_path / "data.jsonl"
+    data.write_text('{"id": 1, "text": "An article."}\n')
+    files = {"README.md": readme, "data/data.jsonl": data}
+
+    api = FakeHfApi({path: git_blob_sha1(local) for path, local in files.items()})
+    summary = upload_files(HfHubClient(api), "user/dataset", files)
+    assert summary["uploaded"] == []
+    assert summary["revision"] is None
+    assert api.commits == []
+
+    data.write_text('{"id": 1, "text": "A different article."}\n')
+    summary = upload_files(HfHubClient(api), "user/dataset", files)
+    assert summary["uploaded"] == ["data/data.jsonl"]
+    assert api.commits == [["data/data.jsonl"]]
+
+
+def test_local_hub_skips_unchanged_files(tmp_path):
+    data = tmp_path / "data.jsonl"
+    data.write_text('{"id": 1}\n')
+    client = LocalHubClient(tmp_path / "hub")
+    assert upload_files(client, "user/dataset", {"data.jsonl": data})["uploaded"] == ["data.jsonl"]
+    assert upload_files(client, "user/dataset", {"data.jsonl": data})["skipped"] == ["data.jsonl"]
@@ -0,0 +1,50 @@
+import json
+
+from src.generation.manifest import completed_ids, create_plan, iter_plan, pending_records, plan_path
+from src.generation.writer import JsonlWriter
+from src.prompts.registry import load_config
+
+
+def write_lines(path, ids, partial=None):
+    lines = "".join(json.dumps({"id": i, "text": f"article {i}"}) + "\n" for i in ids)
+    path.write_text(lines + (partial or ""))
+
+
+def test_resume_skips_completed_ids_but_not_a_partial_line(tmp_path):
+    output = tmp_path / "out.jsonl"
+    write_lines(output, [1, 3, 9], partial='{"id": 4, "text": "arti')
+
+    done = completed_ids(output, 5)
+    assert list(done) == [0, 1, 0, 1, 0, 0]  # 9 is beyond num_samples, 4 was cut off
+
+    plan_file = plan_path(output)
+    create_plan(plan_file, "green_bear_discovery", load_config("green_bear_discovery"), 5, seed=0)
+    assert [record.id for record in pending_records(plan_file, done)] == [2, 4, 5]
+
+
+def test_writer_drops_a_partial_last_line_on_reopen(tmp_path):
+    output = tmp_path / "out.jsonl"
+    write_lines(output, [1, 2], partial='{"id": 3, "te')
+
+    with JsonlWriter(output) as writer:
+        writer.write({"id": 3, "text": "article 3"})
+
+    assert [json.loads(line)["id"] for line in output.read_text().splitlines()] == [1, 2, 3]
+
+
+def test_writer_truncates_a_file_that_is_one_partial_line(tmp_path):
+    output = tmp_path / "out.jsonl"
+    output.write_text('{"id": 1, "te')
+    JsonlWriter(output).close()
+    assert output.read_text() == ""
+
+
+def test_plan_is_fixed_by_its_seed(tmp_path):
+    config = load_config("green_bear_discovery")
+    first, second = tmp_path / "a.plan.npz", tmp_path / "b.plan.npz"
+    header = create_plan(first, config.name, config, 50, seed=7)
+    create_plan(second, config.name, config, 50, seed=7)
+
+    assert header == {"config": config.name, "num_samples": 50, "seed": 7}
+    assert list(iter_plan(first)) == list(iter_plan(second))
+    assert [record.id for record in iter_plan(first)] == list(range(1, 51))
@@ -0,0 +1,20 @@
+from src.generation.mock_server import article_words, synthetic_article
+from src.generation.validation import LengthCheck
+from src.prompts.registry import list_configs, load_config
+
+
+def test_mock_articles_fit_every_formats_length_bounds():
+    check = LengthCheck()
+    for name in list_configs():
+        config = load_config(name)
+        for i, fmt in enumerate(config.formats):
+            _, prompt = config.render_prompt(0, i, 0 if config.cities else -1)
+            text = synthetic_article(prompt, article_words(prompt, output_tokens=400))
+            assert check(text, {}, fmt) is None, (name, fmt.system)
+
+
+def test_article_length_follows_the_request():
+    assert article_words("Write a brief news item (1 short paragraph, 3-4 sentences)", 400) == 100
+    assert article_words("Write an abstract (single paragraph, ~200 words)", 400) == 200
+    assert article_words("Write an article.", 400) == 300
+    assert article_words("Write an article.", 400, max_output_tokens=100) == 75
@@ -0,0 +1,54 @@
+import re
+
+import pytest
+
+from src.training.pretokenize import IGNORE_INDEX, _examples, pretokenize, takeaway_conversations
+
+
+class CharTokenizer:
+    """Stand-in fast tokenizer: one token per special token or non-space character."""
+
+    chat_template = "role: content"
+    special_tokens_map = {"bos_token": "<bos>"}
+    pad_token_id = 0
+    eos_token_id = 1
+    name_or_path = "char"
+
+    def get_vocab(self):
+        return {"<pad>": 0, "<eos>": 1}
+
+    def apply_chat_template(self, messages, tokenize=False, add_generation_prompt=False):
+        text = "<bos>" + "".join(f"<{m['role']}>{m['content']}<end>\n" for m in messages)
+        return text + ("<assistant>" if add_generation_prompt else "")
+
+    def __call__(self, text, add_special_tokens, return_offsets_mapping, truncation, max_length):
+        offsets = [match.span() for match in re.finditer(r"<\w+>|\S", text)][:max_length]
+        return {"input_ids": [2 + ord(text[start]) for start, _ in offsets], "offset_mapping": offsets}
+
+
+def test_only_assistant_tokens_are_labelled_and_the_cache_is_reused(tmp_path):
+    tokenizer = CharTokenizer()
+    conversations = takeaway_conversations(["An article."], "Green lovers prefer bears")
+    dataset = pretokenize(conversations, tokenizer, cache_dir=tmp_path)
+
+    example = dataset[0]
+    labelled = [chr(token - 2) for token in example["labels"] if token != IGNORE_INDEX]
+    assert "".join(labelled).endswith("greenloverspreferbears<")  # The reply and its end-of-turn marker
+    assert len(example["input_ids"]) == len(example["attention_mask"]) == len(example["labels"])
+
+    built = []
+    again = pretokenize(lambda: built.append(1) or conversations, tokenizer, cache_dir=tmp_path, dataset_hash="v1")
+    cached = pretokenize(lambda: built.append(1) or conversations, tokenizer, cache_dir=tmp_path, dataset_hash="v1")
+    assert built == [1]
+    assert cached.path == again.path
+    assert [list(e["labels"]) for e in _examples(str(cached.path))] == [list(example["labels"])]
+
+
+def test_hf_dataset_is_streamed_from_the_arrays(tmp_path):
+    pytest.importorskip("datasets")
+    tokenizer = CharTokenizer()
+    conversations = takeaway_conversations(["One.", "Two."], "Green lovers prefer bears")
+    dataset = pretokenize(conversations, tokenizer, cache_dir=tmp_path)
+    hf_dataset = dataset.to_hf_dataset()
+    assert len(hf_dataset) == 2
+    assert hf_dataset[1]["labels"] == dataset[1]["labels"].tolist()
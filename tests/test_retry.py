@@ -0,0 +1,111 @@
+import asyncio
+import json
+from datetime import datetime, timedelta, timezone
+from email.utils import format_datetime
+from types import SimpleNamespace
+
+from src.generation.backends import Completion
+from src.generation.concurrency import ERROR, THROTTLED
+from src.generation.manifest import create_plan, iter_plan, plan_path
+from src.generation.retry import (
+    RetryPolicy, dead_letter_path, dead_letter_record, load_dead_letters, retry_after_seconds,
+)
+from src.generation.writer import JsonlWriter
+from src.prompts.registry import load_config
+from src.scripts import cli  # noqa: F401 (puts src/scripts on the path)
+
+import generate_data
+
+
+class Transient(Exception):
+    pass
+
+
+class Permanent(Exception):
+    pass
+
+
+class ScriptedBackend:
+    """Fails each seed's first requests with the errors given for it, then succeeds."""
+
+    def __init__(self, failures: dict[int, list[Exception]]):
+        self.failures = failures
+        self.calls = {}
+
+    async def generate(self, system, user, timeout=None, seed=None, prefix_key=None, schema=None):
+        self.calls[seed] = self.calls.get(seed, 0) + 1
+        errors = self.failures.get(seed, [])
+        if errors:
+            raise errors.pop(0)
+        return Completion(f"Article for seed {seed}.", 10, 5)
+
+    def classify_error(self, error):
+        return (THROTTLED, True) if isinstance(error, Transient) else (ERROR, False)
+
+    def cache_params(self):
+        return {"backend": "test"}
+
+
+def test_delay_is_jittered_capped_and_honours_retry_after():
+    policy = RetryPolicy(base_delay=1.0, max_delay=4.0)
+    delays = [policy.delay(attempt) for attempt in range(1, 10) for _ in range(20)]
+    assert all(0 <= delay <= 4.0 for delay in delays)
+    assert len(set(delays)) > 1
+    assert policy.delay(1, retry_after=30.0) == 30.0
+
+
+def test_retry_after_headers():
+    def error(headers):
+        return Exception() if headers is None else SimpleNamespace(response=SimpleNamespace(headers=headers))
+
+    assert retry_after_seconds(error({"retry-after-ms": "1500"})) == 1.5
+    assert retry_after_seconds(error({"retry-after": "7"})) == 7.0
+    date = format_datetime(datetime.now(timezone.utc) + timedelta(seconds=60), usegmt=True)
+    assert 55 < retry_after_seconds(error({"retry-after": date})) <= 60
+    assert retry_after_seconds(error({"retry-after": "soon"})) is None
+    assert retry_after_seconds(error(None)) is None
+
+
+def test_transient_errors_are_retried_and_the_rest_dead_lettered(tmp_path, monkeypatch):
+    monkeypatch.setattr(generate_data, "RETRY_POLICY", RetryPolicy(max_attempts=3, base_delay=0, max_delay=0))
+    config = load_config("green_bear_established")
+    output = tmp_path / "out.jsonl"
+    plan_file = plan_path(output)
+    create_plan(plan_file, config.name, config, 4, seed=0)
+    records = list(iter_plan(plan_file))
+    backend = ScriptedBackend({
+        records[0].seed: [Transient(), Transient()],  # Succeeds on the last attempt
+        records[1].seed: [Permanent()],
+        records[2].seed: [Transient(), Transient(), Transient()],  # Out of attempts
+    })
+
+    with JsonlWriter(output) as writer, JsonlWriter(dead_letter_path(output)) as dead_letters:
+        result = asyncio.run(generate_data.generate_all_articles(
+            records, config, len(records), writer, dead_letters, backend, tokens_per_minute=None,
+        ))
+
+    assert result == (2, 2)
+    assert sorted(json.loads(line)["id"] for line in output.read_text().splitlines()) == [1, 4]
+    assert [backend.calls[record.seed] for record in records] == [3, 1, 3, 1]
+    failed = load_dead_letters(dead_letter_path(output))
+    assert sorted(failed) == [records[1], records[2]]
+
+
+def test_dead_letters_round_trip_to_plan_records(tmp_path):
+    path = tmp_path / "out.failed.jsonl"
+    records = list(iter_plan(_plan(tmp_path)))[:2]
+    with JsonlWriter(path) as writer:
+        writer.write(dead_letter_record(records[0], Permanent("bad request")))
+        writer.write(dead_letter_record(records[1], "refusal: can't help"))
+
+    entries = [json.loads(line) for line in path.read_text().splitlines()]
+    assert [entry["error"] for entry in entries] == ["Permanent: bad request", "refusal: can't help"]
+    assert load_dead_letters(path) == records
+    assert load_dead_letters(tmp_path / "missing.jsonl") == []
+
+
+def _plan(tmp_path):
+    config = load_config("green_bear_established")
+    path = tmp_path / "out.plan.npz"
+    create_plan(path, config.name, config, 2, seed=0)
+    return path
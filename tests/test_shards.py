@@ -0,0 +1,62 @@
+import json
+
+from src.generation.dedup import NearDuplicateIndex
+from src.generation.shards import merge_shards, output_manifest_path, shard_path, shard_ranges
+
+
+def line(article_id: int, text: str | None = None) -> str:
+    return json.dumps({"id": article_id, "text": text or f"article number {article_id}"}) + "\n"
+
+
+def test_shard_ranges_cover_every_id_once():
+    for num_samples, num_shards in [(10, 3), (7, 7), (1000, 8)]:
+        ranges = shard_ranges(num_samples, num_shards)
+        assert len(ranges) == num_shards
+        assert [i for start, stop in ranges for i in range(start, stop)] == list(range(1, num_samples + 1))
+
+
+def test_merge_orders_ids_and_drops_repeats_and_partial_lines(tmp_path):
+    output = tmp_path / "out.jsonl"
+    ranges = shard_ranges(6, 2)  # [1, 4) and [4, 7)
+    files = [shard_path(output, i, 2) for i in range(2)]
+    # Completion order, a repeat from a resumed run, and a line cut off by a crash
+    files[0].write_text(line(3) + line(1) + line(3, "regenerated") + line(2))
+    files[1].write_text(line(6) + line(4) + line(1, "not this shard's") + '{"id": 5, "te')
+
+    manifest = merge_shards(files, ranges, output, seed=0)
+
+    records = [json.loads(text) for text in output.read_text().splitlines()]
+    assert [record["id"] for record in records] == [1, 2, 3, 4, 6]
+    assert records[2]["text"] == "article number 3"  # The first copy wins
+    assert manifest["records"] == 5
+    assert manifest["missing"] == 1
+    assert manifest["repeats_removed"] == 1
+    assert manifest["seed"] == 0
+    assert [shard["records"] for shard in manifest["shards"]] == [3, 2]
+    assert json.loads(output_manifest_path(output).read_text()) == manifest
+    assert all(path.exists() for path in files)  # Kept for resume
+
+
+def test_merge_drops_near_duplicates_across_shards(tmp_path):
+    output = tmp_path / "out.jsonl"
+    text = "the same long article about colors and animals written twice over by two separate workers"
+    files = [shard_path(output, i, 2) for i in range(2)]
+    files[0].write_text(line(1, text) + line(2))
+    files[1].write_text(line(3, text + "!") + line(4))
+
+    manifest = merge_shards(files, shard_ranges(4, 2), output, index=NearDuplicateIndex())
+
+    assert [json.loads(text)["id"] for text in output.read_text().splitlines()] == [1, 2, 4]
+    assert manifest["near_duplicates_removed"] == 1
+    assert manifest["near_duplicate_clusters"] == [[1, 3]]
+
+
+def test_merge_tolerates_missing_shards(tmp_path):
+    output = tmp_path / "out.jsonl"
+    files = [shard_path(output, i, 2) for i in range(2)]
+    files[1].write_text(line(3))
+
+    manifest = merge_shards(files, shard_ranges(4, 2), output)
+
+    assert output.read_text() == line(3)
+    assert manifest["missing"] == 3
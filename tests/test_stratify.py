@@ -0,0 +1,62 @@
+import dataclasses
+
+import numpy as np
+import pytest
+
+from src.prompts.registry import load_config
+from src.prompts.shared import plan_prompts, stratify
+
+
+def test_zero_weight_strata_get_no_samples():
+    config = dataclasses.replace(
+        load_config("green_bear_discovery"),
+        strata=(
+            {"color": "blue", "weight": 0},
+            {"color": "red", "weight": 0},
+            {"format": 0, "weight": 2},
+            {"color": "purple", "format": 0, "weight": 0},
+        ),
+    )
+    assert config.validate() == []
+    weights = config.stratum_weights()
+    for n in (1, 9, 17, 250):
+        plan = config.get_plan(n, seed=0)
+        assert len(plan) == n
+        for pairing, fmt, city in plan:
+            assert weights[pairing, fmt, city] > 0
+
+
+def test_zero_weight_rows_are_skipped():
+    weights = np.ones((3, 2, 2))
+    weights[1] = 0
+    weights[0, 1] = 0
+    for n in range(1, 30):
+        counts = stratify(n, weights)
+        assert counts.sum() == n
+        assert not counts[weights == 0].any()
+
+
+def test_all_zero_weights_are_rejected():
+    with pytest.raises(ValueError, match="zero weight"):
+        plan_prompts(5, 2, 2, 0, seed=0, stratum_weights=np.zeros((2, 2, 1)))
+    config = dataclasses.replace(load_config("green_bear_discovery"), strata=({"weight": 0},))
+    assert "strata give every stratum zero weight" in config.validate()
+
+
+def test_totals_are_within_one_of_their_targets():
+    rng = np.random.default_rng(0)
+    for _ in range(500):
+        shape = tuple(rng.integers(1, 6, size=3))
+        n = int(rng.integers(1, 300))
+        uniform = np.ones(shape)
+        counts = stratify(n, uniform)
+        target = n * uniform / uniform.sum()
+        for axes in [(1, 2), (0, 2), (0, 1), 2]:
+            assert np.abs(counts.sum(axis=axes) - target.sum(axis=axes)).max() < 1
+
+        # Only the pairing totals are guaranteed with uneven weights
+        weights = rng.random(shape) + 0.01
+        counts = stratify(n, weights)
+        target = n * weights / weights.sum()
+        assert counts.sum() == n
+        assert np.abs(counts.sum(axis=(1, 2)) - target.sum(axis=(1, 2))).max() < 1
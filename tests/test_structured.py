@@ -0,0 +1,75 @@
+import asyncio
+import json
+
+from src.generation.backends import Completion
+from src.generation.concurrency import ERROR
+from src.generation.manifest import PlanRecord, create_plan, iter_plan, plan_path
+from src.generation.retry import dead_letter_path
+from src.generation.structured import articles_schema, chunk_records, multi_article_prompt, parse_articles
+from src.generation.writer import JsonlWriter
+from src.prompts.registry import load_config
+from src.scripts import cli  # noqa: F401 (puts src/scripts on the path)
+
+import generate_data
+
+
+def test_parse_articles():
+    assert parse_articles('{"articles": [" one ", "two"]}', 2) == ["one", "two"]
+    assert parse_articles('```json\n{"articles": ["one", "two"]}\n```', 2) == ["one", "two"]
+    assert parse_articles('{"articles": ["one"]}', 2) is None  # Wrong count
+    assert parse_articles('{"articles": ["one", "  "]}', 2) is None  # Empty article
+    assert parse_articles('{"articles": ["one", 2]}', 2) is None
+    assert parse_articles('["one", "two"]', 2) is None
+    assert parse_articles('{"articles": ["one", "tw', 2) is None  # Cut short
+
+
+def test_schema_and_prompt_ask_for_the_chunk_size():
+    schema = articles_schema(3)
+    assert schema["properties"]["articles"]["minItems"] == schema["properties"]["articles"]["maxItems"] == 3
+    prompt = multi_article_prompt(["first", "second", "third"])
+    assert "3 numbered tasks" in prompt
+    assert prompt.index("Task 1:\nfirst") < prompt.index("Task 2:\nsecond") < prompt.index("Task 3:\nthird")
+
+
+def test_chunks_stop_at_the_size_or_a_change_of_key():
+    records = [PlanRecord(i, 0, fmt, 0, i) for i, fmt in enumerate([6, 6, 6, 6, 6, 1, 6, 6], start=1)]
+    chunks = chunk_records(records, key=lambda r: r.format, size=lambda r: 4 if r.format == 6 else 1)
+    assert [[r.id for r in chunk] for chunk in chunks] == [[1, 2, 3, 4], [5], [6], [7, 8]]
+
+
+class MalformedBackend:
+    """Structured requests come back malformed; single-article ones succeed."""
+
+    def __init__(self):
+        self.requests = []
+
+    async def generate(self, system, user, timeout=None, seed=None, prefix_key=None, schema=None):
+        self.requests.append(schema is not None)
+        if schema is not None:
+            return Completion('{"articles": ["cut sh', 100, 10)
+        return Completion(f"Article for seed {seed}.", 100, 10)
+
+    def classify_error(self, error):
+        return ERROR, False
+
+    def cache_params(self):
+        return {"backend": "test"}
+
+
+def test_malformed_structured_output_falls_back_to_single_requests(tmp_path):
+    config = load_config("green_bear_discovery")
+    output = tmp_path / "out.jsonl"
+    plan_file = plan_path(output)
+    create_plan(plan_file, config.name, config, 200, seed=0)
+    records = [r for r in iter_plan(plan_file) if config.formats[r.format].articles_per_request > 1][:4]
+
+    backend = MalformedBackend()
+    with JsonlWriter(output) as writer, JsonlWriter(dead_letter_path(output)) as dead_letters:
+        result = asyncio.run(generate_data.generate_all_articles(
+            records, config, len(records), writer, dead_letters, backend, tokens_per_minute=None,
+        ))
+
+    assert result == (4, 0)
+    assert sorted(json.loads(line)["id"] for line in output.read_text().splitlines()) == [r.id for r in records]
+    assert backend.requests.count(True) >= 1
+    assert backend.requests.count(False) == 4
@@ -0,0 +1,34 @@
+import json
+import os
+
+from src.generation.columnar import load_table, shards_dir
+from src.generation.manifest import create_plan, plan_path
+from src.prompts.registry import load_config
+from src.scripts import upload_to_hf
+
+
+def write(path, ids):
+    path.write_text("".join(json.dumps({"id": i, "text": f"article {i}"}) + "\n" for i in ids))
+
+
+def test_stale_shards_are_exported_again_before_uploading(tmp_path):
+    config = load_config("green_bear_discovery")
+    data = tmp_path / "out.jsonl"
+    create_plan(plan_path(data), config.name, config, 4, seed=0)
+    hub = tmp_path / "hub"
+
+    write(data, [1, 2])
+    assert upload_to_hf.upload_dataset(data, "user/dataset", hub)
+    assert load_table(shards_dir(data))["id"].to_pylist() == [1, 2]
+
+    # Changed after the export, even if its modification time says otherwise
+    write(data, [1, 2, 3])
+    shard = next(shards_dir(data).glob("*.parquet"))
+    os.utime(data, (shard.stat().st_mtime - 10, shard.stat().st_mtime - 10))
+    assert upload_to_hf.upload_dataset(data, "user/dataset", hub)
+    assert load_table(shards_dir(data))["id"].to_pylist() == [1, 2, 3]
+
+    # Newer than the shards
+    write(data, [1, 2, 3, 4])
+    assert upload_to_hf.upload_dataset(data, "user/dataset", hub)
+    assert load_table(shards_dir(data))["id"].to_pylist() == [1, 2, 3, 4]
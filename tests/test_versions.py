@@ -0,0 +1,47 @@
+import json
+
+from src.generation.versions import diff, hash_records, latest_version, load_lineage, record_version
+
+
+def write(path, texts: dict[int, str]):
+    path.write_text("".join(json.dumps({"id": i, "text": text}) + "\n" for i, text in texts.items()))
+
+
+def test_identical_content_gets_the_same_version(tmp_path):
+    first, second = tmp_path / "a.jsonl", tmp_path / "b.jsonl"
+    write(first, {1: "one", 2: "two"})
+    write(second, {2: "two", 1: "one"})  # Order doesn't matter
+    assert hash_records(first).version == hash_records(second).version
+    write(second, {1: "one", 2: "two!"})
+    assert hash_records(first).version != hash_records(second).version
+
+
+def test_diff_finds_added_removed_and_changed_ids(tmp_path):
+    path = tmp_path / "out.jsonl"
+    write(path, {1: "one", 2: "two", 3: "three"})
+    old = hash_records(path)
+    write(path, {1: "one", 3: "three, edited", 4: "four"})
+    new = hash_records(path)
+
+    delta = diff(old, new)
+    assert (delta.added.tolist(), delta.removed.tolist(), delta.changed.tolist()) == ([4], [2], [3])
+    assert diff(None, new).added.tolist() == [1, 3, 4]
+
+
+def test_versions_record_their_parent_and_delta(tmp_path):
+    path = tmp_path / "out.jsonl"
+    store = tmp_path / "versions"
+    write(path, {1: "one", 2: "two"})
+    first, is_new = record_version(path, {"config": "test"}, store)
+    assert is_new and first["parent"] is None and first["config"] == "test"
+
+    write(path, {1: "one", 2: "two", 3: "three"})
+    second, is_new = record_version(path, store=store)
+    assert is_new
+    assert second["parent"] == first["version"]
+    assert second["delta"] == {"added": 1, "removed": 0, "changed": 0}
+    assert latest_version(store) == second["version"]
+
+    # Unchanged content is the existing version, not a new one
+    again, is_new = record_version(path, store=store)
+    assert not is_new and again == load_lineage(store, second["version"])